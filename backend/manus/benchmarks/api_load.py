@@ -0,0 +1,357 @@
+"""Charge de l'API face à un faux exchange : débit, latences et mémoire, comparés à une référence.
+
+Démarre le faux exchange (benchmarks/fake_exchange.py), crée `--users` utilisateurs de
+`--keys` clés API avec leurs trades et ordres de bots, lance l'API dans un processus
+séparé (serveur local limité à `--http-workers` requêtes simultanées, comme des workers
+gunicorn) puis interroge /balance, /transactions, /opportunities et /bots/orders depuis
+`--concurrency` clients pendant `--duration` secondes.
+
+Affiche req/s, p50/p95/p99 par endpoint et le pic de mémoire (RSS) du processus de
+l'API, puis les compare à `--baseline` : code de sortie 1 si une mesure se dégrade de
+plus de `--tolerance` (débit, p95, RSS ; le p99 est affiché sans être comparé, trop
+variable d'un passage à l'autre). `--save-baseline` enregistre les résultats comme nouvelle référence
+(à produire sur la machine qui exécute la comparaison).
+
+    python benchmarks/api_load.py --users 50 --keys 2 --duration 20 --latency-ms 80
+    python benchmarks/api_load.py --error-rate 0.05 --fresh-ratio 0.5
+    python benchmarks/api_load.py --save-baseline
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from fake_exchange import FakeExchange, assets  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+SECRET_KEY = 'benchmark-secret-key-long-enough-for-hs256'
+
+ENDPOINTS = {
+    'balance': '/api/portfolio/balance',
+    'transactions': '/api/portfolio/transactions',
+    'opportunities': '/api/market/opportunities',
+    'orders': '/api/bots/orders',
+}
+# Paramètres dont dépendent les mesures : une référence n'est comparable qu'à paramètres égaux
+WORKLOAD_PARAMS = (
+    'users', 'keys', 'trades', 'orders', 'concurrency', 'http_workers', 'duration',
+    'latency_ms', 'jitter_ms', 'error_rate', 'payload_size', 'weight_limit', 'fresh_ratio', 'sync_ratio',
+    'endpoints'
+)
+# Compteurs de l'API relevés en fin de passage (/api/metrics)
+APP_COUNTERS = {
+    'throttled': 'manus_exchange_throttled_total',
+    'circuit_rejected': 'manus_exchange_circuit_rejected_total',
+    'hedged': 'manus_exchange_hedged_total',
+    'errors': 'manus_errors_total',
+}
+
+
+def configure_environment(tmp, exchange_url, weight_limit):
+    # Avant tout import de src : les modules lisent leur configuration à l'import
+    os.environ.update({
+        'BINANCE_API_URL': exchange_url,
+        'BINANCE_FUTURES_API_URL': exchange_url,
+        'BINANCE_WEIGHT_LIMIT': str(weight_limit),
+        'BINANCE_FUTURES_WEIGHT_LIMIT': str(weight_limit),
+        'SECRET_KEY': SECRET_KEY,
+        'ENCRYPTION_KEY': 'benchmark-encryption-key',
+        # Métriques gardées en mémoire : pas de fichiers par processus
+        'METRICS_DIR': '',
+        'CANDLE_STORE_DIR': os.path.join(tmp, 'candles'),
+        'BOT_LOG_DIR': os.path.join(tmp, 'bot_logs'),
+        'SCAN_CACHE_DIR': os.path.join(tmp, 'scan_cache'),
+        'SCHEDULER_ENABLED': '0',
+        'MARKET_STREAM_ENABLED': '0',
+    })
+
+
+def database_config(db_path):
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}', 'JWT_SECRET_KEY': SECRET_KEY}
+
+
+def seed(db_path, args):
+    """Utilisateurs, clés API, trades et ordres de bots ; renvoie un jeton JWT par utilisateur."""
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import insert
+    from src.main import create_app
+    from src.models.user import db, User, ApiKey, Trade, BotOrder
+    from src.services.credentials import credential_service
+    from src.services.database import init_database
+
+    app = create_app(database_config(db_path))
+    init_database(app)
+    now = datetime.utcnow()
+    symbols = [f'{asset}USDT' for asset in assets(3)]
+    tokens = []
+
+    with app.app_context():
+        users = [User(username=f'bench{i}', email=f'bench{i}@example.com', password='-') for i in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+        api_keys = [
+            ApiKey(
+                user_id=user.id, platform='binance', label=f'Clé {k}',
+                api_key=credential_service.encrypt(f'key-{user.id}-{k}'),
+                api_secret=credential_service.encrypt(f'secret-{user.id}-{k}')
+            )
+            for user in users for k in range(args.keys)
+        ]
+        db.session.add_all(api_keys)
+        db.session.flush()
+
+        trades = [
+            {
+                'user_id': api_key.user_id, 'api_key_id': api_key.id, 'platform': 'binance',
+                'trade_id': t + 1, 'symbol': symbols[t % len(symbols)], 'base_asset': symbols[t % len(symbols)][:-4],
+                'price': 100.0 + t % 17, 'quantity': 0.01, 'commission': 0.00001, 'commission_asset': 'BNB',
+                'time': now - timedelta(minutes=t), 'is_buyer': t % 2 == 0, 'is_maker': t % 3 == 0
+            }
+            for api_key in api_keys for t in range(args.trades)
+        ]
+        if trades:
+            db.session.execute(insert(Trade), trades)
+
+        orders = [
+            {
+                'user_id': user.id, 'bot_id': f'bot_{o % 3}', 'bot_name': f'Bot {o % 3}', 'order_id': str(o),
+                'exchange': 'binance', 'symbol': 'BTC/USDT', 'type': 'limit', 'side': 'buy' if o % 2 else 'sell',
+                'price': 60000.0 + o, 'amount': 0.001, 'status': ('open', 'closed', 'canceled')[o % 3],
+                'filled': 0.001, 'remaining': 0.0, 'cost': 60.0, 'fee': 0.06, 'pnl': (o % 7) - 3.0,
+                'pnl_percent': ((o % 7) - 3.0) / 10, 'created_at': now - timedelta(minutes=o)
+            }
+            for user in users for o in range(args.orders)
+        ]
+        if orders:
+            db.session.execute(insert(BotOrder), orders)
+        db.session.commit()
+
+        tokens = [create_access_token(identity=str(user.id)) for user in users]
+    return tokens
+
+
+def serve_api(db_path, http_workers, ready, stop):
+    """Processus de l'API : son pic de RSS est lu par le parent après sa sortie."""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from werkzeug.serving import make_server
+    from login_storm import LimitedWorkers
+    from src.main import create_app
+
+    app = create_app(database_config(db_path))
+    server = make_server('127.0.0.1', 0, LimitedWorkers(app, http_workers), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready.put(server.server_port)
+    stop.wait()
+    server.shutdown()
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def _every(i, ratio):
+    # Vrai pour une part `ratio` des valeurs de i, réparties régulièrement
+    return int((i + 1) * ratio) > int(i * ratio)
+
+
+def request_path(name, i, args):
+    # Une part des requêtes force l'appel aux exchanges, comme le bouton "actualiser"
+    if name == 'balance' and _every(i, args.fresh_ratio):
+        return ENDPOINTS[name] + '?fresh=1'
+    if name == 'transactions' and _every(i, args.sync_ratio):
+        return ENDPOINTS[name] + '?sync=1'
+    return ENDPOINTS[name]
+
+
+def drive(base, tokens, args):
+    """Clients en boucle sur les endpoints ; renvoie {endpoint: [(latence ms, statut)]}."""
+    samples = {name: [] for name in args.endpoints}
+    deadline = time.perf_counter() + args.duration
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+
+    def client(worker):
+        session = requests.Session()
+        # Le navigateur revalide ses réponses (If-None-Match) : même comportement ici
+        etags = {}
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            name = args.endpoints[i % len(args.endpoints)]
+            token = tokens[(i // len(args.endpoints) + worker) % len(tokens)]
+            path = request_path(name, i // len(args.endpoints), args)
+            headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+            if (token, path) in etags:
+                headers['If-None-Match'] = etags[(token, path)]
+            started = time.perf_counter()
+            try:
+                response = session.get(base + path, headers=headers, timeout=30)
+                status = response.status_code
+                if 'ETag' in response.headers:
+                    etags[(token, path)] = response.headers['ETag']
+            except requests.RequestException:
+                status = 'error'
+            with lock:
+                samples[name].append(((time.perf_counter() - started) * 1000, status))
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(client, range(args.concurrency)))
+    return samples
+
+
+def app_counters(base):
+    summary = requests.get(f'{base}/api/metrics?format=json', timeout=10).json()
+    totals = dict.fromkeys(APP_COUNTERS, 0)
+    for counter in summary['counters']:
+        for key, name in APP_COUNTERS.items():
+            if counter['name'] == name:
+                totals[key] += counter['value']
+    return totals
+
+
+def summarize(samples, duration, peak_rss_kb):
+    results = {'endpoints': {}}
+    total = 0
+    for name, rows in samples.items():
+        latencies = [latency for latency, _ in rows]
+        failures = sum(1 for _, status in rows if status == 'error' or status >= 500)
+        total += len(rows)
+        results['endpoints'][name] = {
+            'requests': len(rows),
+            'rps': round(len(rows) / duration, 1),
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'not_modified': sum(1 for _, status in rows if status == 304),
+            'errors': failures,
+        }
+    results['rps'] = round(total / duration, 1)
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    results['peak_rss_mb'] = round(peak_rss_kb / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Régressions par rapport à la référence : débit plus faible, latence ou mémoire plus élevées."""
+    regressions = []
+
+    def check(label, value, reference, higher_is_better=False):
+        if not reference:
+            return
+        change = (value - reference) / reference
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        mark = 'RÉGRESSION' if worse else 'ok'
+        print(f'  {label:<28} {reference:>10} -> {value:>10}  ({change:+.0%})  {mark}')
+        if worse:
+            regressions.append(label)
+
+    check('rps', results['rps'], baseline.get('rps'), higher_is_better=True)
+    check('peak_rss_mb', results['peak_rss_mb'], baseline.get('peak_rss_mb'))
+    for name, values in results['endpoints'].items():
+        reference = baseline.get('endpoints', {}).get(name, {})
+        check(f'{name}.rps', values['rps'], reference.get('rps'), higher_is_better=True)
+        check(f'{name}.p95_ms', values['p95_ms'], reference.get('p95_ms'))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--keys', type=int, default=2, help='clés API par utilisateur')
+    parser.add_argument('--trades', type=int, default=200, help='trades stockés par clé')
+    parser.add_argument('--orders', type=int, default=200, help='ordres de bots par utilisateur')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--http-workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-size', type=int, default=50, help='actifs, symboles et trades servis par le faux exchange')
+    parser.add_argument('--weight-limit', type=int, default=6000, help='poids par minute (faux exchange et API)')
+    # Parts faibles par défaut : la charge mesure l'API, pas l'attente du poids disponible
+    parser.add_argument('--fresh-ratio', type=float, default=0.05, help='part des /balance avec ?fresh=1')
+    parser.add_argument('--sync-ratio', type=float, default=0.01, help='part des /transactions avec ?sync=1')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+    args.endpoints = [name for name in args.endpoints.split(',') if name]
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f'endpoints inconnus : {", ".join(unknown)}')
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    exchange = FakeExchange(args.latency_ms, args.jitter_ms, args.error_rate, args.payload_size, args.weight_limit)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(tmp, exchange.start(), args.weight_limit)
+        db_path = os.path.join(tmp, 'bench.db')
+        tokens = seed(db_path, args)
+
+        context = multiprocessing.get_context('spawn')
+        ready, stop = context.Queue(), context.Event()
+        process = context.Process(target=serve_api, args=(db_path, args.http_workers, ready, stop))
+        process.start()
+        base = f'http://127.0.0.1:{ready.get(timeout=60)}'
+
+        # Premier passage hors mesure : imports paresseux, premier scan, caches
+        for name in args.endpoints:
+            requests.get(base + ENDPOINTS[name], headers={'Authorization': f'Bearer {tokens[0]}'}, timeout=60)
+
+        samples = drive(base, tokens, args)
+        counters = app_counters(base)
+        stop.set()
+        process.join(timeout=30)
+        exchange.stop()
+
+    results = summarize(samples, args.duration, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    results['exchange'] = exchange.stats()
+    results['app'] = counters
+    print(f"Total : {results['rps']} req/s  pic RSS API : {results['peak_rss_mb']} Mo")
+    print('  exchange      ' + '  '.join(f'{key}={value}' for key, value in results['exchange'].items()))
+    print('  api           ' + '  '.join(f'{key}={value}' for key, value in results['app'].items()))
+    for name, values in results['endpoints'].items():
+        print(f'  {name:<14}' + '  '.join(f'{key}={value}' for key, value in values.items()))
+
+    params = {name: getattr(args, name) for name in WORKLOAD_PARAMS}
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'params': params, 'recorded_at': datetime.utcnow().isoformat() + 'Z', **results}, f, indent=2)
+            f.write('\n')
+        print(f'Référence enregistrée dans {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('Aucune référence : relancer avec --save-baseline')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('params') != params:
+        print('Référence obtenue avec d\'autres paramètres : comparaison ignorée')
+        return 0
+    print(f'Comparaison avec {args.baseline} (tolérance {args.tolerance:.0%}) :')
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} régression(s) : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
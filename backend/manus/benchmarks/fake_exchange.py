@@ -0,0 +1,237 @@
+"""Faux exchange compatible Binance pour les bancs d'essai : latence, erreurs et taille réglables.
+
+Sert en local les endpoints appelés par l'API (account, myTrades, klines, tickers 24h et
+prix, premiumIndex) avec des données synthétiques déterministes, l'en-tête
+X-MBX-USED-WEIGHT-1M et des 429 au-delà du poids autorisé par minute, comme Binance.
+Les poids sont repris de la documentation Binance et non du code de l'API, pour que le
+banc d'essai vérifie aussi la régulation.
+
+    python benchmarks/fake_exchange.py --port 9100 --latency-ms 80 --error-rate 0.02
+    BINANCE_API_URL=http://127.0.0.1:9100 BINANCE_FUTURES_API_URL=http://127.0.0.1:9100 python src/main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Actifs détenus (solde non nul) en tête de la liste des soldes
+HELD_ASSETS = 5
+MAJOR_ASSETS = ('BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'DOT')
+INTERVAL_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+
+
+def _weight(path, query):
+    if path in ('/api/v3/account', '/api/v3/myTrades'):
+        return 20
+    if path == '/api/v3/klines':
+        limit = int(query.get('limit', 500))
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path == '/api/v3/ticker/24hr':
+        return 2 if 'symbol' in query else 80
+    if path == '/api/v3/ticker/price':
+        return 2 if 'symbol' in query else 4
+    if path == '/fapi/v1/premiumIndex':
+        return 1 if 'symbol' in query else 10
+    return 1
+
+
+def assets(count):
+    return list(MAJOR_ASSETS[:count]) + [f'TK{i}' for i in range(max(count - len(MAJOR_ASSETS), 0))]
+
+
+def price_of(asset):
+    # Prix stable par actif, indépendant de l'ordre des appels
+    return round(1 + (sum(map(ord, asset)) * 7919 % 50_000) / 7, 4)
+
+
+class FakeExchange:
+    """Serveur HTTP local (un thread par connexion, keep-alive) ; `url` une fois démarré."""
+
+    def __init__(self, latency_ms=50, jitter_ms=10, error_rate=0.0, payload_size=50,
+                 weight_limit=6000, seed=42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.weight_limit = weight_limit
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self._window = None
+        self._used = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    # Données synthétiques
+
+    def account(self, query):
+        balances = [
+            {'asset': asset, 'free': f'{(i + 1) * 0.5:.8f}' if i < HELD_ASSETS else '0.00000000', 'locked': '0.00000000'}
+            for i, asset in enumerate(assets(self.payload_size))
+        ]
+        return {'accountType': 'SPOT', 'canTrade': True, 'balances': balances}
+
+    def my_trades(self, query):
+        symbol = query['symbol']
+        from_id = max(int(query.get('fromId', 0)), 1)
+        limit = int(query.get('limit', 500))
+        last_id = min(from_id + limit - 1, self.payload_size)
+        base_time = int(time.time() * 1000) - self.payload_size * 60_000
+        return [
+            {
+                'symbol': symbol, 'id': trade_id, 'orderId': trade_id * 10,
+                'price': f'{100 + trade_id % 17:.2f}', 'qty': '0.01000000', 'quoteQty': '1.00000000',
+                'commission': '0.00001000', 'commissionAsset': 'BNB',
+                'time': base_time + trade_id * 60_000, 'isBuyer': trade_id % 2 == 0, 'isMaker': trade_id % 3 == 0,
+                'isBestMatch': True
+            }
+            for trade_id in range(from_id, last_id + 1)
+        ]
+
+    def klines(self, query):
+        step = INTERVAL_MS.get(query.get('interval', '1h'), 3_600_000)
+        limit = int(query.get('limit', 500))
+        now = int(time.time() * 1000) // step * step
+        start = int(query['startTime']) // step * step if 'startTime' in query else now - (limit - 1) * step
+        seed = sum(map(ord, query.get('symbol', '')))
+        rows = []
+        for open_time in range(start, min(now, start + (limit - 1) * step) + 1, step):
+            i = open_time // step
+            close = 100 + 10 * ((i * 31 + seed) % 97) / 97
+            rows.append([
+                open_time, f'{close - 0.5:.4f}', f'{close + 1:.4f}', f'{close - 1:.4f}', f'{close:.4f}',
+                '1000.0', open_time + step - 1, '100000.0', 100, '500.0', '50000.0', '0'
+            ])
+        return rows
+
+    def tickers_24hr(self, query):
+        return [
+            {
+                'symbol': f'{asset}USDT', 'lastPrice': str(price_of(asset)),
+                'priceChangePercent': f'{(i % 21) - 10:.2f}', 'quoteVolume': str(5_000_000 + i * 100_000)
+            }
+            for i, asset in enumerate(assets(self.payload_size))
+        ]
+
+    def ticker_prices(self, query):
+        return [{'symbol': f'{asset}USDT', 'price': str(price_of(asset))} for asset in assets(self.payload_size)]
+
+    def premium_index(self, query):
+        next_funding = (int(time.time() * 1000) // 28_800_000 + 1) * 28_800_000
+        return [
+            {
+                'symbol': f'{asset}USDT', 'markPrice': str(price_of(asset)),
+                'lastFundingRate': f'{((i % 9) - 4) * 0.0003:.6f}', 'nextFundingTime': next_funding
+            }
+            for i, asset in enumerate(assets(self.payload_size))
+        ]
+
+    ROUTES = {
+        '/api/v3/account': account,
+        '/api/v3/myTrades': my_trades,
+        '/api/v3/klines': klines,
+        '/api/v3/ticker/24hr': tickers_24hr,
+        '/api/v3/ticker/price': ticker_prices,
+        '/fapi/v1/premiumIndex': premium_index,
+        '/api/v3/ping': lambda self, query: {},
+    }
+
+    def _use_weight(self, weight):
+        """Poids consommé sur la minute courante, ou None si la limite est dépassée."""
+        with self._lock:
+            self.requests += 1
+            window = int(time.time() // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            if self._used + weight > self.weight_limit:
+                self.rejected += 1
+                return None
+            self._used += weight
+            return self._used
+
+    def handle(self, path, query):
+        """(statut, en-têtes, corps) de la réponse à un GET."""
+        route = self.ROUTES.get(path)
+        if route is None:
+            return 404, {}, {'code': -1000, 'msg': 'Unknown endpoint'}
+        used = self._use_weight(_weight(path, query))
+        if used is None:
+            return 429, {'Retry-After': str(60 - int(time.time() % 60))}, {'code': -1003, 'msg': 'Too many requests'}
+
+        with self._lock:
+            delay = max(self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+            failed = self.random.random() < self.error_rate
+        time.sleep(delay)
+        headers = {'X-MBX-USED-WEIGHT-1M': str(used)}
+        if failed:
+            with self._lock:
+                self.errors += 1
+            return 503, headers, {'code': -1001, 'msg': 'Service unavailable'}
+        return 200, headers, route(self, query)
+
+    def start(self, host='127.0.0.1', port=0):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                status, headers, payload = exchange.handle(parts.path, query)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def stats(self):
+        return {'requests': self.requests, 'errors': self.errors, 'rejected_429': self.rejected}
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--payload-size', type=int, default=50)
+    parser.add_argument('--weight-limit', type=int, default=6000)
+    args = parser.parse_args()
+
+    exchange = FakeExchange(args.latency_ms, args.jitter_ms, args.error_rate, args.payload_size, args.weight_limit)
+    print(f'Faux exchange sur {exchange.start(port=args.port)}')
+    try:
+        while True:
+            time.sleep(10)
+            print('  '.join(f'{key}={value}' for key, value in exchange.stats().items()))
+    except KeyboardInterrupt:
+        exchange.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Rafale de connexions : réactivité du reste de l'API avec et sans pool de hachage.
+
+Lance l'API d'authentification sur un serveur local limité à `--http-workers` requêtes
+simultanées (comme des workers gunicorn), envoie `--logins` connexions en parallèle et
+mesure pendant ce temps la latence de /api/health.
+
+    python benchmarks/login_storm.py --logins 200 --concurrency 32 --http-workers 8
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.user import db, User  # noqa: E402
+from src.routes import auth  # noqa: E402
+from src.services.passwords import PasswordHasher  # noqa: E402
+
+PASSWORD = 'TestPassword123!'
+
+
+class LimitedWorkers:
+    """Middleware WSGI : au plus `workers` requêtes traitées à la fois, les autres attendent."""
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.slots = threading.Semaphore(workers)
+
+    def __call__(self, environ, start_response):
+        with self.slots:
+            return list(self.app(environ, start_response))
+
+
+def build_app(db_path, rounds):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['JWT_SECRET_KEY'] = 'benchmark-secret-key-long-enough-for-hs256'
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(auth.auth_bp, url_prefix='/api/auth')
+
+    @app.route('/api/health')
+    def health():
+        return jsonify({'status': 'ok'}), 200
+
+    with app.app_context():
+        db.create_all()
+        hashed = PasswordHasher(workers=0, rounds=rounds).hash(PASSWORD)
+        db.session.add(User(username='storm', email='storm@example.com', password=hashed))
+        db.session.commit()
+    return app
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(mode, args):
+    hasher = PasswordHasher(
+        workers=0 if mode == 'inline' else args.pool_workers,
+        queue_limit=args.queue_limit,
+        rounds=args.rounds
+    )
+    auth.password_hasher = hasher
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'storm.db'), args.rounds)
+        server = make_server('127.0.0.1', 0, LimitedWorkers(app, args.http_workers), threaded=True)
+        base = f'http://127.0.0.1:{server.server_port}'
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # Démarrage du pool hors mesure
+        requests.post(f'{base}/api/auth/login', json={'username': 'storm', 'password': PASSWORD})
+
+        stop = threading.Event()
+        health_latencies = []
+
+        def probe():
+            session = requests.Session()
+            while not stop.is_set():
+                started = time.perf_counter()
+                session.get(f'{base}/api/health')
+                health_latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.02)
+
+        def login(_):
+            response = requests.post(f'{base}/api/auth/login', json={'username': 'storm', 'password': PASSWORD})
+            return response.status_code
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            statuses = list(executor.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+        server.shutdown()
+        hasher.shutdown()
+
+    return {
+        'mode': mode,
+        'elapsed_s': round(elapsed, 2),
+        'logins_ok': statuses.count(200),
+        'logins_503': statuses.count(503),
+        'logins_other': len(statuses) - statuses.count(200) - statuses.count(503),
+        'health_p50_ms': round(statistics.median(health_latencies), 1) if health_latencies else 0,
+        'health_p95_ms': round(percentile(health_latencies, 95), 1),
+        'health_max_ms': round(max(health_latencies), 1) if health_latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--http-workers', type=int, default=8)
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--queue-limit', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--mode', choices=('inline', 'pool', 'both'), default='both')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    modes = ('inline', 'pool') if args.mode == 'both' else (args.mode,)
+    for mode in modes:
+        result = run(mode, args)
+        print('  '.join(f'{key}={value}' for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
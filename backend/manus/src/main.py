@@ -5,63 +5,161 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, request, jsonify
 from flask_cors import CORS
+from flask_jwt_extended import JWTManager
 from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.auth import auth_bp
-from src.routes.portfolio import portfolio_bp
-from src.routes.market import market_bp
-from src.routes.bots import bots_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-CORS(app, resources={r"/api/*": {"origins": "*"}})  # En développement, à restreindre en production
-
-# Secret et config JWT
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'manus_secret_key_change_in_production')
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-
-# Configuration de la base de données SQLite
-db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'manus.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Création des tables au démarrage
-with app.app_context():
-    db.create_all()
-
-# Route santé (healthcheck)
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({"status": "ok", "message": "Manus API is running"}), 200
-
-# Enregistrement des blueprints
-app.register_blueprint(user_bp, url_prefix='/api/users')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
-app.register_blueprint(market_bp, url_prefix='/api/market')
-app.register_blueprint(bots_bp, url_prefix='/api/bots')
-
-# Routing React/static
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    file_path = os.path.join(static_folder_path, path)
-    if path != "" and os.path.exists(file_path):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+from src.services.identity import init_identity
+from src.services.database import database_uri, engine_options, configure_engine, init_database
+from src.services.http_cache import init_http_cache
+from src.services.metrics import init_metrics
+from src.services.static_assets import StaticManifest, asset_response, compress_assets, STATIC_DIR
+
+# Extensions partagées, liées à chaque application par create_app
+cors = CORS()
+jwt = JWTManager()
+# Utilisateur et clés API actives chargés une fois par requête (`current_user`)
+init_identity(jwt)
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'manus.db')
+
+
+def create_app(config=None):
+    """Construit l'application : configuration, extensions et blueprints.
+
+    Aucune requête SQL ni connexion réseau ici : le schéma est créé par `flask init-db`
+    (ou au lancement direct de ce fichier), les tâches de fond ne démarrent que si elles
+    sont activées, et les modules lourds (numpy, requests) sont importés à leur première
+    utilisation par les routes qui en ont besoin.
+    """
+    # Pas de route statique Flask : le build est servi via le manifeste (serve)
+    app = Flask(__name__, static_folder=None)
+
+    # Secret et config JWT
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'manus_secret_key_change_in_production')
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_HEADER_TYPE'] = 'Bearer'
+
+    # Configuration de la base de données : SQLite local par défaut, DATABASE_URL pour Postgres
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(DB_PATH)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['STATIC_DIR'] = STATIC_DIR
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    cors.init_app(app, resources={r"/api/*": {"origins": "*"}})  # En développement, à restreindre en production
+    jwt.init_app(app)
+    db.init_app(app)
+    # Pragmas SQLite appliqués à chaque connexion (le moteur ne se connecte pas encore)
+    with app.app_context():
+        configure_engine(db.engine)
+        # Latence par route, temps et nombre de requêtes SQL par requête HTTP
+        init_metrics(app, db.engine)
+
+    # Inventaire du build React (ETags, variantes compressées), une fois par processus
+    app.extensions['static_manifest'] = StaticManifest(app.config['STATIC_DIR'])
+
+    register_blueprints(app)
+    # ETag / 304 et compression gzip/brotli des réponses JSON de /api
+    init_http_cache(app)
+    register_commands(app)
+    start_background_tasks(app)
+    return app
+
+
+def register_blueprints(app):
+    from src.routes.user import user_bp
+    from src.routes.auth import auth_bp
+    from src.routes.portfolio import portfolio_bp
+    from src.routes.market import market_bp
+    from src.routes.bots import bots_bp
+    from src.routes.stream import stream_bp
+    from src.routes.metrics import metrics_bp
+
+    # Route santé (healthcheck)
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        return jsonify({"status": "ok", "message": "Manus API is running"}), 200
+
+    # Statistiques des pools de connexions vers les exchanges
+    @app.route('/api/health/exchanges', methods=['GET'])
+    def exchange_pool_stats():
+        from src.services.exchange_client import exchange_client
+        from src.services.market_stream import market_stream, market_state
+        return jsonify({
+            "pools": exchange_client.stats(),
+            "rate_limits": exchange_client.rate_limiter.stats(),
+            "circuits": exchange_client.breakers.stats(),
+            "streams": market_stream.stats(),
+            "market_state": {"symbols": len(market_state), "live": market_state.is_live()}
+        }), 200
+
+    # Enregistrement des blueprints
+    app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
+    app.register_blueprint(market_bp, url_prefix='/api/market')
+    app.register_blueprint(bots_bp, url_prefix='/api/bots')
+    app.register_blueprint(stream_bp, url_prefix='/api/stream')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+
+    # Routing React/static : fichiers du manifeste, sinon index.html pour les routes du SPA
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        manifest = app.extensions['static_manifest']
+        asset = manifest.get(path) if path else None
+        if asset is None and path.startswith('static/'):
+            # Fichier versionné absent (ancien build) : pas de index.html à la place d'un script
+            return "File not found", 404
+        asset = asset or manifest.index
+        if asset is None:
             return "index.html not found", 404
+        return asset_response(asset, request.headers.get('Accept-Encoding'))
+
+
+def register_commands(app):
+    # flask --app src.main init-db : tables et index manquants, avant le démarrage des workers
+    @app.cli.command('init-db')
+    def init_db_command():
+        init_database(app)
+        print('Base de données initialisée')
+
+    # flask --app src.main compress-static : variantes .gz/.br du build, à lancer après la copie du build
+    @app.cli.command('compress-static')
+    def compress_static_command():
+        written = compress_assets(app.config['STATIC_DIR'])
+        app.extensions['static_manifest'].build()
+        print(f'{len(written)} fichiers compressés')
+
+
+def start_background_tasks(app):
+    from src.services.scheduler import SCHEDULER_ENABLED
+    from src.services.market_stream import MARKET_STREAM_ENABLED
+
+    # Tâches de fond : à activer (SCHEDULER_ENABLED=1) dans un seul processus
+    if SCHEDULER_ENABLED and not app.testing:
+        from src.services.scheduler import Scheduler
+        from src.services.balances import refresh_snapshots, SNAPSHOT_INTERVAL
+        from src.services.trades import sync_all_trades, TRADE_SYNC_INTERVAL
+        from src.services.scan_cache import scan_cache, SCAN_CACHE_TTL
+
+        scheduler = Scheduler(app)
+        scheduler.add_job('balance_snapshots', refresh_snapshots, SNAPSHOT_INTERVAL)
+        scheduler.add_job('trade_sync', sync_all_trades, TRADE_SYNC_INTERVAL)
+        scheduler.add_job('market_scan', scan_cache.warm, SCAN_CACHE_TTL)
+        scheduler.start()
+        app.extensions['scheduler'] = scheduler
+    # Flux de marché temps réel (MARKET_STREAM_ENABLED=1), également dans un seul processus
+    if MARKET_STREAM_ENABLED and not app.testing:
+        from src.services.market_stream import market_stream
+        market_stream.start()
+
+
+app = create_app()
 
 if __name__ == '__main__':
+    init_database(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
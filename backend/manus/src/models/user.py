@@ -21,6 +21,13 @@ class User(db.Model):
     
     # Relation avec les clés API
     api_keys = db.relationship('ApiKey', backref='user', lazy=True, cascade="all, delete-orphan")
+    # Clés actives seulement, chargées avec l'utilisateur à chaque requête authentifiée
+    active_api_keys = db.relationship(
+        'ApiKey',
+        primaryjoin='and_(User.id == ApiKey.user_id, ApiKey.is_active == True)',
+        viewonly=True,
+        lazy=True
+    )
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -48,6 +55,13 @@ class User(db.Model):
 
 class ApiKey(db.Model):
     __tablename__ = 'api_keys'
+    __table_args__ = (
+        # Clés actives d'un utilisateur, chargées à chaque requête authentifiée
+        db.Index('ix_api_keys_user_active', 'user_id', 'is_active'),
+        # Identifiants jamais réutilisés après suppression : les snapshots et trades d'une
+        # clé supprimée ne peuvent pas être rattachés à la clé d'un autre utilisateur
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -75,3 +89,184 @@ class ApiKey(db.Model):
             'last_used': self.last_used.isoformat() if self.last_used else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class BalanceSnapshot(db.Model):
+    __tablename__ = 'balance_snapshots'
+    __table_args__ = (
+        db.Index('ix_balance_snapshots_api_key_created', 'api_key_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    api_key_id = db.Column(db.Integer, db.ForeignKey('api_keys.id', ondelete='CASCADE'), nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    total_usd = db.Column(db.Float, nullable=False, default=0)
+    assets = db.Column(db.Text, nullable=True)  # {actif: {'amount', 'usd_value'}} en JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<BalanceSnapshot {self.platform} - {self.created_at}>'
+    
+    def set_assets(self, assets):
+        self.assets = json.dumps(assets)
+    
+    def get_assets(self):
+        if self.assets:
+            return json.loads(self.assets)
+        return {}
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'api_key_id': self.api_key_id,
+            'platform': self.platform,
+            'total_usd': self.total_usd,
+            'assets': self.get_assets(),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class Trade(db.Model):
+    __tablename__ = 'trades'
+    __table_args__ = (
+        # Les identifiants de trade Binance sont uniques par symbole
+        db.UniqueConstraint('api_key_id', 'symbol', 'trade_id', name='uq_trades_api_key_symbol_trade'),
+        db.Index('ix_trades_user_time', 'user_id', 'time'),
+        db.Index('ix_trades_user_symbol_time', 'user_id', 'symbol', 'time'),
+        db.Index('ix_trades_user_base_asset_time', 'user_id', 'base_asset', 'time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    api_key_id = db.Column(db.Integer, db.ForeignKey('api_keys.id', ondelete='CASCADE'), nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    trade_id = db.Column(db.BigInteger, nullable=False)  # Identifiant du trade sur l'exchange
+    symbol = db.Column(db.String(30), nullable=False)  # 'BTCUSDT'
+    base_asset = db.Column(db.String(20), nullable=True)  # 'BTC'
+    price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    commission = db.Column(db.Float, nullable=True)
+    commission_asset = db.Column(db.String(20), nullable=True)
+    time = db.Column(db.DateTime, nullable=False)
+    is_buyer = db.Column(db.Boolean, nullable=True)
+    is_maker = db.Column(db.Boolean, nullable=True)
+    
+    def __repr__(self):
+        return f'<Trade {self.platform} {self.symbol} #{self.trade_id}>'
+    
+    def to_dict(self):
+        return {
+            'platform': self.platform,
+            'id': self.trade_id,
+            'symbol': self.symbol,
+            'price': self.price,
+            'quantity': self.quantity,
+            'commission': self.commission,
+            'commission_asset': self.commission_asset,
+            'time': self.time.isoformat() if self.time else None,
+            'is_buyer': self.is_buyer,
+            'is_maker': self.is_maker
+        }
+
+
+class TradeSyncState(db.Model):
+    __tablename__ = 'trade_sync_state'
+    
+    # Dernière synchronisation des trades de chaque clé API
+    api_key_id = db.Column(db.Integer, db.ForeignKey('api_keys.id', ondelete='CASCADE'), primary_key=True)
+    synced_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<TradeSyncState {self.api_key_id} {self.synced_at}>'
+
+
+class BotOrder(db.Model):
+    __tablename__ = 'bot_orders'
+    __table_args__ = (
+        # Un même ordre peut être renvoyé plusieurs fois par le bot (mises à jour de statut)
+        db.UniqueConstraint('user_id', 'bot_id', 'order_id', name='uq_bot_orders_user_bot_order'),
+        db.Index('ix_bot_orders_user_bot_status_created', 'user_id', 'bot_id', 'status', 'created_at'),
+        db.Index('ix_bot_orders_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_bot_orders_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    bot_id = db.Column(db.String(100), nullable=False)  # 'btc_grid_bot'
+    bot_name = db.Column(db.String(100), nullable=True)
+    order_id = db.Column(db.String(100), nullable=False)  # Identifiant de l'ordre sur l'exchange
+    exchange = db.Column(db.String(50), nullable=True)
+    symbol = db.Column(db.String(30), nullable=False)  # 'BTC/USDT'
+    type = db.Column(db.String(20), nullable=True)  # 'limit', 'market'
+    side = db.Column(db.String(10), nullable=False)  # 'buy', 'sell'
+    price = db.Column(db.Float, nullable=True)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # 'open', 'closed', 'canceled', 'error'
+    filled = db.Column(db.Float, nullable=True)
+    remaining = db.Column(db.Float, nullable=True)
+    cost = db.Column(db.Float, nullable=True)
+    fee = db.Column(db.Float, nullable=True)
+    pnl = db.Column(db.Float, nullable=True)
+    pnl_percent = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    closed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<BotOrder {self.bot_id} {self.symbol} #{self.order_id}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.order_id,
+            'bot_id': self.bot_id,
+            'bot_name': self.bot_name,
+            'exchange': self.exchange,
+            'symbol': self.symbol,
+            'type': self.type,
+            'side': self.side,
+            'price': self.price,
+            'amount': self.amount,
+            'status': self.status,
+            'filled': self.filled,
+            'remaining': self.remaining,
+            'cost': self.cost,
+            'fee': self.fee,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None,
+            'closed_at': self.closed_at.isoformat() + 'Z' if self.closed_at else None,
+            'pnl': self.pnl,
+            'pnl_percent': self.pnl_percent
+        }
+
+
+class BotDailyStat(db.Model):
+    __tablename__ = 'bot_daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'bot_id', 'day', name='uq_bot_daily_stats_user_bot_day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    bot_id = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # Jour (UTC) de clôture des ordres
+    bot_name = db.Column(db.String(100), nullable=True)
+    exchange = db.Column(db.String(50), nullable=True)
+    symbol = db.Column(db.String(30), nullable=True)
+    trades = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0)  # Valeur positive
+    pnl = db.Column(db.Float, nullable=False, default=0)
+    cost = db.Column(db.Float, nullable=False, default=0)  # Montant engagé, base des pourcentages
+    
+    def __repr__(self):
+        return f'<BotDailyStat {self.bot_id} {self.day}>'
+    
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat(),
+            'pnl': self.pnl,
+            'pnl_percent': round(self.pnl / self.cost * 100, 2) if self.cost else 0
+        }
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
-import bcrypt
 import pyotp
 import secrets
 from flask_jwt_extended import create_access_token, create_refresh_token
 from src.models.user import db, User
+from src.services.passwords import password_hasher, PasswordHasherBusy
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__)
 
+def busy_response():
+    # Hachage saturé : réponse immédiate plutôt qu'une attente qui bloquerait le worker
+    response = jsonify({'error': 'Service momentanément surchargé, veuillez réessayer'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -31,8 +37,11 @@ def register():
             or not any(c in '!@#$%^&*()_+-=[]{}|;:,.<>?/~`' for c in password)):
         return jsonify({'error': 'Le mot de passe doit contenir au moins 12 caractères, une majuscule, une minuscule, un chiffre et un caractère spécial'}), 400
     
-    # Hashage du mot de passe
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # Hashage du mot de passe (pool de processus dédié)
+    try:
+        hashed_password = password_hasher.hash(password)
+    except PasswordHasherBusy:
+        return busy_response()
     
     # Création de l'utilisateur
     new_user = User(
@@ -56,9 +65,20 @@ def login():
     # Recherche de l'utilisateur
     user = User.query.filter_by(username=data['username']).first()
     
-    # Vérification du mot de passe
-    if not user or not bcrypt.checkpw(data['password'].encode('utf-8'), user.password.encode('utf-8')):
+    # Vérification du mot de passe (pool de processus dédié)
+    if not user:
         return jsonify({'error': 'Identifiants invalides'}), 401
+    try:
+        valid, new_hash = password_hasher.check(data['password'], user.password)
+    except PasswordHasherBusy:
+        return busy_response()
+    if not valid:
+        return jsonify({'error': 'Identifiants invalides'}), 401
+    
+    # Rehachage transparent si le coût bcrypt a changé
+    if new_hash:
+        user.password = new_hash
+        db.session.commit()
     
     if not user.is_active:
         return jsonify({'error': 'Compte désactivé'}), 403
@@ -72,8 +92,8 @@ def login():
         }), 200
     
     # Génération des tokens
-    access_token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))
-    refresh_token = create_refresh_token(identity=user.id)
+    access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(hours=1))
+    refresh_token = create_refresh_token(identity=str(user.id))
     
     return jsonify({
         'message': 'Connexion réussie',
@@ -107,8 +127,8 @@ def verify_2fa():
             return jsonify({'error': 'Code invalide'}), 401
     
     # Génération des tokens
-    access_token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))
-    refresh_token = create_refresh_token(identity=user.id)
+    access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(hours=1))
+    refresh_token = create_refresh_token(identity=str(user.id))
     
     return jsonify({
         'message': 'Authentification réussie',
@@ -0,0 +1,22 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+from src.services.metrics import metrics, METRICS_TOKEN
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Format texte Prometheus, agrégé sur tous les workers ; ?format=json pour les quantiles estimés
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    if not METRICS_TOKEN:
+        # Sans jeton configuré, les métriques (routes, volumes, erreurs) ne sont pas publiques
+        if not current_app.testing:
+            return jsonify({'error': 'Métriques désactivées : METRICS_TOKEN non défini'}), 403
+    else:
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(token, METRICS_TOKEN):
+            return jsonify({'error': 'Accès refusé'}), 401
+
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary()), 200
+
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,26 +1,37 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.user import db, User, ApiKey
-import os
-from cryptography.fernet import Fernet
-import requests
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
+from src.models.user import db, ApiKey, BalanceSnapshot, Trade, TradeSyncState
+from src.services.credentials import credential_service
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from src.services.exchange_client import exchange_client, BINANCE_API_URL
+from src.services.balances import (
+    fetch_live_balances, store_snapshots, latest_snapshots, snapshot_entry, is_recent,
+    build_balance, balance_history, change_since
+)
+from src.services.trades import sync_key_trades, needs_sync, trades_query, latest_trade_id
+from src.services.http_cache import not_modified
+from src.services.metrics import metrics
+from src.services.prices import price_oracle
+from src.services.pagination import keyset_filter, keyset_page, page_size
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
-# Clé de chiffrement pour les clés API (en production, utiliser une variable d'environnement)
-ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', 'votre_clé_de_chiffrement_à_remplacer_en_production')
-cipher_suite = Fernet(ENCRYPTION_KEY.encode() if len(ENCRYPTION_KEY) == 32 else Fernet.generate_key())
+# Périodes et pas acceptés pour l'historique du portefeuille
+HISTORY_PERIODS = {
+    '1d': timedelta(days=1),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '90d': timedelta(days=90),
+    '1y': timedelta(days=365),
+    'all': None
+}
+HISTORY_INTERVALS = {'5m': 300, '1h': 3600, '4h': 14400, '1d': 86400}
 
 @portfolio_bp.route('/api-keys', methods=['GET'])
 @jwt_required()
 def get_api_keys():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'Utilisateur non trouvé'}), 404
+    user_id = current_user.id
     
     api_keys = ApiKey.query.filter_by(user_id=user_id).all()
     return jsonify({
@@ -30,11 +41,7 @@ def get_api_keys():
 @portfolio_bp.route('/api-keys', methods=['POST'])
 @jwt_required()
 def add_api_key():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'Utilisateur non trouvé'}), 404
+    user_id = current_user.id
     
     data = request.get_json()
     
@@ -43,13 +50,13 @@ def add_api_key():
         return jsonify({'error': 'Données incomplètes'}), 400
     
     # Chiffrement des clés API
-    encrypted_api_key = cipher_suite.encrypt(data['api_key'].encode()).decode()
-    encrypted_api_secret = cipher_suite.encrypt(data['api_secret'].encode()).decode()
+    encrypted_api_key = credential_service.encrypt(data['api_key'])
+    encrypted_api_secret = credential_service.encrypt(data['api_secret'])
     
     # Chiffrement de la passphrase si fournie
     encrypted_passphrase = None
     if data.get('passphrase'):
-        encrypted_passphrase = cipher_suite.encrypt(data['passphrase'].encode()).decode()
+        encrypted_passphrase = credential_service.encrypt(data['passphrase'])
     
     # Création de la clé API
     new_api_key = ApiKey(
@@ -64,16 +71,16 @@ def add_api_key():
     
     # Test de connexion à l'API
     try:
-        # Déchiffrement pour le test
-        api_key = cipher_suite.decrypt(encrypted_api_key.encode()).decode()
-        api_secret = cipher_suite.decrypt(encrypted_api_secret.encode()).decode()
+        # Les identifiants en clair sont déjà disponibles dans la requête
+        api_key = data['api_key']
+        api_secret = data['api_secret']
         
         # Logique de test selon la plateforme
         if data['platform'] == 'binance':
             # Test de connexion à l'API Binance
             # En production, utiliser une bibliothèque comme python-binance
-            response = requests.get(
-                'https://api.binance.com/api/v3/account',
+            response = exchange_client.get(
+                f'{BINANCE_API_URL}/api/v3/account',
                 params={'timestamp': int(datetime.now().timestamp() * 1000)},
                 headers={'X-MBX-APIKEY': api_key}
                 # En production, ajouter la signature HMAC
@@ -102,12 +109,15 @@ def add_api_key():
 @portfolio_bp.route('/api-keys/<int:key_id>', methods=['DELETE'])
 @jwt_required()
 def delete_api_key(key_id):
-    user_id = get_jwt_identity()
-    
-    api_key = ApiKey.query.filter_by(id=key_id, user_id=user_id).first()
+    # Clés inactives comprises : elles ne figurent pas dans `current_user.active_api_keys`
+    api_key = ApiKey.query.filter_by(id=key_id, user_id=current_user.id).first()
     if not api_key:
         return jsonify({'error': 'Clé API non trouvée ou non autorisée'}), 404
     
+    # Historique de la clé supprimé avec elle, même sans ON DELETE CASCADE effectif
+    BalanceSnapshot.query.filter_by(api_key_id=api_key.id).delete(synchronize_session=False)
+    Trade.query.filter_by(api_key_id=api_key.id).delete(synchronize_session=False)
+    TradeSyncState.query.filter_by(api_key_id=api_key.id).delete(synchronize_session=False)
     db.session.delete(api_key)
     db.session.commit()
     
@@ -116,99 +126,91 @@ def delete_api_key(key_id):
 @portfolio_bp.route('/balance', methods=['GET'])
 @jwt_required()
 def get_balance():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'Utilisateur non trouvé'}), 404
-    
-    # Récupération des clés API de l'utilisateur
-    api_keys = ApiKey.query.filter_by(user_id=user_id, is_active=True).all()
+    # Clés API actives, chargées avec l'utilisateur
+    api_keys = current_user.active_api_keys
     
     if not api_keys:
         return jsonify({'error': 'Aucune clé API configurée'}), 400
     
-    # Initialisation des résultats
-    total_balance = 0
-    assets = {}
-    balances_by_platform = {}
+    # Par défaut, on sert le dernier snapshot en base ; ?fresh=1 force l'appel aux exchanges
+    fresh = request.args.get('fresh') in ('1', 'true')
+    snapshots = latest_snapshots([api_key.id for api_key in api_keys])
     
-    # Pour chaque clé API, récupérer les soldes
+    entries = {}
+    to_fetch = []
     for api_key in api_keys:
-        try:
-            # Déchiffrement des clés
-            decrypted_api_key = cipher_suite.decrypt(api_key.api_key.encode()).decode()
-            decrypted_api_secret = cipher_suite.decrypt(api_key.api_secret.encode()).decode()
-            
-            platform_balance = 0
-            platform_assets = {}
-            
-            # Logique selon la plateforme
-            if api_key.platform == 'binance':
-                # En production, utiliser une bibliothèque comme python-binance
-                # Exemple simplifié
-                response = requests.get(
-                    'https://api.binance.com/api/v3/account',
-                    params={'timestamp': int(datetime.now().timestamp() * 1000)},
-                    headers={'X-MBX-APIKEY': decrypted_api_key}
-                    # En production, ajouter la signature HMAC
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for balance in data.get('balances', []):
-                        asset = balance['asset']
-                        free = float(balance['free'])
-                        locked = float(balance['locked'])
-                        total = free + locked
-                        
-                        if total > 0:
-                            # Conversion en USD (à implémenter avec des prix réels)
-                            usd_value = total * 1  # Placeholder
-                            
-                            platform_assets[asset] = {
-                                'amount': total,
-                                'usd_value': usd_value
-                            }
-                            platform_balance += usd_value
-                            
-                            # Agrégation globale
-                            if asset in assets:
-                                assets[asset]['amount'] += total
-                                assets[asset]['usd_value'] += usd_value
-                            else:
-                                assets[asset] = {
-                                    'amount': total,
-                                    'usd_value': usd_value
-                                }
-            
-            # Autres plateformes...
-            
-            balances_by_platform[api_key.platform] = {
-                'total_usd': platform_balance,
-                'assets': platform_assets
-            }
-            
-            total_balance += platform_balance
-            
-        except Exception as e:
-            # Log l'erreur mais continuer avec les autres clés API
-            print(f"Erreur lors de la récupération des soldes pour {api_key.platform}: {str(e)}")
+        snapshot = snapshots.get(api_key.id)
+        if not fresh and snapshot is not None and is_recent(snapshot):
+            entries[api_key.id] = snapshot_entry(snapshot)
+        else:
+            to_fetch.append(api_key)
+    
+    # Tout est servi depuis les snapshots : l'ETag dépend de leurs identifiants, pas du corps
+    # (dont l'âge des prix change à chaque appel)
+    if not to_fetch:
+        status = price_oracle.status()
+        cached = not_modified(
+            'balance', [(api_key.id, snapshots[api_key.id].id) for api_key in api_keys],
+            status['stale'], status['live']
+        )
+        if cached is not None:
+            return cached
+    
+    if to_fetch:
+        live_entries = fetch_live_balances(to_fetch)
+        store_snapshots(to_fetch, live_entries)
+        for api_key in to_fetch:
+            entry = live_entries[api_key.id]
+            snapshot = snapshots.get(api_key.id)
+            if entry['status'] != 'ok' and snapshot is not None:
+                # Exchange indisponible : dernière valeur connue
+                entry = snapshot_entry(snapshot, status='stale')
+            entries[api_key.id] = entry
+    
+    balance = build_balance([entries[api_key.id] for api_key in api_keys])
+    balance['source'] = 'live' if len(to_fetch) == len(api_keys) else ('snapshot' if not to_fetch else 'mixed')
+    
+    return jsonify(balance), 200
+
+@portfolio_bp.route('/balance/history', methods=['GET'])
+@portfolio_bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_balance_history():
+    user_id = current_user.id
+    
+    # Paramètres : période couverte et pas de la série
+    period = request.args.get('period', '30d')
+    interval = request.args.get('interval', '1h')
+    if period not in HISTORY_PERIODS or interval not in HISTORY_INTERVALS:
+        return jsonify({'error': 'Période ou intervalle invalide'}), 400
+    
+    api_key_ids = [api_key.id for api_key in ApiKey.query.filter_by(user_id=user_id).all()]
+    if not api_key_ids:
+        return jsonify({'data': []}), 200
+    
+    # Début de période aligné sur le pas pour obtenir des points réguliers
+    bucket_seconds = HISTORY_INTERVALS[interval]
+    now = datetime.utcnow()
+    period_start = now - HISTORY_PERIODS[period] if HISTORY_PERIODS[period] else datetime(2000, 1, 1)
+    epoch = datetime(1970, 1, 1)
+    start = epoch + timedelta(
+        seconds=int((period_start - epoch).total_seconds() // bucket_seconds) * bucket_seconds
+    )
+    
+    points = balance_history(api_key_ids, start, bucket_seconds)
     
     return jsonify({
-        'total_balance_usd': total_balance,
-        'assets': assets,
-        'platforms': balances_by_platform
+        'data': points,
+        'daily_change': change_since(points, timedelta(days=1)),
+        'weekly_change': change_since(points, timedelta(days=7)),
+        'monthly_change': change_since(points, timedelta(days=30))
     }), 200
 
 @portfolio_bp.route('/transactions', methods=['GET'])
 @jwt_required()
 def get_transactions():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'Utilisateur non trouvé'}), 404
+    user = current_user
+    user_id = user.id
     
     # Paramètres de filtrage
     platform = request.args.get('platform')
@@ -216,71 +218,60 @@ def get_transactions():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    # Récupération des clés API de l'utilisateur
-    query = ApiKey.query.filter_by(user_id=user_id, is_active=True)
-    if platform:
-        query = query.filter_by(platform=platform)
-    api_keys = query.all()
+    # Clés API actives, chargées avec l'utilisateur
+    api_keys = [api_key for api_key in user.active_api_keys if not platform or api_key.platform == platform]
     
     if not api_keys:
         return jsonify({'error': 'Aucune clé API configurée'}), 400
     
-    # Initialisation des résultats
-    transactions = []
-    
-    # Pour chaque clé API, récupérer les transactions
+    # Les trades sont servis depuis la base locale, synchronisée par le planificateur ; une clé
+    # jamais synchronisée ou en retard l'est ici, et ?sync=1 force une synchronisation incrémentale
+    force = request.args.get('sync') in ('1', 'true')
     for api_key in api_keys:
-        try:
-            # Déchiffrement des clés
-            decrypted_api_key = cipher_suite.decrypt(api_key.api_key.encode()).decode()
-            decrypted_api_secret = cipher_suite.decrypt(api_key.api_secret.encode()).decode()
-            
-            # Logique selon la plateforme
-            if api_key.platform == 'binance':
-                # En production, utiliser une bibliothèque comme python-binance
-                # Exemple simplifié
-                params = {'timestamp': int(datetime.now().timestamp() * 1000)}
-                
-                # Ajout des filtres
-                if asset:
-                    params['symbol'] = asset
-                if start_date:
-                    params['startTime'] = int(datetime.fromisoformat(start_date).timestamp() * 1000)
-                if end_date:
-                    params['endTime'] = int(datetime.fromisoformat(end_date).timestamp() * 1000)
-                
-                response = requests.get(
-                    'https://api.binance.com/api/v3/myTrades',
-                    params=params,
-                    headers={'X-MBX-APIKEY': decrypted_api_key}
-                    # En production, ajouter la signature HMAC
-                )
-                
-                if response.status_code == 200:
-                    platform_transactions = response.json()
-                    for tx in platform_transactions:
-                        transactions.append({
-                            'platform': api_key.platform,
-                            'id': tx['id'],
-                            'symbol': tx['symbol'],
-                            'price': float(tx['price']),
-                            'quantity': float(tx['qty']),
-                            'commission': float(tx['commission']),
-                            'commission_asset': tx['commissionAsset'],
-                            'time': datetime.fromtimestamp(tx['time'] / 1000).isoformat(),
-                            'is_buyer': tx['isBuyer'],
-                            'is_maker': tx['isMaker']
-                        })
-            
-            # Autres plateformes...
-            
-        except Exception as e:
-            # Log l'erreur mais continuer avec les autres clés API
-            print(f"Erreur lors de la récupération des transactions pour {api_key.platform}: {str(e)}")
-    
-    # Tri des transactions par date
-    transactions.sort(key=lambda x: x['time'], reverse=True)
+        if force or needs_sync(api_key):
+            try:
+                sync_key_trades(api_key)
+            except Exception as e:
+                db.session.rollback()
+                # Log l'erreur mais continuer avec les autres clés API
+                print(f"Erreur lors de la synchronisation des transactions pour {api_key.platform}: {str(e)}")
+                metrics.inc('manus_errors_total', {'source': 'trade_sync'})
+    
+    # Aucun trade ajouté depuis la dernière réponse du client : 304 sans requête ni sérialisation
+    if request.args.get('format') != 'ndjson':
+        cached = not_modified('transactions', [api_key.id for api_key in api_keys], latest_trade_id(user_id))
+        if cached is not None:
+            return cached
+    
+    try:
+        query = trades_query(
+            user_id, [api_key.id for api_key in api_keys],
+            platform=platform, asset=asset, start_date=start_date, end_date=end_date
+        )
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+    
+    # Pagination par curseur sur (date, id), du plus récent au plus ancien
+    cursor = request.args.get('cursor')
+    try:
+        limit = page_size(request.args.get('limit'))
+        query = keyset_filter(query, Trade.time, Trade.id, cursor)
+    except ValueError:
+        return jsonify({'error': 'Paramètres de pagination invalides'}), 400
+    
+    # Mode flux : une transaction JSON par ligne, sans charger tout l'historique en mémoire
+    if request.args.get('format') == 'ndjson':
+        rows = query.order_by(Trade.time.desc(), Trade.id.desc()).yield_per(500)
+        
+        def generate():
+            for trade in rows:
+                yield json.dumps(trade.to_dict()) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    trades, next_cursor = keyset_page(query, Trade.time, Trade.id, limit=limit)
     
     return jsonify({
-        'transactions': transactions
+        'transactions': [trade.to_dict() for trade in trades],
+        'next_cursor': next_cursor
     }), 200
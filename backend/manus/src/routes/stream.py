@@ -0,0 +1,111 @@
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, current_user
+from src.models.user import db
+from src.services.events import event_bus
+import json
+import os
+import threading
+import time
+
+stream_bp = Blueprint('stream', __name__)
+
+# Intervalle des commentaires de maintien de connexion (secondes)
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', '15'))
+# Durée maximale d'une connexion : le navigateur se reconnecte seul avec Last-Event-ID
+SSE_MAX_DURATION = float(os.getenv('SSE_MAX_DURATION', '300'))
+# Délai de reconnexion suggéré au client (millisecondes)
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '3000'))
+# Connexions SSE simultanées par worker (0 : sans limite) : chacune occupe un thread du worker,
+# la limite doit rester inférieure à `--threads` pour laisser des threads aux autres requêtes
+SSE_MAX_CONNECTIONS = int(os.getenv('SSE_MAX_CONNECTIONS', '20'))
+
+STREAM_TOPICS = {'balance', 'opportunities', 'bot_order'}
+
+
+def format_event(event_id, topic, data):
+    return f"id: {event_bus.event_id(event_id)}\nevent: {topic}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class ConnectionLimit:
+    """Nombre de flux ouverts dans le worker, borné par `SSE_MAX_CONNECTIONS`."""
+
+    def __init__(self):
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if SSE_MAX_CONNECTIONS and self.active >= SSE_MAX_CONNECTIONS:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+# Instance partagée par les requêtes du worker
+stream_connections = ConnectionLimit()
+
+
+# EventSource ne permet pas d'envoyer d'en-tête : le jeton est aussi accepté en paramètre (?jwt=...)
+@stream_bp.route('', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    user_id = current_user.id
+
+    topics = request.args.get('topics')
+    if topics:
+        topics = set(topics.split(',')) & STREAM_TOPICS
+        if not topics:
+            return jsonify({'error': 'Aucun type d\'événement valide'}), 400
+    else:
+        topics = None
+
+    # Reprise : en-tête envoyé par le navigateur lors d'une reconnexion, ou paramètre explicite
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = event_bus.parse_event_id(last_event_id) if last_event_id else event_bus.last_id
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID invalide'}), 400
+    # Identifiant d'un autre worker ou d'avant un redémarrage : sa position ne veut rien dire ici
+    foreign = last_id is None
+    if foreign:
+        last_id = event_bus.last_id
+
+    # La connexion reste ouverte plusieurs minutes : on rend la connexion SQL au pool
+    db.session.close()
+
+    # Chaque flux occupe un thread du worker : au-delà de la limite, le client réessaie plus tard
+    if not stream_connections.acquire():
+        response = jsonify({'error': 'Trop de flux ouverts, réessayez plus tard'})
+        response.headers['Retry-After'] = str(max(SSE_RETRY_MS // 1000, 1))
+        return response, 503
+
+    def generate(last_id):
+        started = time.monotonic()
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        if foreign:
+            # Position de reprise inconnue : le client recharge l'état complet
+            yield format_event(last_id, 'reset', {})
+        while time.monotonic() - started < SSE_MAX_DURATION:
+            events, cursor = event_bus.since(last_id, user_id, topics)
+            if events is None:
+                # Événements manqués hors du tampon : le client recharge l'état complet
+                yield format_event(cursor, 'reset', {})
+            else:
+                for event in events:
+                    yield format_event(event.id, event.topic, event.data)
+            last_id = cursor
+            if not event_bus.wait(last_id, SSE_HEARTBEAT):
+                yield ": heartbeat\n\n"
+
+    response = Response(
+        generate(last_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Libéré à la fermeture de la réponse, y compris si le client se déconnecte avant le premier octet
+    response.call_on_close(stream_connections.release)
+    return response
@@ -0,0 +1,311 @@
+import os
+from datetime import datetime, timedelta
+from functools import partial
+
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db, ApiKey, BalanceSnapshot
+from src.services.credentials import credential_service
+from src.services.events import event_bus
+from src.services.metrics import metrics
+from src.services.exchanges import fetch_balances
+from src.services.parallel import run_parallel
+from src.services.prices import price_oracle
+
+# Intervalle de rafraîchissement des snapshots par le planificateur (secondes)
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', '300'))
+# Au-delà de cet âge, /balance interroge de nouveau l'exchange (secondes)
+SNAPSHOT_MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', str(SNAPSHOT_INTERVAL * 2)))
+# Durée de conservation de l'historique (jours)
+SNAPSHOT_RETENTION_DAYS = int(os.getenv('SNAPSHOT_RETENTION_DAYS', '365'))
+# Nombre de clés interrogées par lot lors d'un rafraîchissement global
+SNAPSHOT_BATCH_SIZE = int(os.getenv('SNAPSHOT_BATCH_SIZE', '50'))
+
+
+def value_assets(amounts):
+    """Valorise {actif: quantité} en USD à partir du cache de prix (sans appel réseau)."""
+    assets = {}
+    total_usd = 0
+    for asset, amount in amounts.items():
+        price = price_oracle.usd_price(asset)
+        usd_value = amount * price if price is not None else 0
+        assets[asset] = {'amount': amount, 'usd_value': usd_value}
+        total_usd += usd_value
+    return assets, total_usd
+
+
+def fetch_live_balances(api_keys, deadline=None):
+    """Interroge les exchanges en parallèle ; renvoie une entrée valorisée par clé API."""
+    tasks = {}
+    for api_key in api_keys:
+        try:
+            credentials = credential_service.get(api_key)
+        except Exception as e:
+            print(f"Erreur lors du déchiffrement de la clé {api_key.platform}: {str(e)}")
+            continue
+        tasks[api_key.id] = partial(
+            fetch_balances, api_key.platform, credentials.api_key, credentials.api_secret
+        )
+
+    # Rafraîchissement groupé des prix en même temps que les soldes, si le cache a expiré
+    if price_oracle.is_stale():
+        tasks['prices'] = price_oracle.refresh
+
+    results = run_parallel(tasks, deadline)
+    now = datetime.utcnow()
+
+    entries = {}
+    for api_key in api_keys:
+        outcome = results.get(api_key.id, {
+            'status': 'error', 'latency_ms': 0, 'result': None, 'error': 'Déchiffrement impossible'
+        })
+        if outcome['status'] != 'ok':
+            # Log l'erreur mais continuer avec les autres clés API
+            print(f"Erreur lors de la récupération des soldes pour {api_key.platform}: {outcome['error']}")
+            metrics.inc('manus_errors_total', {'source': 'balances'})
+
+        assets, total_usd = value_assets(outcome['result'] or {})
+        entries[api_key.id] = {
+            'platform': api_key.platform,
+            'total_usd': total_usd,
+            'assets': assets,
+            'status': outcome['status'],
+            'latency_ms': outcome['latency_ms'],
+            'as_of': now
+        }
+    return entries
+
+
+def existing_key_ids(api_keys):
+    """Identifiants des clés encore présentes en base pour leur propriétaire.
+
+    Le cache des identités d'un autre worker peut servir pendant `IDENTITY_CACHE_TTL`
+    secondes une clé déjà supprimée : rien ne doit être écrit pour elle.
+    """
+    if not api_keys:
+        return set()
+    owners = {api_key.id: api_key.user_id for api_key in api_keys}
+    rows = db.session.query(ApiKey.id, ApiKey.user_id).filter(ApiKey.id.in_(owners))
+    return {key_id for key_id, user_id in rows if owners[key_id] == user_id}
+
+
+def store_snapshots(api_keys, entries):
+    # Seules les lectures réussies de clés toujours existantes sont historisées
+    existing = existing_key_ids(api_keys)
+    previous = latest_snapshots([api_key.id for api_key in api_keys])
+    deltas = []
+    for api_key in api_keys:
+        entry = entries.get(api_key.id)
+        if entry is None or entry['status'] != 'ok' or api_key.id not in existing:
+            continue
+        delta = balance_delta(previous.get(api_key.id), entry)
+        if delta is not None:
+            deltas.append((api_key, delta))
+        snapshot = BalanceSnapshot(
+            user_id=api_key.user_id,
+            api_key_id=api_key.id,
+            platform=api_key.platform,
+            total_usd=entry['total_usd'],
+            created_at=entry['as_of']
+        )
+        snapshot.set_assets(entry['assets'])
+        db.session.add(snapshot)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        # Clé supprimée entre la vérification et l'écriture : le solde est servi sans être historisé
+        db.session.rollback()
+        print(f"Snapshots ignorés, clé API supprimée entre-temps : {str(e.orig)}")
+        metrics.inc('manus_errors_total', {'source': 'balances'})
+        return
+
+    # Notification des abonnés SSE, une fois les snapshots enregistrés
+    for api_key, delta in deltas:
+        event_bus.publish('balance', {
+            'api_key_id': api_key.id,
+            'platform': api_key.platform,
+            'total_usd': entries[api_key.id]['total_usd'],
+            'as_of': entries[api_key.id]['as_of'].isoformat() + 'Z',
+            **delta
+        }, user_id=api_key.user_id)
+
+
+def balance_delta(snapshot, entry):
+    """Actifs dont la quantité a changé depuis le snapshot précédent ; None si aucun."""
+    before = snapshot.get_assets() if snapshot is not None else {}
+    after = entry['assets']
+    changed = {
+        asset: values for asset, values in after.items()
+        if asset not in before or before[asset]['amount'] != values['amount']
+    }
+    removed = [asset for asset in before if asset not in after]
+    if not changed and not removed:
+        return None
+    return {'changed': changed, 'removed': removed}
+
+
+def _owned_by_key_user(query):
+    # Snapshots du propriétaire actuel de la clé seulement (bases créées avant
+    # sqlite_autoincrement : un identifiant de clé supprimée peut avoir été réattribué)
+    return query.join(ApiKey, and_(
+        ApiKey.id == BalanceSnapshot.api_key_id, ApiKey.user_id == BalanceSnapshot.user_id
+    ))
+
+
+def latest_snapshots(api_key_ids):
+    """Dernier snapshot de chaque clé, en une requête indexée."""
+    if not api_key_ids:
+        return {}
+    latest_ids = (
+        _owned_by_key_user(db.session.query(func.max(BalanceSnapshot.id)))
+        .filter(BalanceSnapshot.api_key_id.in_(api_key_ids))
+        .group_by(BalanceSnapshot.api_key_id)
+    )
+    snapshots = BalanceSnapshot.query.filter(BalanceSnapshot.id.in_(latest_ids)).all()
+    return {snapshot.api_key_id: snapshot for snapshot in snapshots}
+
+
+def snapshot_entry(snapshot, status='ok'):
+    return {
+        'platform': snapshot.platform,
+        'total_usd': snapshot.total_usd,
+        'assets': snapshot.get_assets(),
+        'status': status,
+        'latency_ms': 0,
+        'as_of': snapshot.created_at
+    }
+
+
+def is_recent(snapshot, max_age=None):
+    if max_age is None:
+        max_age = SNAPSHOT_MAX_AGE
+    return datetime.utcnow() - snapshot.created_at <= timedelta(seconds=max_age)
+
+
+def build_balance(entries):
+    """Agrège les entrées par clé en un solde global, par actif et par plateforme."""
+    total_balance = 0
+    assets = {}
+    balances_by_platform = {}
+
+    for entry in entries:
+        for asset, values in entry['assets'].items():
+            if asset in assets:
+                assets[asset]['amount'] += values['amount']
+                assets[asset]['usd_value'] += values['usd_value']
+            else:
+                assets[asset] = dict(values)
+
+        _merge_platform_balance(balances_by_platform, entry['platform'], {
+            'total_usd': entry['total_usd'],
+            'assets': {asset: dict(values) for asset, values in entry['assets'].items()},
+            'status': entry['status'],
+            'latency_ms': entry['latency_ms'],
+            'as_of': entry['as_of'].isoformat() + 'Z'
+        })
+        total_balance += entry['total_usd']
+
+    return {
+        'total_balance_usd': total_balance,
+        'assets': assets,
+        'platforms': balances_by_platform,
+        'partial': any(p['status'] != 'ok' for p in balances_by_platform.values()),
+        'prices': price_oracle.status()
+    }
+
+
+def _merge_platform_balance(balances_by_platform, platform, entry):
+    # Plusieurs clés peuvent pointer vers la même plateforme : on cumule les montants
+    existing = balances_by_platform.get(platform)
+    if existing is None:
+        balances_by_platform[platform] = entry
+        return
+
+    existing['total_usd'] += entry['total_usd']
+    for asset, values in entry['assets'].items():
+        if asset in existing['assets']:
+            existing['assets'][asset]['amount'] += values['amount']
+            existing['assets'][asset]['usd_value'] += values['usd_value']
+        else:
+            existing['assets'][asset] = values
+    existing['latency_ms'] = max(existing['latency_ms'], entry['latency_ms'])
+    existing['as_of'] = min(existing['as_of'], entry['as_of'])
+    if existing['status'] != entry['status']:
+        existing['status'] = 'partial'
+
+
+def refresh_snapshots():
+    """Rafraîchit le snapshot de toutes les clés actives (tâche planifiée)."""
+    last_id = 0
+    while True:
+        api_keys = (
+            ApiKey.query.filter(ApiKey.is_active.is_(True), ApiKey.id > last_id)
+            .order_by(ApiKey.id)
+            .limit(SNAPSHOT_BATCH_SIZE)
+            .all()
+        )
+        if not api_keys:
+            break
+        store_snapshots(api_keys, fetch_live_balances(api_keys))
+        last_id = api_keys[-1].id
+
+    # Purge de l'historique trop ancien
+    cutoff = datetime.utcnow() - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    BalanceSnapshot.query.filter(BalanceSnapshot.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def balance_history(api_key_ids, start, bucket_seconds):
+    """Série temporelle de la valeur totale, un point par intervalle.
+
+    Pour chaque intervalle on retient la dernière valeur connue de chaque clé, les
+    clés sans snapshot dans l'intervalle gardant leur valeur précédente.
+    """
+    rows = (
+        _owned_by_key_user(
+            db.session.query(BalanceSnapshot.api_key_id, BalanceSnapshot.created_at, BalanceSnapshot.total_usd)
+        )
+        .filter(BalanceSnapshot.api_key_id.in_(api_key_ids), BalanceSnapshot.created_at >= start)
+        .order_by(BalanceSnapshot.created_at)
+        .yield_per(1000)
+    )
+
+    points = []
+    current = {}
+    bucket = None
+    for api_key_id, created_at, total_usd in rows:
+        row_bucket = int((created_at - start).total_seconds() // bucket_seconds)
+        if bucket is not None and row_bucket != bucket:
+            points.append(_history_point(start, bucket, bucket_seconds, current, points))
+        bucket = row_bucket
+        current[api_key_id] = total_usd
+    if bucket is not None:
+        points.append(_history_point(start, bucket, bucket_seconds, current, points))
+    return points
+
+
+def _history_point(start, bucket, bucket_seconds, current, points):
+    value = sum(current.values())
+    previous = points[-1]['value'] if points else value
+    return {
+        'date': (start + timedelta(seconds=bucket * bucket_seconds)).isoformat() + 'Z',
+        'value': value,
+        'change': value - previous
+    }
+
+
+def change_since(points, delta):
+    """Variation entre le dernier point et la valeur connue `delta` plus tôt."""
+    if not points:
+        return {'value': 0, 'percent': 0}
+    last = points[-1]
+    threshold = (datetime.fromisoformat(last['date'].rstrip('Z')) - delta).isoformat() + 'Z'
+    reference = points[0]
+    for point in points:
+        if point['date'] > threshold:
+            break
+        reference = point
+    value = last['value'] - reference['value']
+    percent = (value / reference['value'] * 100) if reference['value'] else 0
+    return {'value': value, 'percent': percent}
@@ -0,0 +1,308 @@
+import copy
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+# Répertoire des journaux des bots (un sous-répertoire par utilisateur et par bot)
+BOT_LOG_DIR = os.getenv(
+    'BOT_LOG_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'bot_logs')
+)
+# Nombre de lignes par segment avant d'en ouvrir un nouveau
+BOT_LOG_SEGMENT_LINES = int(os.getenv('BOT_LOG_SEGMENT_LINES', '10000'))
+# Une entrée d'index (horodatage, position) toutes les N lignes
+BOT_LOG_INDEX_INTERVAL = int(os.getenv('BOT_LOG_INDEX_INTERVAL', '100'))
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+_BOT_ID = re.compile(r'^[A-Za-z0-9_.-]{1,100}$')
+
+
+def to_ms(value):
+    # datetime UTC naïf -> millisecondes
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def decode_line(raw):
+    # Ligne illisible (écriture interrompue par un arrêt brutal) : ignorée
+    try:
+        line = json.loads(raw)
+        return line if isinstance(line, dict) and 't' in line and 'l' in line else None
+    except ValueError:
+        return None
+
+
+def format_entry(ts, level, message):
+    return {
+        'timestamp': datetime.fromtimestamp(ts / 1000, tz=timezone.utc).replace(tzinfo=None).isoformat() + 'Z',
+        'level': level,
+        'message': message
+    }
+
+
+class SegmentSummary:
+    """Résumé d'un segment : bornes temporelles, nombre de lignes par niveau et index clairsemé.
+
+    L'index associe, toutes les `interval` lignes, le plus grand horodatage vu jusque-là
+    (croissant même si quelques lignes arrivent dans le désordre) à la position de la ligne.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.size = 0
+        self.lines = 0
+        self.min_ts = None
+        self.max_ts = None
+        self.levels = {}
+        self.index_ts = []
+        self.index_offsets = []
+
+    def add(self, ts, level, offset, length):
+        if self.lines % self.interval == 0:
+            self.index_ts.append(max(ts, self.max_ts or ts))
+            self.index_offsets.append(offset)
+        self.lines += 1
+        self.size = offset + length
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        self.levels[level] = self.levels.get(level, 0) + 1
+
+    def blocks(self):
+        """Blocs (horodatage max. avant le bloc, début, fin) de l'index, du plus récent au plus ancien."""
+        ends = self.index_offsets[1:] + [self.size]
+        return reversed(list(zip(self.index_ts, self.index_offsets, ends)))
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in (
+            'interval', 'size', 'lines', 'min_ts', 'max_ts', 'levels', 'index_ts', 'index_offsets'
+        )}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['interval'])
+        for key, value in data.items():
+            setattr(summary, key, value)
+        return summary
+
+
+class BotLogStore:
+    """Journal append-only et segmenté de chaque bot.
+
+    Chaque segment est un fichier de lignes JSON ({t, l, m}) ; à la rotation, son résumé
+    (`SegmentSummary`) est écrit à côté pour ne plus jamais relire un segment clos. Les
+    requêtes écartent les segments hors période ou sans ligne du niveau demandé, lisent
+    chaque segment à rebours, bloc par bloc de l'index clairsemé, et s'arrêtent dès
+    `limit` lignes trouvées.
+    """
+
+    def __init__(self, root=BOT_LOG_DIR, segment_lines=BOT_LOG_SEGMENT_LINES, index_interval=BOT_LOG_INDEX_INTERVAL):
+        self.root = root
+        self.segment_lines = segment_lines
+        self.index_interval = index_interval
+        self._summaries = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _bot_dir(self, user_id, bot_id):
+        if not _BOT_ID.match(bot_id or ''):
+            raise ValueError('Identifiant de bot invalide')
+        return os.path.join(self.root, str(user_id), bot_id)
+
+    def _lock_for(self, directory):
+        with self._guard:
+            return self._locks.setdefault(directory, threading.Lock())
+
+    @contextmanager
+    def _locked(self, directory):
+        """Verrou d'un bot : threads du processus, puis verrou de fichier partagé par les workers."""
+        with self._lock_for(directory):
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _segments(directory):
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith('.log'))
+
+    @staticmethod
+    def _segment_path(directory, segment):
+        return os.path.join(directory, f'{segment:08d}.log')
+
+    def _summary(self, directory, segment):
+        """Résumé d'un segment, complété si d'autres lignes ont été ajoutées depuis.
+
+        À appeler sous `_locked(directory)` : le résumé en mémoire est complété sur place.
+        """
+        path = self._segment_path(directory, segment)
+        summary = self._summaries.get(path)
+        if summary is None and os.path.exists(path + '.idx'):
+            with open(path + '.idx') as f:
+                summary = SegmentSummary.from_dict(json.load(f))
+        if summary is None:
+            summary = SegmentSummary(self.index_interval)
+        size = os.path.getsize(path)
+        if size > summary.size:
+            # Lecture des seules lignes ajoutées depuis le dernier passage
+            with open(path, 'rb') as f:
+                f.seek(summary.size)
+                offset = summary.size
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break  # Ligne en cours d'écriture
+                    line = decode_line(raw)
+                    if line is not None:
+                        summary.add(line['t'], line['l'], offset, len(raw))
+                    offset += len(raw)
+                    summary.size = offset
+        self._summaries[path] = summary
+        return summary
+
+    def _read_summary(self, directory, segment):
+        # Copie : le résumé partagé continue d'être complété par les écritures suivantes
+        with self._locked(directory):
+            return copy.deepcopy(self._summary(directory, segment))
+
+    def append(self, user_id, bot_id, entries):
+        """Ajoute des lignes {timestamp (ms), level, message} ; renvoie le nombre de lignes écrites."""
+        directory = self._bot_dir(user_id, bot_id)
+        with self._locked(directory):
+            os.makedirs(directory, exist_ok=True)
+            # Relu sous le verrou : un autre worker a pu écrire ou changer de segment
+            segments = self._segments(directory)
+            segment = segments[-1] if segments else 1
+            if not segments:
+                open(self._segment_path(directory, segment), 'ab').close()
+            summary = self._summary(directory, segment)
+
+            written = 0
+            f = open(self._segment_path(directory, segment), 'ab')
+            try:
+                if f.tell() > summary.size:
+                    # Ligne tronquée par un arrêt brutal : terminée pour ne pas absorber la suivante
+                    f.write(b'\n')
+                for ts, level, message in entries:
+                    if summary.lines >= self.segment_lines:
+                        f.close()
+                        self._seal(directory, segment, summary)
+                        segment += 1
+                        f = open(self._segment_path(directory, segment), 'ab')
+                        summary = self._summary(directory, segment)
+                    raw = (json.dumps({'t': ts, 'l': level, 'm': message}, separators=(',', ':')) + '\n').encode()
+                    # Position réelle dans le fichier, et non la taille connue du résumé
+                    summary.add(ts, level, f.tell(), len(raw))
+                    f.write(raw)
+                    written += 1
+            finally:
+                f.close()
+            return written
+
+    @staticmethod
+    def _seal(directory, segment, summary):
+        path = BotLogStore._segment_path(directory, segment) + '.idx'
+        with open(path + '.tmp', 'w') as f:
+            json.dump(summary.to_dict(), f)
+        os.replace(path + '.tmp', path)
+
+    def query(self, user_id, bot_id, since=None, until=None, level=None, limit=100):
+        """Les `limit` lignes les plus récentes dans [since, until] (ms), de la plus récente à la plus ancienne."""
+        directory = self._bot_dir(user_id, bot_id)
+        results = []
+        for segment in reversed(self._segments(directory)):
+            summary = self._read_summary(directory, segment)
+            if summary.lines == 0:
+                continue
+            # Pas d'arrêt au premier segment antérieur à `since` : un segment plus ancien peut
+            # contenir des lignes arrivées en retard
+            if since is not None and summary.max_ts < since:
+                continue
+            if until is not None and summary.min_ts > until:
+                continue
+            if level is not None and not summary.levels.get(level):
+                continue
+
+            with open(self._segment_path(directory, segment), 'rb') as f:
+                for block_ts, start, end in summary.blocks():
+                    f.seek(start)
+                    matches = []
+                    for raw in f.read(end - start).splitlines():
+                        line = decode_line(raw)
+                        if line is None:
+                            continue
+                        # Pas d'arrêt anticipé : des lignes antérieures peuvent suivre (ordre d'arrivée)
+                        if until is not None and line['t'] > until:
+                            continue
+                        if since is not None and line['t'] < since:
+                            continue
+                        if level is not None and line['l'] != level:
+                            continue
+                        matches.append(line)
+                    # Seules les lignes les plus récentes du bloc sont conservées
+                    for line in reversed(matches[len(results) - limit:]):
+                        results.append(format_entry(line['t'], line['l'], line['m']))
+                    if len(results) >= limit:
+                        return results
+                    # Toutes les lignes précédant ce bloc sont antérieures à `since`
+                    if since is not None and block_ts < since:
+                        break
+        return results
+
+    def end_cursor(self, user_id, bot_id):
+        directory = self._bot_dir(user_id, bot_id)
+        segments = self._segments(directory)
+        if not segments:
+            return '0:0'
+        return f'{segments[-1]}:{self._read_summary(directory, segments[-1]).size}'
+
+    def tail(self, user_id, bot_id, cursor, level=None, limit=1000):
+        """Lignes ajoutées après `cursor` (suivi en direct), dans l'ordre, et nouveau curseur.
+
+        Seuls les octets postérieurs au curseur sont lus.
+        """
+        directory = self._bot_dir(user_id, bot_id)
+        try:
+            segment, offset = (int(part) for part in cursor.split(':'))
+        except (AttributeError, ValueError):
+            raise ValueError('Curseur invalide')
+
+        results = []
+        for current in self._segments(directory):
+            if current < segment:
+                continue
+            if current > segment:
+                segment, offset = current, 0
+            summary = self._read_summary(directory, current)
+            with open(self._segment_path(directory, current), 'rb') as f:
+                f.seek(offset)
+                while offset < summary.size and len(results) < limit:
+                    raw = f.readline()
+                    if not raw.endswith(b'\n'):
+                        break  # Ligne en cours d'écriture
+                    offset += len(raw)
+                    line = decode_line(raw)
+                    if line is None:
+                        continue
+                    if level is None or line['l'] == level:
+                        results.append(format_entry(line['t'], line['l'], line['m']))
+            if len(results) >= limit:
+                break
+        return results, f'{segment}:{offset}'
+
+
+# Instance partagée par les requêtes du worker
+bot_log_store = BotLogStore()
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db, BotOrder
+from src.services.bot_stats import order_contribution, apply_contribution, performance_cache
+from src.services.events import event_bus
+from src.services.trades import parse_date
+
+# Statuts d'ordre acceptés
+ORDER_STATUSES = {'open', 'closed', 'canceled', 'error'}
+# Champs recopiés tels quels depuis les ordres envoyés par les bots
+ORDER_FIELDS = (
+    'bot_name', 'exchange', 'symbol', 'type', 'side', 'price', 'amount', 'status',
+    'filled', 'remaining', 'cost', 'fee', 'pnl', 'pnl_percent'
+)
+ORDER_DATES = ('created_at', 'updated_at', 'closed_at')
+# Champs obligatoires à la création d'un ordre
+REQUIRED_FIELDS = ('symbol', 'side', 'amount', 'status')
+# Tentatives d'enregistrement quand un même ordre est créé en parallèle par une autre requête
+INGEST_ATTEMPTS = 3
+
+
+def parse_timestamp(value):
+    # Dates ISO 8601 ou horodatages en millisecondes, stockées en UTC naïf
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+    return parse_date(value)
+
+
+def orders_query(user_id, bot_id=None, status=None, start_date=None, end_date=None):
+    """Requête filtrée sur les ordres des bots, servie par les index (user_id, ..., created_at)."""
+    query = BotOrder.query.filter(BotOrder.user_id == user_id)
+    if bot_id:
+        query = query.filter(BotOrder.bot_id == bot_id)
+    if status:
+        query = query.filter(BotOrder.status == status)
+    if start_date:
+        query = query.filter(BotOrder.created_at >= parse_date(start_date))
+    if end_date:
+        query = query.filter(BotOrder.created_at <= parse_date(end_date))
+    return query
+
+
+def orders_version(query):
+    """Version des ordres d'une requête filtrée, calculée en une agrégation sans les charger.
+
+    `updated_at` est fourni par le bot et peut manquer : le nombre d'ordres ouverts, la
+    dernière clôture et la quantité exécutée couvrent les changements de statut et les
+    exécutions partielles envoyés sans horodatage.
+    """
+    return tuple(query.with_entities(
+        func.count(BotOrder.id),
+        func.max(BotOrder.id),
+        func.max(BotOrder.updated_at),
+        func.max(BotOrder.closed_at),
+        func.sum(case((BotOrder.status == 'open', 1), else_=0)),
+        func.sum(BotOrder.filled)
+    ).one())
+
+
+def _order_values(payload):
+    values = {field: payload.get(field) for field in ORDER_FIELDS if field in payload}
+    for field in ORDER_DATES:
+        if field in payload:
+            values[field] = parse_timestamp(payload[field])
+    if 'status' in values and values['status'] not in ORDER_STATUSES:
+        raise ValueError(f"Statut d'ordre inconnu : {values['status']}")
+    return values
+
+
+def ingest_orders(user_id, payloads):
+    """Enregistre ou met à jour les ordres envoyés par un bot.
+
+    Les ordres sont identifiés par (bot_id, id) ; un ordre déjà connu est mis à jour
+    (changement de statut, exécution partielle...). Renvoie les ordres créés et mis à jour.
+    """
+    values_by_key = {}
+    for payload in payloads:
+        if not payload.get('bot_id') or not payload.get('id'):
+            raise ValueError('bot_id et id requis pour chaque ordre')
+        values_by_key[(payload['bot_id'], str(payload['id']))] = _order_values(payload)
+
+    for attempt in range(INGEST_ATTEMPTS):
+        try:
+            created, updated, changed_bots = _ingest(user_id, values_by_key)
+            break
+        except IntegrityError:
+            # Ordre inséré entre-temps par une requête concurrente : relu puis mis à jour
+            db.session.rollback()
+            if attempt == INGEST_ATTEMPTS - 1:
+                raise
+
+    for bot_id in changed_bots:
+        performance_cache.invalidate(user_id, bot_id)
+
+    for order in created:
+        event_bus.publish('bot_order', {'action': 'created', 'order': order.to_dict()}, user_id=user_id)
+    for order in updated:
+        event_bus.publish('bot_order', {'action': 'updated', 'order': order.to_dict()}, user_id=user_id)
+    return created, updated
+
+
+def _ingest(user_id, values_by_key):
+    # Ordres existants chargés en une requête par bot
+    existing = {}
+    for bot_id in {bot_id for bot_id, _ in values_by_key}:
+        order_ids = [order_id for b, order_id in values_by_key if b == bot_id]
+        for order in BotOrder.query.filter(
+            BotOrder.user_id == user_id,
+            BotOrder.bot_id == bot_id,
+            BotOrder.order_id.in_(order_ids)
+        ):
+            existing[(order.bot_id, order.order_id)] = order
+
+    created, updated = [], []
+    changed_bots = set()
+    for (bot_id, order_id), values in values_by_key.items():
+        order = existing.get((bot_id, order_id))
+        before = order_contribution(order) if order is not None else None
+        if order is None:
+            missing = [field for field in REQUIRED_FIELDS if values.get(field) is None]
+            if missing:
+                raise ValueError(f"Champs manquants pour l'ordre {order_id} : {', '.join(missing)}")
+            if values.get('created_at') is None:
+                values['created_at'] = datetime.utcnow()
+            order = BotOrder(user_id=user_id, bot_id=bot_id, order_id=order_id, **values)
+            db.session.add(order)
+            created.append(order)
+        else:
+            for field, value in values.items():
+                setattr(order, field, value)
+            updated.append(order)
+
+        # Mise à jour incrémentale des agrégats journaliers quand un ordre est clos (ou corrigé)
+        after = order_contribution(order)
+        if after != before:
+            if before is not None:
+                apply_contribution(order, before, sign=-1)
+            if after is not None:
+                apply_contribution(order, after)
+            changed_bots.add(bot_id)
+    db.session.commit()
+    return created, updated, changed_bots
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from src.models.user import db, BotDailyStat
+from src.services.database import upsert
+from src.services.metrics import metrics
+
+# Périodes acceptées par /api/bots/performance (en jours ; None = tout l'historique)
+PERFORMANCE_PERIODS = {'7d': 7, '30d': 30, '90d': 90, '1y': 365, 'all': None}
+# Durée de validité des performances en cache (secondes), en plus de la vérification de version
+PERFORMANCE_CACHE_TTL = float(os.getenv('PERFORMANCE_CACHE_TTL', '60'))
+
+# Compteurs cumulés dans chaque agrégat journalier
+STAT_FIELDS = ('trades', 'wins', 'losses', 'gross_profit', 'gross_loss', 'pnl', 'cost')
+
+
+def order_contribution(order):
+    """Part d'un ordre dans les agrégats : (jour, {compteur: valeur}), ou None s'il n'est pas clos."""
+    if order.status != 'closed' or order.pnl is None:
+        return None
+    closed_at = order.closed_at or order.updated_at or order.created_at
+    pnl = order.pnl
+    return closed_at.date(), {
+        'trades': 1,
+        'wins': 1 if pnl > 0 else 0,
+        'losses': 1 if pnl < 0 else 0,
+        'gross_profit': pnl if pnl > 0 else 0,
+        'gross_loss': -pnl if pnl < 0 else 0,
+        'pnl': pnl,
+        'cost': order.cost or 0
+    }
+
+
+def apply_contribution(order, contribution, sign=1):
+    """Ajoute (ou retire, sign=-1) la part d'un ordre à l'agrégat de son jour de clôture.
+
+    Une seule instruction INSERT ... ON CONFLICT DO UPDATE, avec des incréments calculés par
+    la base : deux requêtes concurrentes ne perdent aucune contribution et la création de
+    l'agrégat du jour ne peut pas échouer sur la contrainte d'unicité. L'instruction est
+    exécutée dans la transaction de la session : elle est validée avec l'ordre.
+    """
+    day, values = contribution
+    deltas = {field: sign * values[field] for field in STAT_FIELDS}
+    labels = {'bot_name': order.bot_name, 'exchange': order.exchange, 'symbol': order.symbol}
+    statement = upsert(BotDailyStat).values(
+        user_id=order.user_id, bot_id=order.bot_id, day=day, **deltas, **labels
+    )
+    table = BotDailyStat.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'bot_id', 'day'],
+        set_={
+            **{field: table.c[field] + statement.excluded[field] for field in STAT_FIELDS},
+            **{field: func.coalesce(statement.excluded[field], table.c[field]) for field in labels}
+        }
+    )
+    db.session.execute(statement)
+
+
+def period_start(period, today=None):
+    days = PERFORMANCE_PERIODS[period]
+    if days is None:
+        return None
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=days - 1)
+
+
+def bot_performance(user_id, bot_id, period='30d'):
+    """Performance d'un bot sur la période, par somme des agrégats journaliers."""
+    start = period_start(period)
+    base = BotDailyStat.query.filter(BotDailyStat.user_id == user_id, BotDailyStat.bot_id == bot_id)
+
+    # Première activité et dernières informations connues du bot (tout l'historique)
+    first_day = base.with_entities(func.min(BotDailyStat.day)).scalar()
+    if first_day is None:
+        return None
+    latest = base.order_by(BotDailyStat.day.desc()).first()
+
+    days = base.filter(BotDailyStat.day >= start) if start else base
+    daily = days.order_by(BotDailyStat.day.desc()).all()
+    totals = {field: sum(getattr(stat, field) for stat in daily) for field in STAT_FIELDS}
+
+    return {
+        'id': bot_id,
+        'name': latest.bot_name,
+        'exchange': latest.exchange,
+        'symbol': latest.symbol,
+        'strategy': None,
+        'start_date': datetime.combine(first_day, datetime.min.time()).isoformat() + 'Z',
+        'period': period,
+        'total_trades': totals['trades'],
+        'win_rate': round(totals['wins'] / totals['trades'] * 100, 2) if totals['trades'] else 0,
+        'profit_factor': round(totals['gross_profit'] / totals['gross_loss'], 2) if totals['gross_loss'] else None,
+        'total_pnl': round(totals['pnl'], 2),
+        'total_pnl_percent': round(totals['pnl'] / totals['cost'] * 100, 2) if totals['cost'] else 0,
+        'daily_pnl': [stat.to_dict() for stat in daily]
+    }
+
+
+def stats_version(user_id, bot_id):
+    """Version des agrégats d'un bot, lue en base : identique dans tous les workers.
+
+    Une agrégation sur les seules lignes du bot (une par jour d'activité) : tout ordre clos
+    ou corrigé modifie le nombre de lignes, les sommes de trades, PnL ou montant engagé, ou
+    déplace une contribution d'un jour à l'autre (somme des trades pondérée par la ligne).
+    """
+    return tuple(db.session.query(
+        func.count(BotDailyStat.id),
+        func.sum(BotDailyStat.trades),
+        func.sum(BotDailyStat.trades * BotDailyStat.id),
+        func.sum(BotDailyStat.pnl),
+        func.sum(BotDailyStat.cost)
+    ).filter(BotDailyStat.user_id == user_id, BotDailyStat.bot_id == bot_id).one())
+
+
+def user_bot_ids(user_id):
+    rows = db.session.query(BotDailyStat.bot_id).filter(BotDailyStat.user_id == user_id).distinct()
+    return sorted(row[0] for row in rows)
+
+
+class PerformanceCache:
+    """Performances calculées par (utilisateur, bot, période), invalidées à chaque nouvel ordre clos.
+
+    Chaque entrée garde la version des agrégats (`stats_version`) sous laquelle elle a été
+    calculée : un ordre clos reçu par un autre worker change la version en base, et
+    l'entrée n'est plus servie. `invalidate` libère en plus les entrées du worker qui a
+    reçu l'ordre.
+    """
+
+    def __init__(self, ttl=PERFORMANCE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, bot_id, period):
+        key = (str(user_id), bot_id)
+        version = stats_version(user_id, bot_id)
+        entry = self._entries.get(key + (period,))
+        if entry is not None and entry[0] == version and time.monotonic() - entry[1] <= self.ttl:
+            metrics.cache('performance', True)
+            return entry[2]
+        metrics.cache('performance', False)
+
+        result = bot_performance(user_id, bot_id, period)
+        self._entries[key + (period,)] = (version, time.monotonic(), result)
+        return result
+
+    def invalidate(self, user_id, bot_id):
+        key = (str(user_id), bot_id)
+        with self._lock:
+            for period in PERFORMANCE_PERIODS:
+                self._entries.pop(key + (period,), None)
+
+
+# Instance partagée par les requêtes du worker
+performance_cache = PerformanceCache()
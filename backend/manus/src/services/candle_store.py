@@ -0,0 +1,172 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+# Répertoire des fichiers de bougies (un fichier par colonne, symbole et timeframe)
+CANDLE_STORE_DIR = os.getenv(
+    'CANDLE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'candles')
+)
+
+# Colonnes à largeur fixe : horodatage d'ouverture (ms) puis OHLCV
+COLUMNS = (
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+)
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleStore:
+    """Stockage colonne par colonne des bougies OHLCV dans des fichiers mappés en mémoire.
+
+    Les lectures renvoient des vues sur les pages du fichier (aucune copie ni analyse) ;
+    les écritures ajoutent en fin de fichier, seule la dernière bougie (encore ouverte
+    sur l'exchange) pouvant être réécrite en place.
+    """
+
+    def __init__(self, root=CANDLE_STORE_DIR, platform='binance'):
+        self.root = os.path.join(root, platform)
+        self._maps = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _series_dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol, timeframe)
+
+    def _path(self, symbol, timeframe, column):
+        return os.path.join(self._series_dir(symbol, timeframe), f'{column}.bin')
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _series_lock(self, symbol, timeframe):
+        """Écrivain unique d'une série : verrou des threads du processus, puis verrou de
+        fichier partagé par les workers (gunicorn) et le planificateur."""
+        with self._lock_for((symbol, timeframe)):
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self._series_dir(symbol, timeframe), exist_ok=True)
+            with open(os.path.join(self._series_dir(symbol, timeframe), '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _columns(self, symbol, timeframe):
+        """Memmaps en lecture de chaque colonne ; None si la série est vide."""
+        key = (symbol, timeframe)
+        path = self._path(symbol, timeframe, 'timestamp')
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        if size == 0:
+            return None
+
+        count = size // np.dtype(np.int64).itemsize
+        columns = {
+            name: np.memmap(self._path(symbol, timeframe, name), dtype=dtype, mode='r', shape=(count,))
+            for name, dtype in COLUMNS
+        }
+        self._maps[key] = (size, columns)
+        return columns
+
+    def series(self):
+        if not os.path.isdir(self.root):
+            return
+        for symbol in sorted(os.listdir(self.root)):
+            for timeframe in sorted(os.listdir(os.path.join(self.root, symbol))):
+                yield symbol, timeframe
+
+    def count(self, symbol, timeframe):
+        columns = self._columns(symbol, timeframe)
+        return 0 if columns is None else len(columns['timestamp'])
+
+    def last_timestamp(self, symbol, timeframe):
+        columns = self._columns(symbol, timeframe)
+        if columns is None or len(columns['timestamp']) == 0:
+            return None
+        return int(columns['timestamp'][-1])
+
+    def append(self, symbol, timeframe, klines):
+        """Ajoute des klines Binance ([open_time, open, high, low, close, volume, ...]).
+
+        Les bougies déjà stockées sont ignorées, sauf la dernière qui est mise à jour.
+        Renvoie le nombre de nouvelles bougies.
+        """
+        if not klines:
+            return 0
+
+        with self._series_lock(symbol, timeframe):
+            # Relu sous le verrou : un autre processus a pu écrire depuis le dernier appel
+            last_ts = self.last_timestamp(symbol, timeframe)
+            data = np.array([row[:6] for row in klines], dtype=np.float64).reshape(-1, 6)
+            timestamps = data[:, 0].astype(np.int64)
+
+            if last_ts is not None:
+                # Mise à jour en place de la dernière bougie (toujours ouverte)
+                same = np.nonzero(timestamps == last_ts)[0]
+                if len(same):
+                    self._rewrite_last(symbol, timeframe, data[same[-1]])
+                keep = timestamps > last_ts
+                data, timestamps = data[keep], timestamps[keep]
+            if len(data) == 0:
+                return 0
+
+            os.makedirs(self._series_dir(symbol, timeframe), exist_ok=True)
+            # Les colonnes de prix sont écrites avant l'horodatage, qui fait foi pour la longueur :
+            # un ajout interrompu est tronqué avant l'ajout suivant
+            expected_size = self.count(symbol, timeframe) * np.dtype(np.float64).itemsize
+            for i, name in enumerate(PRICE_COLUMNS, start=1):
+                path = self._path(symbol, timeframe, name)
+                if os.path.exists(path) and os.path.getsize(path) > expected_size:
+                    os.truncate(path, expected_size)
+                with open(path, 'ab') as f:
+                    f.write(np.ascontiguousarray(data[:, i]).tobytes())
+            with open(self._path(symbol, timeframe, 'timestamp'), 'ab') as f:
+                f.write(timestamps.tobytes())
+            return len(data)
+
+    def _rewrite_last(self, symbol, timeframe, row):
+        count = self.count(symbol, timeframe)
+        for i, name in enumerate(PRICE_COLUMNS, start=1):
+            column = np.memmap(self._path(symbol, timeframe, name), dtype=np.float64, mode='r+', shape=(count,))
+            column[-1] = row[i]
+            column.flush()
+            del column
+
+    def window(self, symbol, timeframe, start=None, end=None):
+        """Vues (sans copie) des colonnes pour les bougies ouvertes dans [start, end] (ms)."""
+        columns = self._columns(symbol, timeframe)
+        if columns is None:
+            return None
+        timestamps = columns['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def tail(self, symbol, timeframe, n):
+        """Vues (sans copie) des `n` dernières bougies."""
+        columns = self._columns(symbol, timeframe)
+        if columns is None:
+            return None
+        return {name: column[-n:] for name, column in columns.items()}
+
+
+# Instance partagée (Binance)
+candle_store = CandleStore()
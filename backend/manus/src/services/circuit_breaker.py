@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from src.services.metrics import metrics, exchange_name
+
+# Échecs consécutifs (erreur réseau, timeout, HTTP 5xx) qui ouvrent le circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+# Durée d'ouverture avant un appel de test (secondes)
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Appel non tenté : l'endpoint de l'exchange est considéré comme défaillant."""
+
+
+class CircuitBreaker:
+    """Disjoncteur d'un endpoint : fermé, ouvert (échec immédiat) puis semi-ouvert.
+
+    En semi-ouvert, un seul appel de test est autorisé : son succès referme le circuit,
+    son échec le rouvre pour `reset_timeout` secondes.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Autorise l'appel ou lève CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError(f'Circuit ouvert pour {self.name} : appel non tenté')
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"Circuit ouvert pour {self.name} après {self.failures} échec(s)")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        # Appel autorisé mais jamais envoyé (limite de poids) : l'essai reste disponible
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic() if self.state == OPEN else 0
+            return {'state': self.state, 'failures': self.failures, 'retry_in': round(max(retry_in, 0), 1)}
+
+
+class CircuitBreakers:
+    """Un disjoncteur par (exchange, endpoint), créé au premier appel."""
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        parts = urlsplit(url)
+        key = (exchange_name(parts.netloc), parts.path or '/')
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(f'{key[0]} {key[1]}', self.failure_threshold, self.reset_timeout)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def check(self, url):
+        """Disjoncteur de l'URL, si l'appel est autorisé ; sinon CircuitOpenError."""
+        breaker = self.get(url)
+        try:
+            breaker.before()
+        except CircuitOpenError:
+            parts = urlsplit(url)
+            metrics.inc('manus_exchange_circuit_rejected_total', {
+                'exchange': exchange_name(parts.netloc), 'endpoint': parts.path or '/'
+            })
+            raise
+        return breaker
+
+    def stats(self):
+        return {breaker.name: breaker.stats() for breaker in list(self._breakers.values())}
@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+
+from src.models.user import ApiKey
+from src.services.metrics import metrics
+
+# Clé de chiffrement pour les clés API (en production, utiliser une variable d'environnement)
+DEFAULT_ENCRYPTION_KEY = 'votre_clé_de_chiffrement_à_remplacer_en_production'
+ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', DEFAULT_ENCRYPTION_KEY)
+
+# Cache des identifiants déchiffrés : nombre maximal d'entrées et durée de vie (secondes)
+CREDENTIALS_CACHE_SIZE = int(os.getenv('CREDENTIALS_CACHE_SIZE', '1024'))
+CREDENTIALS_CACHE_TTL = float(os.getenv('CREDENTIALS_CACHE_TTL', '300'))
+
+Credentials = namedtuple('Credentials', ['api_key', 'api_secret', 'passphrase'])
+
+
+def build_cipher(key):
+    # Une clé Fernet valide est utilisée telle quelle ; sinon on en dérive une de façon
+    # déterministe pour que tous les modules et tous les workers partagent la même clé
+    try:
+        return Fernet(key.encode())
+    except ValueError:
+        return Fernet(base64.urlsafe_b64encode(hashlib.sha256(key.encode()).digest()))
+
+
+class CredentialService:
+    """Chiffrement des clés API et cache borné des identifiants déchiffrés."""
+
+    def __init__(self, key=ENCRYPTION_KEY, max_size=CREDENTIALS_CACHE_SIZE, ttl=CREDENTIALS_CACHE_TTL):
+        self.cipher = build_cipher(key)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encrypt(self, value):
+        return self.cipher.encrypt(value.encode()).decode()
+
+    def decrypt(self, token):
+        return self.cipher.decrypt(token.encode()).decode()
+
+    def get(self, api_key):
+        """Identifiants en clair d'une ligne ApiKey, déchiffrés au plus une fois par version."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(api_key.id)
+            if entry is not None:
+                updated_at, expires_at, credentials = entry
+                if updated_at == api_key.updated_at and expires_at > now:
+                    self._cache.move_to_end(api_key.id)
+                    metrics.cache('credentials', True)
+                    return credentials
+                del self._cache[api_key.id]
+        metrics.cache('credentials', False)
+
+        credentials = Credentials(
+            api_key=self.decrypt(api_key.api_key),
+            api_secret=self.decrypt(api_key.api_secret),
+            passphrase=self.decrypt(api_key.passphrase) if api_key.passphrase else None
+        )
+
+        with self._lock:
+            self._cache[api_key.id] = (api_key.updated_at, now + self.ttl, credentials)
+            self._cache.move_to_end(api_key.id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return credentials
+
+    def invalidate(self, key_id):
+        with self._lock:
+            self._cache.pop(key_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+if ENCRYPTION_KEY == DEFAULT_ENCRYPTION_KEY:
+    print("ATTENTION : ENCRYPTION_KEY n'est pas définie, la clé par défaut est utilisée")
+
+# Instance partagée par toutes les routes
+credential_service = CredentialService()
+
+
+@event.listens_for(ApiKey, 'after_update')
+@event.listens_for(ApiKey, 'after_delete')
+def _invalidate_credentials(mapper, connection, target):
+    credential_service.invalidate(target.id)
@@ -0,0 +1,90 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+# Nombre d'événements conservés pour la reprise (en-tête Last-Event-ID)
+EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '1000'))
+
+
+class Event:
+    __slots__ = ('id', 'topic', 'data', 'user_id', 'created_at')
+
+    def __init__(self, event_id, topic, data, user_id=None):
+        self.id = event_id
+        self.topic = topic
+        self.data = data
+        self.user_id = user_id
+        self.created_at = time.time()
+
+
+class EventBus:
+    """Bus d'événements en mémoire du processus, avec tampon circulaire pour la reprise.
+
+    Un événement sans `user_id` est diffusé à tous les abonnés (ex. opportunités de marché),
+    sinon il n'est visible que de son utilisateur (ex. variation de solde).
+
+    Les numéros d'événement ne sont ordonnés que dans le processus : les identifiants
+    transmis aux clients (`event_id`) sont préfixés par l'origine du bus, et un identifiant
+    d'une autre origine (autre worker, processus redémarré) n'est jamais interprété.
+    """
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self._events = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self.last_id = 0
+        # Processus et instant de création : distinct d'un worker à l'autre et à chaque redémarrage
+        self.origin = f'{os.getpid():x}{time.time_ns() // 1000:x}'
+
+    def event_id(self, number):
+        """Identifiant transmis au client (champ `id:` des événements SSE)."""
+        return f'{self.origin}-{number}'
+
+    def parse_event_id(self, event_id):
+        """Numéro d'événement de ce bus, ou None si l'identifiant vient d'une autre origine.
+
+        Lève ValueError si l'identifiant a la bonne origine mais un numéro invalide.
+        """
+        origin, _, number = event_id.rpartition('-')
+        if origin != self.origin:
+            return None
+        return int(number)
+
+    def publish(self, topic, data, user_id=None):
+        with self._condition:
+            event = Event(next(self._ids), topic, data, user_id)
+            self._events.append(event)
+            self.last_id = event.id
+            self._condition.notify_all()
+        return event
+
+    def since(self, last_id, user_id=None, topics=None):
+        """Événements postérieurs à `last_id` visibles par l'utilisateur, et nouveau curseur.
+
+        Les événements renvoyés sont None si `last_id` est sorti du tampon : le client
+        doit alors recharger l'état complet.
+        """
+        with self._condition:
+            events = list(self._events)
+            cursor = self.last_id
+        # Identifiant inconnu (trop ancien, ou émis avant un redémarrage du processus)
+        if last_id > cursor or (events and last_id < events[0].id - 1):
+            return None, cursor
+        visible = [
+            event for event in events
+            if event.id > last_id
+            and (event.user_id is None or str(event.user_id) == str(user_id))
+            and (topics is None or event.topic in topics)
+        ]
+        return visible, cursor
+
+    def wait(self, last_id, timeout):
+        """Bloque jusqu'à la publication d'un événement postérieur à `last_id` (ou le délai)."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.last_id > last_id, timeout)
+
+
+# Instance partagée par le worker (publications des services, abonnés SSE)
+event_bus = EventBus()
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from src.services.circuit_breaker import CircuitBreakers
+from src.services.metrics import metrics, exchange_name
+from src.services.rate_limit import RateLimiter, RateLimitExceeded, current_priority
+
+# URL de base de l'API Binance (surchargeable pour les tests ou un proxy)
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', 'https://api.binance.com')
+
+# Taille du pool de connexions keep-alive par hôte
+POOL_SIZE = int(os.getenv('EXCHANGE_POOL_SIZE', '10'))
+# Timeouts par défaut (secondes) : établissement de la connexion, puis lecture de la réponse
+CONNECT_TIMEOUT = float(os.getenv('EXCHANGE_CONNECT_TIMEOUT', '3'))
+EXCHANGE_TIMEOUT = float(os.getenv('EXCHANGE_TIMEOUT', '5'))
+# Nouvelles tentatives pour les GET (idempotents) avec backoff exponentiel
+RETRIES = int(os.getenv('EXCHANGE_RETRIES', '2'))
+RETRY_BACKOFF = float(os.getenv('EXCHANGE_RETRY_BACKOFF', '0.3'))
+# Requêtes couvertes : second appel si le premier dépasse le p95 de l'endpoint
+HEDGE_ENABLED = os.getenv('EXCHANGE_HEDGE', 'false').lower() == 'true'
+# Délai avant le second appel tant que l'endpoint a moins de HEDGE_MIN_SAMPLES mesures (secondes)
+HEDGE_DELAY = float(os.getenv('EXCHANGE_HEDGE_DELAY', '1'))
+HEDGE_MIN_SAMPLES = int(os.getenv('EXCHANGE_HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MIN_DELAY = float(os.getenv('EXCHANGE_HEDGE_MIN_DELAY', '0.05'))
+HEDGE_WORKERS = int(os.getenv('EXCHANGE_HEDGE_WORKERS', '8'))
+
+
+class ExchangeClient:
+    """Client HTTP partagé : une session keep-alive et un pool de connexions par hôte.
+
+    Chaque appel réserve d'abord son poids auprès du `rate_limiter`, qui se recale
+    ensuite sur le poids consommé annoncé par l'exchange dans la réponse. Un endpoint
+    en échec répété est coupé par son disjoncteur (`breakers`) : les appels échouent
+    immédiatement et les appelants se rabattent sur leurs dernières données connues.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, retries=RETRIES, backoff=RETRY_BACKOFF,
+                 timeout=(CONNECT_TIMEOUT, EXCHANGE_TIMEOUT), rate_limiter=None, breakers=None,
+                 hedge=HEDGE_ENABLED):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
+        self.hedge = hedge
+        self._sessions = {}
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        # requests n'est chargé qu'au premier appel sortant, pas au démarrage de l'application
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            # Pas de retry sur 418/429 : insister aggraverait le bannissement
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url):
+        parts = urlsplit(url)
+        host = f'{parts.scheme}://{parts.netloc}'
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[host] = session
+        return session
+
+    def get(self, url, params=None, headers=None, timeout=None, priority=None, hedge=None):
+        """GET vers un exchange ; lève CircuitOpenError ou RateLimitExceeded sans appel réseau."""
+        breaker = self.breakers.check(url)
+        priority = priority or current_priority()
+        try:
+            self.rate_limiter.acquire(url, params, headers, priority)
+        except RateLimitExceeded:
+            breaker.release()
+            raise
+
+        try:
+            if self.hedge if hedge is None else hedge:
+                response = self._hedged_get(url, params, headers, timeout, priority)
+            else:
+                response = self._send(url, params, headers, timeout)
+        except Exception:
+            breaker.failure()
+            raise
+        if response.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        return response
+
+    def hedge_delay(self, url):
+        """p95 de l'endpoint mesuré par ce processus, ou HEDGE_DELAY faute de mesures suffisantes."""
+        parts = urlsplit(url)
+        labels = {'exchange': exchange_name(parts.netloc), 'endpoint': parts.path or '/'}
+        p95, count = metrics.quantile('manus_exchange_request_duration_seconds', labels, 0.95)
+        if count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DELAY
+        return max(p95, HEDGE_MIN_DELAY)
+
+    def _hedged_get(self, url, params, headers, timeout, priority):
+        # Lectures idempotentes uniquement : la première réponse reçue l'emporte
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=HEDGE_WORKERS, thread_name_prefix='exchange-hedge'
+                    )
+        primary = self._hedge_executor.submit(self._send, url, params, headers, timeout)
+        done, _ = wait([primary], timeout=self.hedge_delay(url))
+        if done:
+            return primary.result()
+
+        try:
+            # Le second appel n'attend pas : sans poids disponible, on garde le premier
+            self.rate_limiter.acquire(url, params, headers, priority, max_wait=0)
+        except RateLimitExceeded:
+            return primary.result()
+        parts = urlsplit(url)
+        metrics.inc('manus_exchange_hedged_total', {'exchange': exchange_name(parts.netloc), 'endpoint': parts.path or '/'})
+        secondary = self._hedge_executor.submit(self._send, url, params, headers, timeout)
+
+        pending = {primary, secondary}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        return primary.result()
+
+    def _send(self, url, params=None, headers=None, timeout=None):
+        parts = urlsplit(url)
+        labels = {'exchange': exchange_name(parts.netloc), 'endpoint': parts.path or '/'}
+        started = time.perf_counter()
+        try:
+            response = self.session_for(url).get(
+                url, params=params, headers=headers, timeout=timeout or self.timeout
+            )
+        except Exception:
+            metrics.observe('manus_exchange_request_duration_seconds', time.perf_counter() - started, labels)
+            metrics.inc('manus_exchange_requests_total', dict(labels, status='error'))
+            raise
+        metrics.observe('manus_exchange_request_duration_seconds', time.perf_counter() - started, labels)
+        metrics.inc('manus_exchange_requests_total', dict(labels, status=response.status_code))
+        self.rate_limiter.update(url, response)
+        # Tentatives faites par urllib3 avant la réponse finale (Retry.history)
+        history = getattr(getattr(getattr(response, 'raw', None), 'retries', None), 'history', None)
+        if isinstance(history, tuple) and history:
+            metrics.inc('manus_exchange_retries_total', labels, len(history))
+        return response
+
+    def stats(self):
+        """Statistiques par hôte : connexions ouvertes vs réutilisées."""
+        stats = {}
+        for host, session in list(self._sessions.items()):
+            adapter = session.get_adapter(host)
+            opened = 0
+            requests_sent = 0
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+            stats[host] = {
+                'pool_size': self.pool_size,
+                'requests': requests_sent,
+                'connections_opened': opened,
+                'connections_reused': max(requests_sent - opened, 0)
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Instance partagée par toutes les routes du worker
+exchange_client = ExchangeClient()
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from src.services.exchange_client import exchange_client, BINANCE_API_URL
+
+
+def fetch_balances(platform, api_key, api_secret):
+    """Récupère les soldes d'un compte sous la forme {actif: quantité totale}."""
+    balances = {}
+
+    if platform == 'binance':
+        # En production, utiliser une bibliothèque comme python-binance
+        response = exchange_client.get(
+            f'{BINANCE_API_URL}/api/v3/account',
+            params={'timestamp': int(datetime.now().timestamp() * 1000)},
+            headers={'X-MBX-APIKEY': api_key}
+            # En production, ajouter la signature HMAC
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f'HTTP {response.status_code} depuis Binance')
+
+        for balance in response.json().get('balances', []):
+            total = float(balance['free']) + float(balance['locked'])
+            if total > 0:
+                balances[balance['asset']] = total
+
+    # Autres plateformes...
+
+    return balances
+
+
+# Nombre maximal de trades renvoyés par appel à /api/v3/myTrades
+MY_TRADES_LIMIT = 1000
+
+
+def fetch_trades(platform, api_key, api_secret, symbol, from_id=0, limit=MY_TRADES_LIMIT):
+    """Récupère une page de trades d'un symbole à partir de l'identifiant `from_id`."""
+    if platform != 'binance':
+        # Autres plateformes...
+        return []
+
+    response = exchange_client.get(
+        f'{BINANCE_API_URL}/api/v3/myTrades',
+        params={
+            'symbol': symbol,
+            'fromId': from_id,
+            'limit': limit,
+            'timestamp': int(datetime.now().timestamp() * 1000)
+        },
+        headers={'X-MBX-APIKEY': api_key}
+        # En production, ajouter la signature HMAC
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} depuis Binance')
+
+    return response.json()
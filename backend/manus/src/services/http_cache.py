@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import os
+
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # Brotli optionnel : compression gzip seulement
+    brotli = None
+
+# Taille minimale (octets) d'une réponse JSON pour la compresser
+API_COMPRESS_MIN_SIZE = int(os.getenv('API_COMPRESS_MIN_SIZE', '1024'))
+# Niveaux de compression : rapides, les réponses étant compressées à chaque requête
+API_GZIP_LEVEL = int(os.getenv('API_GZIP_LEVEL', '6'))
+API_BROTLI_QUALITY = int(os.getenv('API_BROTLI_QUALITY', '4'))
+
+# Le navigateur garde la réponse mais la revalide (If-None-Match) à chaque appel
+API_CACHE_CONTROL = 'private, no-cache'
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = API_CACHE_CONTROL
+    return response
+
+
+def not_modified(*version):
+    """ETag calculée à partir de versions connues (identifiants, horodatages...).
+
+    Renvoie une réponse 304 si le client possède déjà cette version, sans exécuter la
+    suite de la route ni sérialiser la réponse ; sinon None, et l'ETag est réutilisée
+    pour la réponse complète.
+    """
+    etag = _hash(repr(version + (request.full_path,)).encode())
+    g.api_etag = etag
+    if request.if_none_match.contains_weak(etag):
+        return _not_modified(etag)
+    return None
+
+
+def _preferred_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=API_BROTLI_QUALITY)
+    return gzip.compress(data, API_GZIP_LEVEL)
+
+
+def api_response_cache(response):
+    """ETag / 304 et compression des réponses JSON des blueprints /api."""
+    if not request.path.startswith('/api/') or response.direct_passthrough or response.is_streamed:
+        return response
+    if response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+        return response
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        etag = g.pop('api_etag', None) or _hash(response.get_data())
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = API_CACHE_CONTROL
+        if request.if_none_match.contains_weak(etag):
+            return _not_modified(etag)
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = _preferred_encoding() if len(data) >= API_COMPRESS_MIN_SIZE else None
+    if encoding:
+        response.set_data(_compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_http_cache(app):
+    app.after_request(api_response_cache)
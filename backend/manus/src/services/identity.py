@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.user import db, User, ApiKey
+from src.services.metrics import metrics
+
+# Durée de validité du cache des identités entre requêtes (secondes, 0 pour le désactiver)
+IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', '15'))
+
+
+def _columns(instance):
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+def _attach(model, values):
+    # Réattache une copie à la session de la requête, sans requête SQL
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+
+class IdentityCache:
+    """Utilisateur et clés API actives chargés par le JWT, partagés entre requêtes.
+
+    Les entrées sont des dictionnaires de colonnes (jamais d'objets ORM partagés entre
+    threads) ; chaque requête en reconstruit des instances attachées à sa propre session.
+    """
+
+    def __init__(self, ttl=IDENTITY_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(str(user_id))
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            metrics.cache('identity', False)
+            return None
+        metrics.cache('identity', True)
+        user = _attach(User, entry[1])
+        set_committed_value(user, 'active_api_keys', [_attach(ApiKey, values) for values in entry[2]])
+        return user
+
+    def put(self, user):
+        if self.ttl <= 0:
+            return
+        entry = (time.monotonic(), _columns(user), [_columns(api_key) for api_key in user.active_api_keys])
+        with self._lock:
+            self._entries[str(user.id)] = entry
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def load_user(identity):
+    """Utilisateur actif et ses clés API actives, en une requête SQL (jointure) au plus."""
+    user = identity_cache.get(identity)
+    if user is not None:
+        return user
+    user = (
+        User.query.options(joinedload(User.active_api_keys))
+        .filter(User.id == int(identity), User.is_active.isnot(False))
+        .one_or_none()
+    )
+    if user is not None:
+        identity_cache.put(user)
+    return user
+
+
+def init_identity(jwt):
+    """Branche le chargement de l'utilisateur sur le gestionnaire JWT (`current_user`)."""
+
+    @jwt.user_lookup_loader
+    def user_lookup(jwt_header, jwt_data):
+        try:
+            return load_user(jwt_data['sub'])
+        except (TypeError, ValueError):
+            return None
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error(jwt_header, jwt_data):
+        return jsonify({'error': 'Utilisateur non trouvé'}), 404
+
+
+# Invalidation à chaque modification d'un utilisateur ou de ses clés API
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+
+
+@event.listens_for(ApiKey, 'after_insert')
+@event.listens_for(ApiKey, 'after_update')
+@event.listens_for(ApiKey, 'after_delete')
+def _invalidate_api_key_owner(mapper, connection, target):
+    identity_cache.invalidate(target.user_id)
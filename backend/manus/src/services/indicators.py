@@ -0,0 +1,75 @@
+import numpy as np
+
+# Les fonctions de ce module travaillent sur des matrices (séries, bougies) : une ligne
+# par couple (symbole, timeframe), les bougies de la plus ancienne à la plus récente.
+# La récurrence de lissage est parcourue une seule fois dans le temps, chaque pas
+# traitant toutes les séries en une opération vectorisée.
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values.reshape(1, -1) if values.ndim == 1 else values
+
+
+def wilder_smooth(values, period):
+    """Moyenne lissée de Wilder (alpha = 1/period), amorcée par une moyenne simple."""
+    values = _as_matrix(values)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return result
+    current = values[:, :period].mean(axis=1)
+    result[:, period - 1] = current
+    for i in range(period, values.shape[1]):
+        current = current + (values[:, i] - current) / period
+        result[:, i] = current
+    return result
+
+
+def ema(values, period):
+    """Moyenne mobile exponentielle (alpha = 2/(period+1)), amorcée par une moyenne simple."""
+    values = _as_matrix(values)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return result
+    alpha = 2.0 / (period + 1)
+    current = values[:, :period].mean(axis=1)
+    result[:, period - 1] = current
+    for i in range(period, values.shape[1]):
+        current = current + alpha * (values[:, i] - current)
+        result[:, i] = current
+    return result
+
+
+def rsi(closes, period=14):
+    """RSI de Wilder pour chaque bougie ; NaN tant que l'historique est insuffisant."""
+    closes = _as_matrix(closes)
+    result = np.full(closes.shape, np.nan)
+    if closes.shape[1] <= period:
+        return result
+
+    deltas = np.diff(closes, axis=1)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    avg_gain = wilder_smooth(gains, period)
+    avg_loss = wilder_smooth(losses, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        values = 100 - 100 / (1 + rs)
+    # Aucune perte sur la période : RSI à 100 (ou 50 si le prix n'a pas bougé)
+    values = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), values)
+    values[np.isnan(avg_gain)] = np.nan
+    result[:, 1:] = values
+    return result
+
+
+def atr(high, low, close, period=14):
+    """Average True Range de Wilder."""
+    high, low, close = _as_matrix(high), _as_matrix(low), _as_matrix(close)
+    previous_close = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    true_range = np.maximum.reduce([
+        high - low,
+        np.abs(high - previous_close),
+        np.abs(low - previous_close)
+    ])
+    return wilder_smooth(true_range, period)
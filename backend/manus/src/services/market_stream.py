@@ -0,0 +1,351 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+from src.services.metrics import metrics
+
+# Active la consommation des flux WebSocket dans ce processus
+MARKET_STREAM_ENABLED = os.getenv('MARKET_STREAM_ENABLED', '0') == '1'
+# URL des flux combinés Binance (spot et futures USDT-M)
+BINANCE_STREAM_URL = os.getenv('BINANCE_STREAM_URL', 'wss://stream.binance.com:9443')
+BINANCE_FUTURES_STREAM_URL = os.getenv('BINANCE_FUTURES_STREAM_URL', 'wss://fstream.binance.com')
+# Symboles et intervalles suivis en klines (ex. 'BTCUSDT,ETHUSDT' et '1h,4h')
+MARKET_STREAM_KLINE_SYMBOLS = [s for s in os.getenv('MARKET_STREAM_KLINE_SYMBOLS', '').split(',') if s]
+MARKET_STREAM_KLINE_INTERVALS = [s for s in os.getenv('MARKET_STREAM_KLINE_INTERVALS', '1h').split(',') if s]
+# Au-delà de cet âge (secondes), une donnée du flux n'est plus considérée comme fraîche
+MARKET_STATE_MAX_AGE = float(os.getenv('MARKET_STATE_MAX_AGE', '30'))
+# Délai maximal entre deux tentatives de reconnexion (secondes)
+RECONNECT_MAX_DELAY = float(os.getenv('MARKET_STREAM_RECONNECT_MAX_DELAY', '30'))
+
+
+class SymbolState:
+    """État compact d'un symbole, mis à jour par les flux."""
+
+    __slots__ = (
+        'symbol', 'last_price', 'bid', 'ask', 'volume', 'quote_volume', 'price_change_percent',
+        'mark_price', 'funding_rate', 'next_funding_time', 'kline_interval', 'kline_close',
+        'updated_at', 'mark_updated_at'
+    )
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        for name in self.__slots__[1:]:
+            setattr(self, name, None)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MarketState:
+    """Table en mémoire des derniers prix, tickers et funding rates par symbole."""
+
+    def __init__(self, max_age=MARKET_STATE_MAX_AGE):
+        self.max_age = max_age
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self.last_update = None
+
+    def _state(self, symbol):
+        state = self._symbols.get(symbol)
+        if state is None:
+            with self._lock:
+                state = self._symbols.setdefault(symbol, SymbolState(symbol))
+        return state
+
+    def update_ticker(self, ticker):
+        # Format des flux (!ticker@arr) ou du REST (/api/v3/ticker/24hr)
+        state = self._state(ticker.get('s') or ticker['symbol'])
+        state.last_price = float(ticker.get('c') or ticker['lastPrice'])
+        state.bid = _float(ticker.get('b', ticker.get('bidPrice')))
+        state.ask = _float(ticker.get('a', ticker.get('askPrice')))
+        state.volume = _float(ticker.get('v', ticker.get('volume')))
+        state.quote_volume = _float(ticker.get('q', ticker.get('quoteVolume')))
+        state.price_change_percent = _float(ticker.get('P', ticker.get('priceChangePercent')))
+        state.updated_at = self.last_update = time.time()
+
+    def update_mark_price(self, update):
+        state = self._state(update.get('s') or update['symbol'])
+        state.mark_price = float(update.get('p') or update['markPrice'])
+        state.funding_rate = _float(update.get('r', update.get('lastFundingRate')))
+        state.next_funding_time = update.get('T', update.get('nextFundingTime'))
+        # Horodatage distinct : le flux futures ne rafraîchit pas le prix spot
+        state.mark_updated_at = time.time()
+
+    def update_kline(self, event):
+        kline = event['k']
+        state = self._state(event['s'])
+        state.kline_interval = kline['i']
+        state.kline_close = float(kline['c'])
+        state.last_price = state.kline_close
+        state.updated_at = self.last_update = time.time()
+
+    def is_live(self):
+        """Vrai si les flux spot ont alimenté la table récemment."""
+        return self.last_update is not None and time.time() - self.last_update <= self.max_age
+
+    def get(self, symbol):
+        return self._symbols.get(symbol)
+
+    def fresh(self, symbol):
+        """État du symbole s'il a été mis à jour récemment, sinon None."""
+        state = self._symbols.get(symbol)
+        if state is None or state.updated_at is None or time.time() - state.updated_at > self.max_age:
+            return None
+        return state
+
+    def fresh_states(self, field='updated_at'):
+        """États mis à jour récemment (`mark_updated_at` pour les données futures)."""
+        now = time.time()
+        return [
+            state for state in list(self._symbols.values())
+            if getattr(state, field) is not None and now - getattr(state, field) <= self.max_age
+        ]
+
+    def __len__(self):
+        return len(self._symbols)
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+class StreamStats:
+    """Métriques d'un flux : messages, reconnexions et retard (heure d'événement → réception).
+
+    `errors` compte les erreurs de connexion, suivies d'une reconnexion ; `message_errors`
+    les messages ou événements illisibles, ignorés sans couper le flux.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = 0
+        self.connects = 0
+        self.errors = 0
+        self.message_errors = 0
+        self.last_message_at = None
+        self.last_lag_ms = None
+        self.max_lag_ms = 0
+        self._lag_total = 0
+        self._lag_count = 0
+
+    def record(self, event_time_ms):
+        now = time.time()
+        self.messages += 1
+        self.last_message_at = now
+        if event_time_ms:
+            lag = max(now * 1000 - event_time_ms, 0)
+            self.last_lag_ms = round(lag, 1)
+            self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+            self._lag_total += lag
+            self._lag_count += 1
+
+    def to_dict(self):
+        return {
+            'messages': self.messages,
+            'connects': self.connects,
+            'errors': self.errors,
+            'message_errors': self.message_errors,
+            'last_message_age': round(time.time() - self.last_message_at, 1) if self.last_message_at else None,
+            'last_lag_ms': self.last_lag_ms,
+            'avg_lag_ms': round(self._lag_total / self._lag_count, 1) if self._lag_count else None,
+            'max_lag_ms': self.max_lag_ms
+        }
+
+
+async def websocket_connect(url):
+    # Import différé : la dépendance n'est nécessaire que si les flux sont activés
+    import websockets
+    return await websockets.connect(url, ping_interval=20, max_queue=1024)
+
+
+class StreamSource:
+    """Un flux WebSocket combiné et la fonction qui applique ses messages à l'état."""
+
+    def __init__(self, name, url, handler, resync=None):
+        self.name = name
+        self.url = url
+        self.handler = handler
+        self.resync = resync
+        self.stats = StreamStats(name)
+
+
+class MarketStream:
+    """Consommateur asyncio des flux de marché, exécuté dans un thread de fond.
+
+    Chaque source est consommée dans sa propre tâche ; à chaque (re)connexion, la
+    fonction `resync` de la source recharge un instantané REST pour combler les
+    messages manqués pendant la coupure. Seules les erreurs de transport provoquent une
+    reconnexion (et donc un resync) : un message malformé est compté puis ignoré.
+    """
+
+    def __init__(self, sources, connect=websocket_connect, reconnect_max_delay=RECONNECT_MAX_DELAY):
+        self.sources = sources
+        self.connect = connect
+        self.reconnect_max_delay = reconnect_max_delay
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+
+    async def consume(self, source):
+        delay = 0.5
+        while not self._stopping.is_set():
+            try:
+                connection = await self.connect(source.url)
+                source.stats.connects += 1
+                delay = 0.5
+                if source.resync is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, source.resync)
+                try:
+                    async for raw in connection:
+                        if self._stopping.is_set():
+                            break
+                        self._dispatch(source, raw)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                source.stats.errors += 1
+                print(f"Erreur sur le flux {source.name}: {str(e)}")
+            if self._stopping.is_set():
+                break
+            # Reconnexion avec backoff exponentiel
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def _dispatch(self, source, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError as e:
+            self._message_error(source, e)
+            return
+        # Flux combinés : {"stream": ..., "data": ...}
+        data = message.get('data', message) if isinstance(message, dict) else message
+        events = data if isinstance(data, list) else [data]
+        event_time = 0
+        for event in events:
+            # Un événement illisible n'empêche pas d'appliquer les autres symboles du message
+            try:
+                source.handler(event)
+                event_time = max(event_time, event.get('E') or 0)
+            except Exception as e:
+                self._message_error(source, e)
+        source.stats.record(event_time or None)
+
+    @staticmethod
+    def _message_error(source, error):
+        source.stats.message_errors += 1
+        metrics.inc('manus_errors_total', {'source': 'market_stream'})
+        print(f"Message ignoré sur le flux {source.name}: {str(error)}")
+
+    async def run(self):
+        self._stopping = asyncio.Event()
+        await asyncio.gather(*(self.consume(source) for source in self.sources))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete, args=(self.run(),), name='market-stream', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        while self._stopping is None:
+            time.sleep(0.01)
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    def stats(self):
+        return {source.name: source.stats.to_dict() for source in self.sources}
+
+
+class ReplayConnector:
+    """Remplace la connexion WebSocket par la relecture de messages enregistrés (tests, benchs).
+
+    `recordings` associe une URL à une liste de sessions ; chaque session est une liste de
+    messages bruts, relus dans l'ordre puis suivis d'une déconnexion.
+    """
+
+    def __init__(self, recordings, delay=0):
+        self.recordings = {url: list(sessions) for url, sessions in recordings.items()}
+        self.delay = delay
+        self.urls = []
+
+    async def __call__(self, url):
+        self.urls.append(url)
+        sessions = self.recordings.get(url)
+        if not sessions:
+            raise ConnectionError(f'Aucun enregistrement pour {url}')
+        return _ReplayConnection(sessions.pop(0), self.delay)
+
+
+class _ReplayConnection:
+    def __init__(self, messages, delay):
+        self.messages = messages
+        self.delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for message in self.messages:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield message if isinstance(message, str) else json.dumps(message)
+
+    async def close(self):
+        pass
+
+
+# Table partagée, lue par la valorisation et les scanners
+market_state = MarketState()
+
+
+def _resync_tickers():
+    # Instantané REST de tous les tickers après une (re)connexion
+    from src.services.exchange_client import exchange_client, BINANCE_API_URL
+    response = exchange_client.get(f'{BINANCE_API_URL}/api/v3/ticker/24hr')
+    if response.status_code == 200:
+        for ticker in response.json():
+            market_state.update_ticker(ticker)
+
+
+def default_sources():
+    sources = [
+        StreamSource('spot_tickers', f'{BINANCE_STREAM_URL}/stream?streams=!ticker@arr',
+                     market_state.update_ticker, resync=_resync_tickers),
+        StreamSource('mark_prices', f'{BINANCE_FUTURES_STREAM_URL}/stream?streams=!markPrice@arr@1s',
+                     market_state.update_mark_price),
+    ]
+    if MARKET_STREAM_KLINE_SYMBOLS:
+        streams = '/'.join(
+            f'{symbol.lower()}@kline_{interval}'
+            for symbol in MARKET_STREAM_KLINE_SYMBOLS
+            for interval in MARKET_STREAM_KLINE_INTERVALS
+        )
+        sources.append(StreamSource('klines', f'{BINANCE_STREAM_URL}/stream?streams={streams}', _on_kline))
+    return sources
+
+
+def _on_kline(event):
+    market_state.update_kline(event)
+    kline = event['k']
+    if kline.get('x'):
+        # Bougie clôturée : ajout au stock local utilisé par les scanners
+        from src.services.candle_store import candle_store
+        candle_store.append(event['s'], kline['i'], [[kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v']]])
+
+
+market_stream = MarketStream(default_sources())
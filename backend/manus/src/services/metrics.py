@@ -0,0 +1,366 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de fusion des fichiers des processus arrêtés
+    fcntl = None
+
+from flask import g, request
+from sqlalchemy import event
+
+# Répertoire des métriques partagées entre workers gunicorn (un fichier par processus)
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'metrics')
+)
+# Fréquence d'écriture du fichier du processus (secondes)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Jeton exigé par /api/metrics (Authorization: Bearer ...) ; vide : accès refusé hors tests
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Métriques exposées : nom -> (type, description, bornes)
+DEFINITIONS = {
+    'manus_http_requests_total': ('counter', 'Requêtes HTTP traitées', None),
+    'manus_http_request_duration_seconds': ('histogram', 'Durée des requêtes HTTP par route', LATENCY_BUCKETS),
+    'manus_db_request_duration_seconds': ('histogram', 'Temps passé en base par requête HTTP', LATENCY_BUCKETS),
+    'manus_db_queries_total': ('counter', 'Requêtes SQL exécutées', None),
+    'manus_exchange_requests_total': ('counter', 'Appels aux exchanges par statut', None),
+    'manus_exchange_request_duration_seconds': ('histogram', 'Durée des appels aux exchanges', LATENCY_BUCKETS),
+    'manus_exchange_retries_total': ('counter', 'Nouvelles tentatives des appels aux exchanges', None),
+    'manus_exchange_rate_limit_wait_seconds': ('histogram', 'Attente du poids disponible avant un appel', LATENCY_BUCKETS),
+    'manus_exchange_throttled_total': ('counter', 'Appels abandonnés faute de poids disponible', None),
+    'manus_exchange_circuit_rejected_total': ('counter', 'Appels refusés par un circuit ouvert', None),
+    'manus_exchange_hedged_total': ('counter', 'Seconds appels lancés (requêtes couvertes)', None),
+    'manus_cache_requests_total': ('counter', 'Accès aux caches (hit/miss)', None),
+    'manus_errors_total': ('counter', 'Erreurs interceptées par source', None),
+}
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _file_pid(name):
+    # metrics-<pid>.json -> pid ; None pour metrics-retired.json et les autres fichiers
+    pid = name[len('metrics-'):-len('.json')] if name.startswith('metrics-') and name.endswith('.json') else ''
+    return int(pid) if pid.isdigit() else None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Processus d'un autre utilisateur
+    return True
+
+
+def _merge(snapshots):
+    """Somme de plusieurs états : {(nom, labels): valeur ou [classes, somme]}."""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+    return counters, histograms
+
+
+def bucket_quantile(q, bounds, counts):
+    """Quantile estimé par interpolation linéaire dans les classes (comme histogram_quantile)."""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if i >= len(bounds):
+                return bounds[-1]  # Au-delà de la dernière borne
+            lower = bounds[i - 1] if i > 0 else 0
+            return lower + (bounds[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+class Metrics:
+    """Compteurs et histogrammes du processus, agrégés entre workers via des fichiers.
+
+    Chaque processus écrit périodiquement son état dans `<directory>/metrics-<pid>.json` ;
+    la lecture additionne les fichiers de tous les processus à l'état courant du processus
+    qui répond. Les fichiers des processus arrêtés sont fusionnés dans
+    `metrics-retired.json` : le nombre de fichiers reste borné par le nombre de workers
+    vivants, et un pid réutilisé n'écrase pas les compteurs de son prédécesseur.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # Faux tant que le fichier d'un éventuel prédécesseur de même pid n'a pas été fusionné
+        self._claimed = False
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _key(labels or {}))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        bounds = DEFINITIONS[name][2]
+        key = (name, _key(labels or {}))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(bounds) + 1), 0.0]
+            histogram[0][bisect.bisect_left(bounds, value)] += 1
+            histogram[1] += value
+
+    def quantile(self, name, labels, q):
+        """Quantile estimé d'un histogramme du processus, et son nombre d'observations."""
+        with self._lock:
+            histogram = self._histograms.get((name, _key(labels)))
+            counts = list(histogram[0]) if histogram is not None else []
+        if not counts:
+            return None, 0
+        return bucket_quantile(q, DEFINITIONS[name][2], counts), sum(counts)
+
+    def cache(self, name, hit):
+        self.inc('manus_cache_requests_total', {'cache': name, 'result': 'hit' if hit else 'miss'})
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(map(list, labels)), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(map(list, labels)), list(counts), total]
+                    for (name, labels), (counts, total) in self._histograms.items()
+                ]
+            }
+
+    def _path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    @contextmanager
+    def _directory_lock(self):
+        """Verrou de fichier partagé par les workers, pris pour fusionner et pour lire."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _retire(self):
+        """Fusionne dans metrics-retired.json les fichiers des processus arrêtés (verrou pris)."""
+        if fcntl is None or not os.path.isdir(self.directory):
+            return
+        own = os.getpid()
+        retired = []
+        for name in os.listdir(self.directory):
+            pid = _file_pid(name)
+            if pid is None or (pid == own and self._claimed) or (pid != own and _pid_alive(pid)):
+                continue
+            retired.append(os.path.join(self.directory, name))
+        if not retired:
+            self._claimed = True
+            return
+
+        snapshots = []
+        for path in [os.path.join(self.directory, 'metrics-retired.json')] + retired:
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Pas encore de total des processus arrêtés, ou fichier illisible
+        counters, histograms = _merge(snapshots)
+        total = {
+            'counters': [[name, list(map(list, labels)), value] for (name, labels), value in counters.items()],
+            'histograms': [
+                [name, list(map(list, labels)), counts, value]
+                for (name, labels), (counts, value) in histograms.items()
+            ]
+        }
+        path = os.path.join(self.directory, 'metrics-retired.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(total, f)
+        os.replace(path + '.tmp', path)
+        for path in retired:
+            os.remove(path)
+        self._claimed = True
+
+    def flush(self):
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        try:
+            if not self._claimed:
+                with self._directory_lock():
+                    self._retire()
+                self._claimed = True
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path()
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture des métriques : {str(e)}")
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """État agrégé de tous les processus : {(nom, labels): valeur ou [classes, somme]}."""
+        snapshots = [self.snapshot()]
+        own = self._path()
+        if self.directory and os.path.isdir(self.directory):
+            # Sous verrou : un fichier fusionné n'est jamais compté deux fois
+            with self._directory_lock():
+                try:
+                    self._retire()
+                except (OSError, ValueError) as e:
+                    print(f"Erreur lors de la fusion des métriques : {str(e)}")
+                for name in os.listdir(self.directory):
+                    path = os.path.join(self.directory, name)
+                    if not name.startswith('metrics-') or not name.endswith('.json') or path == own:
+                        continue
+                    try:
+                        with open(path) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue  # Fichier en cours de remplacement
+        return _merge(snapshots)
+
+    def render(self):
+        """Format texte Prometheus (version 0.0.4)."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, description, bounds) in DEFINITIONS.items():
+            series = sorted(
+                (labels, value) for (metric, labels), value in (counters if kind == 'counter' else histograms).items()
+                if metric == name
+            )
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in series:
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(bounds + ('+Inf',), counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        """Compteurs et quantiles estimés des histogrammes, pour une lecture directe (JSON)."""
+        counters, histograms = self.collect()
+        result = {'counters': [], 'histograms': []}
+        for (name, labels), value in sorted(counters.items()):
+            result['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            bounds = DEFINITIONS[name][2]
+            entry = {'name': name, 'labels': dict(labels), 'count': sum(counts), 'sum': round(total, 6)}
+            for q in quantiles:
+                entry[f'p{int(q * 100)}'] = bucket_quantile(q, bounds, counts)
+            result['histograms'].append(entry)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Instance partagée par le processus
+metrics = Metrics()
+atexit.register(metrics.flush)
+
+
+def exchange_name(host):
+    # api.binance.com, fapi.binance.com -> binance ; adresse IP ou localhost inchangée
+    parts = host.split(':')[0].split('.')
+    if len(parts) >= 2 and not parts[-1].isdigit():
+        return parts[-2]
+    return host
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    # Hors requête HTTP (tâches de fond), le temps SQL n'est rattaché à aucune route
+    if g and 'metrics_db_time' in g:
+        g.metrics_db_time += time.perf_counter() - started
+        g.metrics_db_queries += 1
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_time = 0.0
+    g.metrics_db_queries = 0
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    labels = {'blueprint': request.blueprint or 'app', 'route': route, 'method': request.method}
+    metrics.observe('manus_http_request_duration_seconds', time.perf_counter() - started, labels)
+    metrics.inc('manus_http_requests_total', dict(labels, status=response.status_code))
+    metrics.observe('manus_db_request_duration_seconds', g.pop('metrics_db_time', 0.0), labels)
+    metrics.inc('manus_db_queries_total', labels, g.pop('metrics_db_queries', 0))
+    metrics.maybe_flush()
+    return response
+
+
+def init_metrics(app, engine):
+    """Mesure la durée de chaque requête, son temps en base et son nombre de requêtes SQL."""
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
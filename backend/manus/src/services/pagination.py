@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Taille de page par défaut et maximale
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(time_value, row_id):
+    # Curseur opaque : position (date, id) de la dernière ligne renvoyée
+    payload = json.dumps([time_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        time_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(time_value), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Curseur invalide')
+
+
+def page_size(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def keyset_filter(query, time_column, id_column, cursor):
+    """Restreint une requête triée par (date, id) décroissants aux lignes après le curseur."""
+    if not cursor:
+        return query
+    time_value, row_id = decode_cursor(cursor)
+    return query.filter(or_(
+        time_column < time_value,
+        and_(time_column == time_value, id_column < row_id)
+    ))
+
+
+def keyset_page(query, time_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, time_attr='time'):
+    """Renvoie une page de résultats et le curseur de la page suivante (ou None)."""
+    query = keyset_filter(query, time_column, id_column, cursor)
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_attr), last.id)
+    return rows, next_cursor
@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.services.rate_limit import current_priority, priority
+
+# Nombre maximal d'appels simultanés vers les exchanges (pool partagé par le worker)
+FETCH_WORKERS = int(os.getenv('EXCHANGE_FETCH_WORKERS', '8'))
+# Appels simultanés des scanners, dans un pool distinct : un scan (plus d'un millier de
+# klines) ne fait jamais attendre les appels des requêtes utilisateur dans la file du pool
+SCAN_FETCH_WORKERS = int(os.getenv('SCAN_FETCH_WORKERS', '8'))
+# Délai total maximal pour une requête qui interroge plusieurs exchanges (secondes)
+REQUEST_DEADLINE = float(os.getenv('EXCHANGE_REQUEST_DEADLINE', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='exchange-fetch')
+scan_executor = ThreadPoolExecutor(max_workers=SCAN_FETCH_WORKERS, thread_name_prefix='scan-fetch')
+
+
+def _timed_call(func, level):
+    started = time.perf_counter()
+    try:
+        # Les threads du pool héritent de la classe de priorité de l'appelant
+        with priority(level):
+            return func(), None, (time.perf_counter() - started) * 1000
+    except Exception as e:
+        return None, e, (time.perf_counter() - started) * 1000
+
+
+def run_parallel(tasks, deadline=None, executor=None):
+    """Exécute les tâches en parallèle et renvoie les résultats disponibles à l'échéance.
+
+    `tasks` associe un identifiant à un callable sans argument. Chaque entrée du
+    résultat contient `status` ('ok', 'error' ou 'timeout'), `latency_ms`,
+    `result` et `error`. `executor` remplace le pool partagé (ex. `scan_executor`).
+    """
+    if deadline is None:
+        deadline = REQUEST_DEADLINE
+    if executor is None:
+        executor = _executor
+
+    started = time.perf_counter()
+    level = current_priority()
+    futures = {name: executor.submit(_timed_call, func, level) for name, func in tasks.items()}
+    wait(futures.values(), timeout=deadline)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            # Libère la place dans le pool si l'appel n'a pas encore démarré
+            future.cancel()
+            results[name] = {
+                'status': 'timeout',
+                'latency_ms': round(elapsed_ms, 1),
+                'result': None,
+                'error': f'Délai dépassé ({deadline}s)'
+            }
+            continue
+
+        result, error, latency_ms = future.result()
+        results[name] = {
+            'status': 'ok' if error is None else 'error',
+            'latency_ms': round(latency_ms, 1),
+            'result': result,
+            'error': str(error) if error is not None else None
+        }
+
+    return results
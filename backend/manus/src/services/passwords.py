@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+# Coût bcrypt des nouveaux hachages ; les mots de passe existants sont rehachés à la connexion
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# Processus dédiés au hachage (0 : hachage dans le thread de la requête)
+PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', str(min(os.cpu_count() or 1, 4))))
+# Nombre maximal d'opérations en cours ou en attente ; au-delà, réponse 503 immédiate
+PASSWORD_QUEUE_LIMIT = int(os.getenv('PASSWORD_QUEUE_LIMIT', str(max(PASSWORD_WORKERS, 1) * 4)))
+# Délai maximal d'attente d'un résultat (secondes)
+PASSWORD_TIMEOUT = float(os.getenv('PASSWORD_TIMEOUT', '10'))
+
+
+class PasswordHasherBusy(Exception):
+    """File d'attente du hachage pleine : la requête doit être rejetée (503)."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    # Format $2b$<coût>$<sel+hachage>
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Hachage et vérification bcrypt dans un pool de processus borné.
+
+    Les workers HTTP ne calculent plus eux-mêmes les hachages : une rafale de connexions
+    occupe au plus `workers` cœurs, et au-delà de `queue_limit` opérations en attente les
+    nouvelles demandes sont refusées immédiatement au lieu de bloquer le reste de l'API.
+    """
+
+    def __init__(self, workers=PASSWORD_WORKERS, queue_limit=PASSWORD_QUEUE_LIMIT,
+                 rounds=BCRYPT_ROUNDS, timeout=PASSWORD_TIMEOUT):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # forkserver : pas de fork d'un processus multi-thread, et le module
+                    # principal de l'application n'est pas réimporté dans les workers
+                    if 'forkserver' in multiprocessing.get_all_start_methods():
+                        context = multiprocessing.get_context('forkserver')
+                        context.set_forkserver_preload(['bcrypt'])
+                    else:
+                        context = multiprocessing.get_context('spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._pool().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verify(self, password, hashed):
+        return self._run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def check(self, password, hashed):
+        """Vérifie le mot de passe ; renvoie (valide, nouveau hachage si le coût a changé)."""
+        if not self.verify(password, hashed):
+            return False, None
+        if not self.needs_rehash(hashed):
+            return True, None
+        try:
+            return True, self.hash(password)
+        except PasswordHasherBusy:
+            # Rehachage reporté à une prochaine connexion
+            return True, None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# Instance partagée par les routes d'authentification du worker
+password_hasher = PasswordHasher()
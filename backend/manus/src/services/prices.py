@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+from src.services.exchange_client import exchange_client, BINANCE_API_URL
+from src.services.market_stream import market_state
+
+# Durée de validité des prix en cache (secondes)
+PRICE_TTL = float(os.getenv('PRICE_CACHE_TTL', '30'))
+
+# Actifs considérés comme valant 1 USD
+USD_ASSETS = {'USD', 'USDT', 'BUSD', 'USDC', 'FDUSD', 'TUSD', 'DAI'}
+# Paires de conversion essayées dans l'ordre : actif/USDT, actif/BUSD, actif/BTC...
+BRIDGE_ASSETS = ('USDT', 'BUSD', 'USDC', 'BTC')
+
+
+def fetch_binance_tickers():
+    # Un seul appel pour tous les symboles (poids fixe, indépendant du nombre d'actifs)
+    response = exchange_client.get(f'{BINANCE_API_URL}/api/v3/ticker/price')
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} depuis Binance')
+    return {ticker['symbol']: float(ticker['price']) for ticker in response.json()}
+
+
+class PriceOracle:
+    """Cache en mémoire des prix de toutes les paires, rafraîchi en une requête par exchange.
+
+    Quand les flux de marché sont actifs (`live`), leurs prix sont lus en priorité et le
+    cache REST ne sert plus que de secours.
+    """
+
+    def __init__(self, fetchers=None, ttl=PRICE_TTL, live=None):
+        self.fetchers = fetchers if fetchers is not None else {'binance': fetch_binance_tickers}
+        self.live = live if live is not None else {'binance': market_state}
+        self.ttl = ttl
+        self._tickers = {}
+        self._updated_at = {}
+        self._locks = {platform: threading.Lock() for platform in self.fetchers}
+
+    def is_stale(self, platform='binance'):
+        live = self.live.get(platform)
+        if live is not None and live.is_live():
+            return False
+        updated_at = self._updated_at.get(platform)
+        return updated_at is None or time.monotonic() - updated_at > self.ttl
+
+    def refresh(self, platform='binance'):
+        lock = self._locks[platform]
+        # Un seul rafraîchissement à la fois : les appels concurrents réutilisent son résultat
+        if not lock.acquire(blocking=False):
+            with lock:
+                return
+        try:
+            self._tickers[platform] = self.fetchers[platform]()
+            self._updated_at[platform] = time.monotonic()
+        finally:
+            lock.release()
+
+    def refresh_if_stale(self, platform='binance'):
+        if self.is_stale(platform):
+            self.refresh(platform)
+
+    def status(self, platform='binance'):
+        updated_at = self._updated_at.get(platform)
+        live = self.live.get(platform)
+        return {
+            'stale': self.is_stale(platform),
+            'live': live is not None and live.is_live(),
+            'age_seconds': round(time.monotonic() - updated_at, 1) if updated_at is not None else None
+        }
+
+    def usd_price(self, asset, platform='binance'):
+        """Prix en USD d'un actif à partir du cache uniquement (aucun appel réseau)."""
+        if asset in USD_ASSETS:
+            return 1.0
+
+        for bridge in BRIDGE_ASSETS:
+            price = self._pair_price(f'{asset}{bridge}', platform)
+            if price is None:
+                # Paire inversée (ex. USDTTRY pour valoriser TRY)
+                inverse = self._pair_price(f'{bridge}{asset}', platform)
+                price = 1 / inverse if inverse else None
+            if price is None:
+                continue
+            bridge_price = self.usd_price(bridge, platform) if bridge not in USD_ASSETS else 1.0
+            if bridge_price is None:
+                continue
+            return price * bridge_price
+
+        return None
+
+    def _pair_price(self, symbol, platform):
+        live = self.live.get(platform)
+        state = live.fresh(symbol) if live is not None else None
+        if state is not None and state.last_price is not None:
+            return state.last_price
+        return self._tickers.get(platform, {}).get(symbol)
+
+
+# Instance partagée par toutes les routes du worker
+price_oracle = PriceOracle()
@@ -0,0 +1,272 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from flask import has_request_context
+
+from src.services.metrics import metrics, exchange_name
+
+# Désactive la régulation (proxy qui gère lui-même les limites, tests de charge...)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# Fraction du poids autorisé réellement utilisée : marge pour les autres clients de l'IP
+RATE_LIMIT_HEADROOM = float(os.getenv('RATE_LIMIT_HEADROOM', '0.9'))
+# Poids par minute autorisés par Binance pour une IP : API spot et API futures
+BINANCE_WEIGHT_LIMIT = int(os.getenv('BINANCE_WEIGHT_LIMIT', '6000'))
+BINANCE_FUTURES_WEIGHT_LIMIT = int(os.getenv('BINANCE_FUTURES_WEIGHT_LIMIT', '2400'))
+# Poids par minute accordé à une même clé API (répartition équitable entre utilisateurs)
+RATE_LIMIT_KEY_WEIGHT = int(os.getenv('RATE_LIMIT_KEY_WEIGHT', '1200'))
+# Attente maximale avant d'abandonner un appel (secondes) : courte pour les requêtes utilisateur
+RATE_LIMIT_INTERACTIVE_MAX_WAIT = float(os.getenv('RATE_LIMIT_INTERACTIVE_MAX_WAIT', '2'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '30'))
+# Blocage appliqué après un 418/429 sans en-tête Retry-After (secondes)
+RATE_LIMIT_DEFAULT_BAN = 60
+
+# Classes de priorité, de la plus prioritaire à la moins prioritaire
+INTERACTIVE = 'interactive'
+SYNC = 'sync'
+SCAN = 'scan'
+PRIORITIES = (INTERACTIVE, SYNC, SCAN)
+# Part du budget accessible à chaque classe : le reste est réservé aux classes supérieures
+PRIORITY_SHARES = {INTERACTIVE: 1.0, SYNC: 0.8, SCAN: 0.6}
+
+# Fenêtre des limites Binance (secondes) et en-têtes du poids consommé sur cette fenêtre
+WEIGHT_INTERVAL = 60
+USED_WEIGHT_HEADERS = ('X-MBX-USED-WEIGHT-1M', 'X-MBX-USED-WEIGHT')
+
+
+def _klines_weight(params):
+    limit = int(params.get('limit', 500))
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+# Poids des endpoints appelés (documentation Binance) ; 1 par défaut
+ENDPOINT_WEIGHTS = {
+    '/api/v3/account': 20,
+    '/api/v3/myTrades': 20,
+    '/api/v3/klines': _klines_weight,
+    '/api/v3/ticker/24hr': lambda params: 2 if 'symbol' in params else 80,
+    '/api/v3/ticker/price': lambda params: 2 if 'symbol' in params else 4,
+    '/fapi/v1/premiumIndex': lambda params: 1 if 'symbol' in params else 10,
+}
+
+
+class RateLimitExceeded(RuntimeError):
+    """Appel abandonné : le poids disponible ne serait pas libéré à temps."""
+
+
+_priority = ContextVar('exchange_priority', default=None)
+
+
+def current_priority():
+    """Classe des appels en cours : explicite, sinon interactive pendant une requête HTTP."""
+    explicit = _priority.get()
+    if explicit is not None:
+        return explicit
+    return INTERACTIVE if has_request_context() else SYNC
+
+
+@contextmanager
+def priority(level):
+    """Classe les appels aux exchanges faits dans le bloc (threads de run_parallel compris)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def request_weight(path, params=None):
+    weight = ENDPOINT_WEIGHTS.get(path, 1)
+    return weight(params or {}) if callable(weight) else weight
+
+
+def weight_limit(path):
+    return BINANCE_FUTURES_WEIGHT_LIMIT if path.startswith('/fapi/') else BINANCE_WEIGHT_LIMIT
+
+
+class WeightBucket:
+    """Seau à jetons de poids, doublé du décompte de la fenêtre fixe de l'exchange.
+
+    Le seau lisse les rafales ; la fenêtre (alignée sur la minute, comme chez Binance)
+    garantit que le poids consommé sur une minute ne dépasse jamais la capacité. Le
+    poids déclaré par l'exchange (`sync`) y inclut les appels des autres workers.
+    """
+
+    def __init__(self, limit, interval=WEIGHT_INTERVAL, headroom=RATE_LIMIT_HEADROOM):
+        self.capacity = max(limit * headroom, 1)
+        self.interval = interval
+        self.rate = self.capacity / interval
+        self.tokens = self.capacity
+        self.window = None
+        self.window_used = 0
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        window = int(time.time() // self.interval)
+        if window != self.window:
+            self.window = window
+            self.window_used = 0
+
+    def delay(self, weight, share=1.0):
+        """Attente (secondes) avant de pouvoir consommer `weight` ; 0 si possible tout de suite."""
+        self._refill()
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        budget = self.capacity * share
+        # Un appel plus lourd que la part de sa classe passe quand le seau est plein
+        weight = min(weight, budget)
+        reserve = self.capacity - budget
+        if self.window_used + weight > budget:
+            return self.interval - time.time() % self.interval
+        missing = weight + reserve - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self, weight):
+        self.tokens -= weight
+        self.window_used += weight
+
+    def sync(self, used):
+        """Aligne la fenêtre sur le poids consommé annoncé par l'exchange."""
+        self._refill()
+        self.window_used = max(self.window_used, used)
+        self.tokens = min(self.tokens, self.capacity - used)
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def stats(self):
+        self._refill()
+        return {
+            'capacity': round(self.capacity),
+            'tokens': round(self.tokens, 1),
+            'window_used': self.window_used,
+            'blocked_for': round(max(self.blocked_until - time.monotonic(), 0), 1)
+        }
+
+
+class RateLimiter:
+    """Régulation des appels aux exchanges par poids : un seau par (exchange, hôte) et par clé API.
+
+    Les appels attendent que leur poids soit disponible dans tous leurs seaux ; les
+    classes inférieures n'accèdent qu'à une part du budget et cèdent leur tour aux
+    appels plus prioritaires en attente. Un 418/429 bloque l'hôte pendant Retry-After.
+    """
+
+    def __init__(self, enabled=RATE_LIMIT_ENABLED, key_weight=RATE_LIMIT_KEY_WEIGHT):
+        self.enabled = enabled
+        self.key_weight = key_weight
+        self._buckets = {}
+        # Appels en attente par (seau de l'hôte, classe)
+        self._waiting = {}
+        self._condition = threading.Condition()
+
+    def _bucket(self, key, limit, headroom=RATE_LIMIT_HEADROOM):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = WeightBucket(limit, headroom=headroom)
+        return bucket
+
+    def _host_key(self, url):
+        parts = urlsplit(url)
+        # Binance compte le poids par IP : tous les appels du worker partagent celle du serveur
+        return ('ip', exchange_name(parts.netloc), parts.netloc), weight_limit(parts.path)
+
+    def _buckets_for(self, url, headers):
+        host_key, limit = self._host_key(url)
+        buckets = [self._bucket(host_key, limit)]
+        api_key = (headers or {}).get('X-MBX-APIKEY')
+        if api_key:
+            # Empreinte de la clé : la clé en clair n'est pas conservée
+            digest = hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+            buckets.append(self._bucket(('key', host_key[1], digest), self.key_weight, headroom=1.0))
+        return host_key, buckets
+
+    def _higher_waiting(self, host_key, level):
+        return any(self._waiting.get((host_key, other)) for other in PRIORITIES[:PRIORITIES.index(level)])
+
+    def acquire(self, url, params=None, headers=None, level=None, max_wait=None):
+        """Réserve le poids de l'appel, en attendant si besoin ; renvoie l'attente en secondes."""
+        if not self.enabled:
+            return 0.0
+        level = level or current_priority()
+        if max_wait is None:
+            max_wait = RATE_LIMIT_INTERACTIVE_MAX_WAIT if level == INTERACTIVE else RATE_LIMIT_MAX_WAIT
+        weight = request_weight(urlsplit(url).path, params)
+        started = time.monotonic()
+        deadline = started + max_wait
+
+        with self._condition:
+            host_key, buckets = self._buckets_for(url, headers)
+            exchange = host_key[1]
+            waiting = (host_key, level)
+            self._waiting[waiting] = self._waiting.get(waiting, 0) + 1
+            try:
+                while True:
+                    delay = max(bucket.delay(weight, PRIORITY_SHARES[level]) for bucket in buckets)
+                    if delay == 0 and self._higher_waiting(host_key, level):
+                        delay = 0.05  # Laisse passer les appels plus prioritaires
+                    if delay == 0:
+                        break
+                    if time.monotonic() + delay > deadline:
+                        metrics.inc('manus_exchange_throttled_total', {'exchange': exchange, 'priority': level})
+                        raise RateLimitExceeded(
+                            f'Limite de poids {exchange} atteinte : appel {level} différé de plus de {max_wait}s'
+                        )
+                    self._condition.wait(min(delay, 1.0))
+                for bucket in buckets:
+                    bucket.consume(weight)
+            finally:
+                self._waiting[waiting] -= 1
+                self._condition.notify_all()
+
+        waited = time.monotonic() - started
+        metrics.observe('manus_exchange_rate_limit_wait_seconds', waited, {'exchange': exchange, 'priority': level})
+        return waited
+
+    def update(self, url, response):
+        """Prend en compte le poids annoncé par l'exchange et les refus 418/429."""
+        if not self.enabled:
+            return
+        response_headers = getattr(response, 'headers', None) or {}
+        used = next((response_headers.get(name) for name in USED_WEIGHT_HEADERS if response_headers.get(name)), None)
+        status = getattr(response, 'status_code', None)
+        with self._condition:
+            host_key, limit = self._host_key(url)
+            bucket = self._bucket(host_key, limit)
+            if used is not None:
+                try:
+                    bucket.sync(int(used))
+                except ValueError:
+                    pass
+            if status in (418, 429):
+                try:
+                    retry_after = float(response_headers.get('Retry-After') or RATE_LIMIT_DEFAULT_BAN)
+                except ValueError:
+                    retry_after = RATE_LIMIT_DEFAULT_BAN
+                bucket.block(retry_after)
+                print(f"Limite de poids dépassée sur {host_key[2]} (HTTP {status}) : pause de {retry_after}s")
+
+    def stats(self):
+        """État des seaux par hôte (les seaux par clé ne sont pas exposés)."""
+        with self._condition:
+            return {
+                key[2]: bucket.stats()
+                for key, bucket in self._buckets.items()
+                if key[0] == 'ip'
+            }
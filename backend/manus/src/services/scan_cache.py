@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.services.events import event_bus
+from src.services.metrics import metrics
+from src.services.scanner import SCANNERS
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+# Durée d'un cycle de scan (secondes) : les résultats sont partagés par tous les utilisateurs
+SCAN_CACHE_TTL = float(os.getenv('SCAN_CACHE_TTL', '300'))
+# Répertoire des résultats partagés entre processus (un fichier JSON par plateforme et scanner)
+SCAN_CACHE_DIR = os.getenv(
+    'SCAN_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'scan_cache')
+)
+
+
+class ScanCache:
+    """Résultats de scan calculés une fois par (plateforme, type de scanner, cycle).
+
+    Les résultats sont écrits dans `directory`, lu par tous les workers : le calcul est fait
+    par le planificateur (`warm`) et les requêtes se contentent de lire le dernier fichier.
+    Une requête ne lance un scan que si aucun résultat récent n'existe (démarrage à froid,
+    planificateur absent) ; un verrou de fichier garantit alors un seul calcul à la fois.
+    """
+
+    def __init__(self, scanners=None, ttl=SCAN_CACHE_TTL, directory=SCAN_CACHE_DIR):
+        self.scanners = scanners if scanners is not None else SCANNERS
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def cycle(self):
+        return int(time.time() // self.ttl)
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, key, suffix='.json'):
+        return os.path.join(self.directory, f'{key[0]}_{key[1]}{suffix}')
+
+    @contextmanager
+    def _file_lock(self, key, blocking):
+        """Verrou de calcul partagé par les workers ; renvoie False s'il est déjà pris."""
+        if fcntl is None or self.directory is None:
+            yield True
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key, '.lock'), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _entry(self, key):
+        """Dernier résultat connu : en mémoire, ou relu depuis le fichier s'il a changé."""
+        entry = self._entries.get(key)
+        if self.directory is None:
+            return entry
+        try:
+            mtime = os.stat(self._path(key)).st_mtime_ns
+        except FileNotFoundError:
+            return entry
+        if entry is not None and entry.get('mtime') == mtime:
+            return entry
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return entry
+        if entry is None or stored['computed_at'] > entry['computed_at']:
+            entry = dict(stored, mtime=mtime)
+            self._entries[key] = entry
+        return entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Écriture atomique : les autres workers lisent l'ancien ou le nouveau fichier, jamais un mélange
+        with open(f'{path}.{os.getpid()}.tmp', 'w') as f:
+            json.dump(entry, f)
+        os.replace(f'{path}.{os.getpid()}.tmp', path)
+        entry['mtime'] = os.stat(path).st_mtime_ns
+
+    def get(self, platform, scanner_type, compute=True):
+        """Résultats du cycle courant.
+
+        Avec `compute=False` (requêtes), le dernier résultat connu est servi tant qu'il a
+        moins de deux cycles, même si le planificateur n'a pas encore calculé le cycle courant.
+        """
+        key = (platform, scanner_type)
+        cycle = self.cycle()
+        entry = self._entry(key)
+        if entry is not None and (entry['cycle'] == cycle or (not compute and entry['cycle'] >= cycle - 1)):
+            metrics.cache('scan', True)
+            return entry['results']
+        metrics.cache('scan', False)
+
+        # Un seul calcul par clé ; pendant qu'il tourne, les autres requêtes reçoivent
+        # les résultats du cycle précédent (ou attendent s'il n'y en a pas)
+        lock = self._lock_for(key)
+        if not lock.acquire(blocking=entry is None):
+            return entry['results']
+        try:
+            with self._file_lock(key, blocking=entry is None) as acquired:
+                if not acquired:
+                    return entry['results']
+                # Calculé entre-temps par un autre thread ou un autre worker
+                entry = self._entry(key)
+                if entry is not None and entry['cycle'] == cycle:
+                    return entry['results']
+                try:
+                    results = self._dedupe(self.scanners[scanner_type](platform))
+                except Exception as e:
+                    print(f"Erreur lors du scan {scanner_type} pour {platform}: {str(e)}")
+                    metrics.inc('manus_errors_total', {'source': 'scan'})
+                    # Derniers résultats connus en cas d'échec
+                    return entry['results'] if entry is not None else []
+                self._store(key, {'cycle': cycle, 'results': results, 'computed_at': time.time()})
+                self._publish_delta(platform, scanner_type, entry['results'] if entry is not None else [], results)
+                return results
+        finally:
+            lock.release()
+
+    def version(self, platform, scanner_type):
+        """Date du calcul en cache pour le cycle courant, None s'il reste à faire."""
+        entry = self._entry((platform, scanner_type))
+        if entry is not None and entry['cycle'] == self.cycle():
+            return entry['computed_at']
+        return None
+
+    @staticmethod
+    def _dedupe(results):
+        seen = set()
+        unique = []
+        for row in results:
+            if row['symbol'] in seen:
+                continue
+            seen.add(row['symbol'])
+            unique.append(row)
+        return unique
+
+    @staticmethod
+    def _publish_delta(platform, scanner_type, before, after):
+        # Seules les opportunités apparues ou disparues sont poussées aux abonnés SSE
+        before_symbols = {row['symbol'] for row in before}
+        after_symbols = {row['symbol'] for row in after}
+        added = [row for row in after if row['symbol'] not in before_symbols]
+        removed = sorted(before_symbols - after_symbols)
+        if added or removed:
+            event_bus.publish('opportunities', {
+                'platform': platform,
+                'type': scanner_type,
+                'added': added,
+                'removed': removed
+            })
+
+    def warm(self, platform='binance'):
+        # Précalcul de tous les scanners (tâche planifiée)
+        for scanner_type in self.scanners:
+            self.get(platform, scanner_type)
+
+    def invalidate(self, platform=None):
+        with self._guard:
+            for key in list(self._entries):
+                if platform is None or key[0] == platform:
+                    del self._entries[key]
+                    if self.directory is not None and os.path.exists(self._path(key)):
+                        os.remove(self._path(key))
+
+
+# Instance partagée : le planificateur écrit les résultats, les workers les lisent
+scan_cache = ScanCache()
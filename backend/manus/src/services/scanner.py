@@ -0,0 +1,299 @@
+import os
+import time
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from src.services.candle_store import candle_store, PRICE_COLUMNS
+from src.services.exchange_client import exchange_client, BINANCE_API_URL
+from src.services.indicators import rsi, ema, atr
+from src.services.market_stream import market_state
+from src.services.parallel import run_parallel, scan_executor
+from src.services.rate_limit import SCAN
+
+# Timeframes analysés par le scanner RSI
+RSI_TIMEFRAMES = ('1h', '4h', '1d')
+# Nombre de bougies chargées par symbole et par timeframe
+KLINES_LIMIT = int(os.getenv('SCANNER_KLINES_LIMIT', '100'))
+# Volume minimal sur 24h (en USDT) pour qu'une paire soit analysée
+SCANNER_MIN_QUOTE_VOLUME = float(os.getenv('SCANNER_MIN_QUOTE_VOLUME', '1000000'))
+# Délai total pour charger les bougies de tout l'univers (secondes)
+SCANNER_DEADLINE = float(os.getenv('SCANNER_DEADLINE', '30'))
+# Seuils RSI
+RSI_PERIOD = 14
+RSI_OVERSOLD = float(os.getenv('RSI_OVERSOLD', '30'))
+RSI_OVERBOUGHT = float(os.getenv('RSI_OVERBOUGHT', '70'))
+# API Binance Futures (USDT-M), utilisée si le flux des mark prices n'est pas actif
+BINANCE_FUTURES_API_URL = os.getenv('BINANCE_FUTURES_API_URL', 'https://fapi.binance.com')
+# Funding rate (en valeur absolue, 0.0005 = 0,05 %) à partir duquel une paire est signalée
+FUNDING_RATE_THRESHOLD = float(os.getenv('FUNDING_RATE_THRESHOLD', '0.0005'))
+
+# Colonnes des bougies chargées : open, high, low, close, volume
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+# Durée d'une bougie par timeframe (ms)
+TIMEFRAME_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+
+def fetch_tickers():
+    """Tickers 24h de toutes les paires : table des flux si elle est à jour, sinon un appel REST."""
+    if market_state.is_live():
+        return [
+            {
+                'symbol': state.symbol,
+                'lastPrice': state.last_price,
+                'quoteVolume': state.quote_volume,
+                'priceChangePercent': state.price_change_percent
+            }
+            for state in market_state.fresh_states()
+            if state.quote_volume is not None
+        ]
+
+    response = exchange_client.get(f'{BINANCE_API_URL}/api/v3/ticker/24hr', priority=SCAN)
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} depuis Binance')
+    return response.json()
+
+
+def fetch_universe(quote='USDT'):
+    """Paires actives cotées en `quote` et suffisamment liquides, en un seul appel."""
+    universe = {}
+    for ticker in fetch_tickers():
+        symbol = ticker['symbol']
+        base = symbol[:-len(quote)]
+        if not symbol.endswith(quote) or not base:
+            continue
+        # Tokens à effet de levier exclus
+        if base.endswith(('UP', 'DOWN', 'BULL', 'BEAR')):
+            continue
+        if float(ticker['quoteVolume']) < SCANNER_MIN_QUOTE_VOLUME:
+            continue
+        universe[symbol] = {
+            'base': base,
+            'quote': quote,
+            'last_price': float(ticker['lastPrice']),
+            'quote_volume': float(ticker['quoteVolume']),
+            'price_change_percent': float(ticker['priceChangePercent'])
+        }
+    return universe
+
+
+def fetch_klines(symbol, interval, limit=KLINES_LIMIT, start_time=None):
+    params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+    if start_time is not None:
+        params['startTime'] = start_time
+    response = exchange_client.get(f'{BINANCE_API_URL}/api/v3/klines', params=params, priority=SCAN)
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} depuis Binance')
+    return response.json()
+
+
+def update_candles(symbol, timeframe, limit=KLINES_LIMIT, store=None):
+    """Complète le stock local avec les bougies manquantes et renvoie les `limit` dernières."""
+    store = store if store is not None else candle_store
+    last_ts = store.last_timestamp(symbol, timeframe)
+    now_ms = int(time.time() * 1000)
+
+    if last_ts is None or now_ms - last_ts > limit * TIMEFRAME_MS[timeframe]:
+        klines = fetch_klines(symbol, timeframe, limit)
+    else:
+        # Seules les bougies depuis la dernière stockée (encore ouverte) sont demandées
+        klines = fetch_klines(symbol, timeframe, limit, start_time=last_ts)
+    store.append(symbol, timeframe, klines)
+
+    window = store.tail(symbol, timeframe, limit)
+    return np.column_stack([window[name] for name in PRICE_COLUMNS])
+
+
+def load_candles(symbols, timeframes=RSI_TIMEFRAMES, limit=KLINES_LIMIT):
+    """Met à jour en parallèle les bougies de chaque (symbole, timeframe) et les charge."""
+    tasks = {
+        (symbol, timeframe): partial(update_candles, symbol, timeframe, limit)
+        for symbol in symbols
+        for timeframe in timeframes
+    }
+    results = run_parallel(tasks, SCANNER_DEADLINE, executor=scan_executor)
+    return {
+        key: outcome['result']
+        for key, outcome in results.items()
+        if outcome['status'] == 'ok'
+    }
+
+
+def compute_indicators(candles, symbols, timeframes=RSI_TIMEFRAMES, limit=KLINES_LIMIT):
+    """Calcule RSI, EMA et ATR de tout l'univers et de tous les timeframes en une passe.
+
+    Les clôtures sont empilées dans une matrice (timeframes x symboles, bougies) ; seuls
+    les symboles disposant d'un historique complet sur chaque timeframe sont retenus.
+    """
+    complete = [
+        symbol for symbol in symbols
+        if all(
+            (symbol, tf) in candles and len(candles[(symbol, tf)]) >= limit
+            for tf in timeframes
+        )
+    ]
+    if not complete:
+        return {}
+
+    # Tenseur (timeframes, symboles, bougies, colonnes)
+    stacked = np.stack([
+        np.stack([candles[(symbol, tf)][-limit:] for symbol in complete])
+        for tf in timeframes
+    ])
+    n_tf, n_symbols = stacked.shape[0], stacked.shape[1]
+    flat = stacked.reshape(n_tf * n_symbols, limit, 5)
+
+    closes = flat[:, :, CLOSE]
+    rsi_last = rsi(closes, RSI_PERIOD)[:, -1].reshape(n_tf, n_symbols)
+    ema_last = ema(closes, 20)[:, -1].reshape(n_tf, n_symbols)
+    atr_last = atr(flat[:, :, HIGH], flat[:, :, LOW], closes, 14)[:, -1].reshape(n_tf, n_symbols)
+
+    indicators = {}
+    for j, symbol in enumerate(complete):
+        values = {}
+        for i, tf in enumerate(timeframes):
+            values[f'rsi_{tf}'] = round(float(rsi_last[i, j]), 2)
+            values[f'ema_20_{tf}'] = float(ema_last[i, j])
+            values[f'atr_14_{tf}'] = float(atr_last[i, j])
+        indicators[symbol] = values
+    return indicators
+
+
+def rsi_condition(value):
+    if value <= RSI_OVERSOLD:
+        return 'RSI survendu'
+    if value >= RSI_OVERBOUGHT:
+        return 'RSI suracheté'
+    return None
+
+
+def scan_rsi(platform='binance'):
+    """Scanner RSI : paires en zone de survente ou de surachat sur l'un des timeframes."""
+    if platform != 'binance':
+        # Autres plateformes...
+        return []
+
+    universe = fetch_universe()
+    symbols = sorted(universe)
+    indicators = compute_indicators(load_candles(symbols), symbols)
+
+    opportunities = []
+    for symbol, values in indicators.items():
+        # Timeframe le plus court présentant un signal
+        for tf in RSI_TIMEFRAMES:
+            condition = rsi_condition(values[f'rsi_{tf}'])
+            if condition:
+                break
+        else:
+            continue
+
+        market = universe[symbol]
+        opportunities.append({
+            'symbol': f"{market['base']}/{market['quote']}",
+            'name': market['base'],
+            'current_price': market['last_price'],
+            'rsi_1h': values['rsi_1h'],
+            'rsi_4h': values['rsi_4h'],
+            'rsi_1d': values['rsi_1d'],
+            'ema_20': values['ema_20_1h'],
+            'atr_14': values['atr_14_1h'],
+            'condition': condition,
+            'timeframe': tf,
+            'platform': platform
+        })
+    return opportunities
+
+
+def scan_funding(platform='binance'):
+    """Scanner des funding rates anormaux."""
+    if platform != 'binance':
+        # Autres plateformes...
+        return []
+
+    opportunities = []
+    for mark in fetch_mark_prices():
+        symbol = mark['symbol']
+        rate = mark['funding_rate']
+        if rate is None or abs(rate) < FUNDING_RATE_THRESHOLD or not symbol.endswith('USDT'):
+            continue
+        base = symbol[:-len('USDT')]
+        opportunities.append({
+            'symbol': f'{base}/USDT',
+            'name': base,
+            'current_price': mark['mark_price'],
+            # En pourcentage, comme affiché par Binance
+            'funding_rate': round(rate * 100, 4),
+            'next_funding_time': (
+                datetime.fromtimestamp(mark['next_funding_time'] / 1000).isoformat()
+                if mark['next_funding_time'] else None
+            ),
+            'condition': 'Funding rate négatif élevé' if rate < 0 else 'Funding rate positif élevé',
+            'platform': platform
+        })
+    opportunities.sort(key=lambda row: abs(row['funding_rate']), reverse=True)
+    return opportunities
+
+
+def fetch_mark_prices():
+    """Mark prices et funding rates des contrats perpétuels : flux si à jour, sinon REST."""
+    states = market_state.fresh_states('mark_updated_at')
+    if states:
+        return [
+            {
+                'symbol': state.symbol,
+                'mark_price': state.mark_price,
+                'funding_rate': state.funding_rate,
+                'next_funding_time': state.next_funding_time
+            }
+            for state in states
+        ]
+
+    response = exchange_client.get(f'{BINANCE_FUTURES_API_URL}/fapi/v1/premiumIndex', priority=SCAN)
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} depuis Binance Futures')
+    return [
+        {
+            'symbol': row['symbol'],
+            'mark_price': float(row['markPrice']),
+            'funding_rate': float(row['lastFundingRate']) if row.get('lastFundingRate') else None,
+            'next_funding_time': row.get('nextFundingTime')
+        }
+        for row in response.json()
+    ]
+
+
+def scan_volume(platform='binance'):
+    """Scanner des volumes anormaux."""
+    if platform != 'binance':
+        # Autres plateformes...
+        return []
+
+    # En production, utiliser l'API Binance
+    # Simulation de données pour démonstration
+    return [
+        {
+            'symbol': 'DOGE/USDT',
+            'name': 'Dogecoin',
+            'current_price': 0.12,
+            'volume_24h': 1200000000,
+            'volume_change': 320,
+            'condition': 'Volume en forte hausse',
+            'platform': platform
+        }
+    ]
+
+
+# Scanners disponibles, par type
+SCANNERS = {
+    'rsi': scan_rsi,
+    'funding': scan_funding,
+    'volume': scan_volume
+}
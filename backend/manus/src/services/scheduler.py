@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+from src.services.metrics import metrics
+
+# Active le planificateur de tâches de fond dans ce processus
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '0') == '1'
+
+
+class Scheduler:
+    """Exécute des tâches périodiques dans un thread de fond, avec le contexte de l'application."""
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, func, interval):
+        self.jobs.append({'name': name, 'func': func, 'interval': interval, 'next_run': 0})
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in self.jobs:
+            if job['next_run'] > now:
+                continue
+            job['next_run'] = now + job['interval']
+            with self.app.app_context():
+                try:
+                    job['func']()
+                except Exception as e:
+                    print(f"Erreur lors de l'exécution de la tâche {job['name']}: {str(e)}")
+                    metrics.inc('manus_errors_total', {'source': f"job:{job['name']}"})
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            next_run = min((job['next_run'] for job in self.jobs), default=time.monotonic() + 1)
+            self._stop.wait(max(next_run - time.monotonic(), 0.1))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
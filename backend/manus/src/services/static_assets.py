@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import send_file
+
+try:
+    import brotli
+except ImportError:  # Brotli optionnel : seules les variantes gzip sont alors produites
+    brotli = None
+
+# Répertoire du build React servi par l'application
+STATIC_DIR = os.getenv('STATIC_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static'))
+# Taille minimale (octets) d'un fichier pour lui générer des variantes compressées
+STATIC_COMPRESS_MIN_SIZE = int(os.getenv('STATIC_COMPRESS_MIN_SIZE', '1024'))
+# Durée de cache des fichiers non hachés (favicon, manifest...) en secondes
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '3600'))
+
+COMPRESSIBLE = ('.js', '.css', '.html', '.json', '.map', '.svg', '.txt', '.ico')
+# Fichiers versionnés par le build (ex. main.27d681a6.js, 453.d855a71b.chunk.js)
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+(\.map)?$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Variantes par ordre de préférence : suffixe du fichier, Content-Encoding, suffixe d'ETag
+ENCODINGS = (('.br', 'br', 'br'), ('.gz', 'gzip', 'gz'))
+
+
+class StaticAsset:
+    __slots__ = ('path', 'mimetype', 'etag', 'mtime', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, etag, mtime, immutable):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.mtime = mtime
+        self.immutable = immutable
+        self.variants = {}
+
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compress_assets(root=STATIC_DIR, min_size=STATIC_COMPRESS_MIN_SIZE):
+    """Écrit les variantes .gz (et .br si Brotli est installé) absentes ou périmées.
+
+    À exécuter au build (`flask compress-static`) : le serveur ne compresse jamais à la volée.
+    """
+    compressors = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    written = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if not name.endswith(COMPRESSIBLE) or os.path.getsize(path) < min_size:
+                continue
+            mtime = os.path.getmtime(path)
+            data = None
+            for suffix, compress in compressors:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                with open(target + '.tmp', 'wb') as out:
+                    out.write(compress(data))
+                os.replace(target + '.tmp', target)
+                written.append(target)
+    return written
+
+
+class StaticManifest:
+    """Inventaire du build, construit une fois au démarrage.
+
+    Chaque fichier est indexé par son chemin d'URL avec son type, une ETag forte issue
+    de son contenu et ses variantes compressées : les requêtes ne touchent plus au
+    système de fichiers avant l'envoi du fichier lui-même.
+    """
+
+    def __init__(self, root=STATIC_DIR):
+        self.root = root
+        self.assets = {}
+        self.build()
+
+    def build(self):
+        assets = {}
+        if os.path.isdir(self.root):
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(('.gz', '.br', '.tmp')):
+                        continue
+                    path = os.path.join(directory, name)
+                    url = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    asset = StaticAsset(
+                        path,
+                        mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                        _digest(path),
+                        os.path.getmtime(path),
+                        bool(HASHED_NAME.search(name))
+                    )
+                    for suffix, encoding, _ in ENCODINGS:
+                        variant = path + suffix
+                        if os.path.exists(variant) and os.path.getmtime(variant) >= asset.mtime:
+                            asset.variants[encoding] = variant
+                    assets[url] = asset
+            # Build aplati (js/, css/ à la racine) : les URL /static/... du index.html restent valides
+            for url, asset in list(assets.items()):
+                assets.setdefault('static/' + url, asset)
+        self.assets = assets
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    @property
+    def index(self):
+        return self.assets.get('index.html')
+
+    def __len__(self):
+        return len(self.assets)
+
+
+def accepted_encodings(header):
+    """Encodages acceptés par le client (q > 0) d'après Accept-Encoding."""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def asset_response(asset, accept_encoding=None):
+    """Réponse pour un fichier du manifeste : variante compressée, ETag forte et cache."""
+    accepted = accepted_encodings(accept_encoding)
+    path, encoding, etag = asset.path, None, asset.etag
+    for _, name, tag in ENCODINGS:
+        if name in asset.variants and (name in accepted or '*' in accepted):
+            path, encoding, etag = asset.variants[name], name, f'{asset.etag}-{tag}'
+            break
+
+    response = send_file(path, mimetype=asset.mimetype, etag=etag, last_modified=asset.mtime, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    if asset.immutable:
+        response.headers['Cache-Control'] = IMMUTABLE
+    elif asset.mimetype == 'text/html':
+        # index.html référence les fichiers hachés du dernier build : toujours revalidé
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    return response
@@ -0,0 +1,179 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, or_
+
+from src.models.user import db, ApiKey, Trade, TradeSyncState
+from src.services.balances import existing_key_ids, latest_snapshots
+from src.services.circuit_breaker import CircuitOpenError
+from src.services.credentials import credential_service
+from src.services.database import upsert
+from src.services.exchanges import fetch_trades, MY_TRADES_LIMIT
+from src.services.metrics import metrics
+from src.services.prices import USD_ASSETS
+from src.services.rate_limit import RateLimitExceeded
+
+# Intervalle de synchronisation des trades par le planificateur (secondes)
+TRADE_SYNC_INTERVAL = float(os.getenv('TRADE_SYNC_INTERVAL', '600'))
+# Âge maximal d'une synchronisation avant que /transactions ne la refasse (planificateur absent)
+TRADE_SYNC_MAX_AGE = float(os.getenv('TRADE_SYNC_MAX_AGE', str(2 * TRADE_SYNC_INTERVAL)))
+# Symboles synchronisés en plus de ceux déduits des soldes (ex. 'BTCUSDT,ETHBTC')
+TRADE_SYNC_SYMBOLS = [s for s in os.getenv('TRADE_SYNC_SYMBOLS', '').split(',') if s]
+# Devises de cotation reconnues pour déduire l'actif de base d'un symbole
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'BUSD', 'USDC', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY')
+
+
+def base_asset(symbol):
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return None
+
+
+def symbols_for_key(api_key):
+    # Symboles déjà présents en base + actifs détenus d'après le dernier snapshot
+    symbols = set(TRADE_SYNC_SYMBOLS)
+    symbols.update(
+        symbol for (symbol,) in
+        db.session.query(Trade.symbol)
+        .filter(Trade.user_id == api_key.user_id, Trade.api_key_id == api_key.id)
+        .distinct()
+    )
+    snapshot = latest_snapshots([api_key.id]).get(api_key.id)
+    if snapshot is not None:
+        symbols.update(f'{asset}USDT' for asset in snapshot.get_assets() if asset not in USD_ASSETS)
+    return sorted(symbols)
+
+
+def _trade_row(api_key, tx):
+    return {
+        'user_id': api_key.user_id,
+        'api_key_id': api_key.id,
+        'platform': api_key.platform,
+        'trade_id': tx['id'],
+        'symbol': tx['symbol'],
+        'base_asset': base_asset(tx['symbol']),
+        'price': float(tx['price']),
+        'quantity': float(tx['qty']),
+        'commission': float(tx['commission']),
+        'commission_asset': tx['commissionAsset'],
+        'time': datetime.fromtimestamp(tx['time'] / 1000, tz=timezone.utc).replace(tzinfo=None),
+        'is_buyer': tx['isBuyer'],
+        'is_maker': tx['isMaker']
+    }
+
+
+def sync_key_trades(api_key, symbols=None):
+    """Synchronisation incrémentale des trades d'une clé ; renvoie le nombre de trades insérés.
+
+    Un symbole en erreur (symbole inconnu ou retiré de la cote...) est journalisé puis
+    ignoré jusqu'au cycle suivant ; seuls un circuit ouvert ou la limite de poids
+    interrompent la synchronisation de la clé.
+    """
+    if api_key.id not in existing_key_ids([api_key]):
+        # Clé supprimée, encore servie par le cache des identités d'un autre worker
+        return 0
+    credentials = credential_service.get(api_key)
+    inserted = 0
+
+    for symbol in symbols if symbols is not None else symbols_for_key(api_key):
+        try:
+            inserted += _sync_symbol(api_key, credentials, symbol)
+        except (CircuitOpenError, RateLimitExceeded):
+            raise
+        except Exception as e:
+            db.session.rollback()
+            # Log l'erreur mais continuer avec les autres symboles
+            print(f"Erreur lors de la synchronisation des trades {symbol} pour {api_key.platform}: {str(e)}")
+            metrics.inc('manus_errors_total', {'source': 'trade_sync'})
+
+    _mark_synced(api_key)
+    return inserted
+
+
+def _mark_synced(api_key):
+    statement = upsert(TradeSyncState).values(api_key_id=api_key.id, synced_at=datetime.utcnow())
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['api_key_id'], set_={'synced_at': statement.excluded.synced_at}
+    ))
+    db.session.commit()
+
+
+def needs_sync(api_key, max_age=None):
+    """Clé jamais synchronisée, ou dont la dernière synchronisation date de plus de `max_age` secondes."""
+    if max_age is None:
+        max_age = TRADE_SYNC_MAX_AGE
+    synced_at = (
+        db.session.query(TradeSyncState.synced_at)
+        .filter(TradeSyncState.api_key_id == api_key.id)
+        .scalar()
+    )
+    return synced_at is None or datetime.utcnow() - synced_at > timedelta(seconds=max_age)
+
+
+def _sync_symbol(api_key, credentials, symbol):
+    # Reprise après le dernier trade stocké pour cette clé et ce symbole
+    last_id = (
+        db.session.query(func.max(Trade.trade_id))
+        .filter(Trade.user_id == api_key.user_id, Trade.api_key_id == api_key.id, Trade.symbol == symbol)
+        .scalar()
+    )
+    from_id = last_id + 1 if last_id is not None else 0
+    inserted = 0
+
+    while True:
+        page = fetch_trades(api_key.platform, credentials.api_key, credentials.api_secret, symbol, from_id)
+        if not page:
+            break
+        # Insertion groupée de la page
+        db.session.execute(insert(Trade), [_trade_row(api_key, tx) for tx in page])
+        db.session.commit()
+        inserted += len(page)
+        from_id = page[-1]['id'] + 1
+        if len(page) < MY_TRADES_LIMIT:
+            break
+
+    return inserted
+
+
+def sync_all_trades(user_id=None):
+    """Synchronise les trades de toutes les clés actives (tâche planifiée)."""
+    query = ApiKey.query.filter(ApiKey.is_active.is_(True))
+    if user_id is not None:
+        query = query.filter(ApiKey.user_id == user_id)
+
+    for api_key in query.order_by(ApiKey.id).all():
+        try:
+            sync_key_trades(api_key)
+        except Exception as e:
+            db.session.rollback()
+            # Log l'erreur mais continuer avec les autres clés API
+            print(f"Erreur lors de la synchronisation des trades pour {api_key.platform}: {str(e)}")
+
+
+def parse_date(value):
+    # Dates ISO 8601, converties en UTC naïf comme les colonnes en base
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def latest_trade_id(user_id):
+    # Les trades ne sont jamais modifiés : le dernier identifiant date l'historique d'un utilisateur
+    return db.session.query(func.max(Trade.id)).filter(Trade.user_id == user_id).scalar()
+
+
+def trades_query(user_id, api_key_ids, platform=None, asset=None, start_date=None, end_date=None):
+    """Requête filtrée sur les trades locaux, servie par les index (user_id, ..., time)."""
+    query = Trade.query.filter(Trade.user_id == user_id, Trade.api_key_id.in_(api_key_ids))
+    if platform:
+        query = query.filter(Trade.platform == platform)
+    if asset:
+        # `asset` accepte un symbole ('BTCUSDT') ou un actif ('BTC')
+        query = query.filter(or_(Trade.symbol == asset, Trade.base_asset == asset))
+    if start_date:
+        query = query.filter(Trade.time >= parse_date(start_date))
+    if end_date:
+        query = query.filter(Trade.time <= parse_date(end_date))
+    return query
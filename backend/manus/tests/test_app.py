@@ -0,0 +1,48 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from sqlalchemy import inspect
+from src.main import create_app
+from src.models.user import db
+
+class TestCreateApp(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, 'manus.db')
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}'})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.tmp)
+
+    def test_schema_created_by_cli_only(self):
+        """Test que la création du schéma passe par la commande init-db et non par l'import"""
+        self.assertFalse(os.path.exists(self.db_path))
+
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with self.app.app_context():
+            self.assertIn('users', inspect(db.engine).get_table_names())
+
+    def test_routes_registered(self):
+        """Test l'enregistrement des blueprints et du healthcheck par la fabrique"""
+        response = self.app.test_client().get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('bots.get_bot_orders', self.app.view_functions)
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        """Test que numpy et requests ne sont pas chargés à l'import de l'application"""
+        code = "import sys, src.main; print(sorted(m for m in ('numpy', 'requests') if m in sys.modules))"
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip().splitlines()[-1], '[]')
+
+if __name__ == '__main__':
+    unittest.main()
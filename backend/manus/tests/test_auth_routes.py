@@ -1,14 +1,14 @@
 import unittest
 import json
-from src.main import app
+from src.main import create_app
 from src.models.user import db, User, ApiKey
 import bcrypt
 
+app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+
 class TestAuthRoutes(unittest.TestCase):
     def setUp(self):
         """Configuration avant chaque test"""
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         self.app = app.test_client()
         
         with app.app_context():
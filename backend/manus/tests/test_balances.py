@@ -0,0 +1,208 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from src.models.user import db, User, ApiKey, BalanceSnapshot
+from src.routes.portfolio import portfolio_bp
+from src.services import balances
+from src.services.credentials import credential_service
+from src.services.events import EventBus
+from src.services.http_cache import init_http_cache
+from src.services.identity import init_identity, identity_cache
+
+class TestBalanceSnapshots(unittest.TestCase):
+    def setUp(self):
+        """Base en mémoire avec un utilisateur et deux clés API"""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='snap', email='snap@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        for platform in ('binance', 'binance'):
+            db.session.add(ApiKey(
+                user_id=user.id,
+                platform=platform,
+                api_key=credential_service.encrypt('key'),
+                api_secret=credential_service.encrypt('secret')
+            ))
+        db.session.commit()
+        self.api_keys = ApiKey.query.order_by(ApiKey.id).all()
+
+        self.prices = mock.patch.object(balances.price_oracle, 'usd_price', lambda asset, platform='binance': {'BTC': 50000.0}.get(asset, 1.0))
+        self.stale = mock.patch.object(balances.price_oracle, 'is_stale', lambda platform='binance': False)
+        self.prices.start()
+        self.stale.start()
+
+    def tearDown(self):
+        self.prices.stop()
+        self.stale.stop()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_refresh_stores_one_snapshot_per_key(self):
+        """Test que le planificateur enregistre un snapshot valorisé par clé"""
+        with mock.patch.object(balances, 'fetch_balances', return_value={'BTC': 0.5, 'USDT': 100.0}):
+            balances.refresh_snapshots()
+
+        latest = balances.latest_snapshots([key.id for key in self.api_keys])
+        self.assertEqual(len(latest), 2)
+        for snapshot in latest.values():
+            self.assertEqual(snapshot.total_usd, 25100.0)
+            self.assertEqual(snapshot.get_assets()['BTC']['amount'], 0.5)
+
+    def test_latest_snapshot_wins(self):
+        """Test que seul le snapshot le plus récent de chaque clé est servi"""
+        with mock.patch.object(balances, 'fetch_balances', side_effect=[{'USDT': 1.0}, {'USDT': 2.0}, {'USDT': 3.0}, {'USDT': 4.0}]):
+            balances.refresh_snapshots()
+            balances.refresh_snapshots()
+
+        latest = balances.latest_snapshots([key.id for key in self.api_keys])
+        payload = balances.build_balance([balances.snapshot_entry(s) for s in latest.values()])
+
+        self.assertEqual(payload['total_balance_usd'], 7.0)
+        self.assertEqual(payload['platforms']['binance']['assets']['USDT']['amount'], 7.0)
+        self.assertFalse(payload['partial'])
+
+    def test_snapshots_of_reused_key_id_are_ignored(self):
+        """Test qu'un snapshot d'un autre utilisateur sous le même identifiant de clé n'est jamais servi"""
+        other = User(username='other', email='other@example.com', password='x')
+        db.session.add(other)
+        db.session.flush()
+        key = self.api_keys[0]
+        # Snapshot laissé par l'ancien propriétaire d'un identifiant réattribué
+        db.session.add(BalanceSnapshot(
+            user_id=other.id, api_key_id=key.id, platform='binance', total_usd=999.0, created_at=datetime.utcnow()
+        ))
+        db.session.commit()
+
+        self.assertEqual(balances.latest_snapshots([key.id]), {})
+        self.assertEqual(balances.balance_history([key.id], datetime.utcnow() - timedelta(days=1), 3600), [])
+
+    def test_deleted_key_id_is_not_reused(self):
+        """Test que l'identifiant d'une clé supprimée n'est pas réattribué"""
+        last = self.api_keys[-1]
+        last_id, user_id = last.id, last.user_id
+        db.session.delete(last)
+        db.session.commit()
+        key = ApiKey(user_id=user_id, platform='binance', api_key='k', api_secret='s')
+        db.session.add(key)
+        db.session.commit()
+
+        self.assertGreater(key.id, last_id)
+
+    def test_deleted_key_served_from_stale_cache_is_not_stored(self):
+        """Test qu'une clé supprimée par un autre worker (cache des identités en retard) n'est pas historisée"""
+        stale = ApiKey(id=self.api_keys[0].id, user_id=self.api_keys[0].user_id, platform='binance')
+        db.session.delete(self.api_keys[0])
+        db.session.commit()
+
+        entry = {'status': 'ok', 'total_usd': 1.0, 'assets': {}, 'as_of': datetime.utcnow()}
+        balances.store_snapshots([stale], {stale.id: entry})
+
+        self.assertEqual(BalanceSnapshot.query.count(), 0)
+
+    def test_failed_fetch_is_not_stored(self):
+        """Test qu'une lecture en erreur n'écrase pas l'historique"""
+        with mock.patch.object(balances, 'fetch_balances', side_effect=RuntimeError('HTTP 500')):
+            balances.refresh_snapshots()
+
+        self.assertEqual(BalanceSnapshot.query.count(), 0)
+
+    def test_balance_changes_are_published(self):
+        """Test que seuls les actifs dont la quantité change sont publiés à l'utilisateur"""
+        bus = EventBus()
+        fetched = [{'BTC': 0.5, 'USDT': 100.0}] * 2 + [{'BTC': 0.5, 'USDT': 100.0}, {'BTC': 0.7}]
+        with mock.patch.object(balances, 'event_bus', bus), \
+                mock.patch.object(balances, 'fetch_balances', side_effect=fetched):
+            balances.refresh_snapshots()
+            balances.refresh_snapshots()
+
+        events, _ = bus.since(0, user_id=self.api_keys[0].user_id)
+        self.assertEqual(len(events), 3)
+        delta = events[-1].data
+        self.assertEqual(delta['api_key_id'], self.api_keys[1].id)
+        self.assertEqual(list(delta['changed']), ['BTC'])
+        self.assertEqual(delta['removed'], ['USDT'])
+
+    def test_history_buckets(self):
+        """Test l'agrégation des snapshots en points réguliers"""
+        start = datetime(2025, 5, 1)
+        first, second = self.api_keys
+        for api_key, hours, total in [(first, 0, 100), (second, 0.5, 50), (first, 1.2, 120), (first, 2.1, 90)]:
+            db.session.add(BalanceSnapshot(
+                user_id=api_key.user_id, api_key_id=api_key.id, platform='binance',
+                total_usd=total, created_at=start + timedelta(hours=hours)
+            ))
+        db.session.commit()
+
+        points = balances.balance_history([first.id, second.id], start, 3600)
+
+        self.assertEqual([p['value'] for p in points], [150, 170, 140])
+        self.assertEqual([p['change'] for p in points], [0, 20, -30])
+        self.assertEqual(points[1]['date'], '2025-05-01T01:00:00Z')
+
+class TestBalanceRoute(unittest.TestCase):
+    def setUp(self):
+        """Route /balance servie depuis un snapshot récent"""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['JWT_SECRET_KEY'] = 'cle-de-test-suffisamment-longue-pour-hs256'
+        db.init_app(self.app)
+        init_identity(JWTManager(self.app))
+        identity_cache.clear()
+        init_http_cache(self.app)
+        self.app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='etag', email='etag@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        self.api_key = ApiKey(user_id=user.id, platform='binance', api_key='k', api_secret='s')
+        db.session.add(self.api_key)
+        db.session.flush()
+        db.session.add(BalanceSnapshot(
+            user_id=user.id, api_key_id=self.api_key.id, platform='binance',
+            total_usd=100.0, created_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_unchanged_snapshots_revalidate_with_304(self):
+        """Test la réponse 304 tant qu'aucun nouveau snapshot n'est enregistré, malgré l'âge des prix"""
+        ages = iter(range(100))
+        status = lambda platform='binance': {'stale': False, 'live': False, 'age_seconds': next(ages)}
+        with mock.patch.object(balances.price_oracle, 'status', side_effect=status):
+            first = self.client.get('/api/portfolio/balance', headers=self.headers)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first.get_json()['source'], 'snapshot')
+            etag = first.headers['ETag']
+
+            again = self.client.get('/api/portfolio/balance', headers={**self.headers, 'If-None-Match': etag})
+            self.assertEqual(again.status_code, 304)
+
+            db.session.add(BalanceSnapshot(
+                user_id=self.api_key.user_id, api_key_id=self.api_key.id, platform='binance',
+                total_usd=120.0, created_at=datetime.utcnow()
+            ))
+            db.session.commit()
+            changed = self.client.get('/api/portfolio/balance', headers={**self.headers, 'If-None-Match': etag})
+            self.assertEqual(changed.status_code, 200)
+            self.assertEqual(changed.get_json()['total_balance_usd'], 120.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from src.services.bot_logs import BotLogStore, decode_line
+
+MINUTE = 60 * 1000
+START = 1748000000000
+
+class TestBotLogStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BotLogStore(self.root, segment_lines=100, index_interval=10)
+        # 1000 lignes, une par minute ; une erreur toutes les 250 lignes
+        self.store.append(1, 'btc_grid_bot', [
+            (START + i * MINUTE, 'error' if i % 250 == 0 else 'info', f'ligne {i}')
+            for i in range(1000)
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_segments_are_rotated_and_sealed(self):
+        """Test la rotation des segments et l'écriture du résumé des segments clos"""
+        files = sorted(os.listdir(os.path.join(self.root, '1', 'btc_grid_bot')))
+        self.assertEqual(len([name for name in files if name.endswith('.log')]), 10)
+        self.assertEqual(len([name for name in files if name.endswith('.idx')]), 9)
+
+    def test_latest_lines_first(self):
+        """Test que la requête par défaut renvoie les lignes les plus récentes d'abord"""
+        logs = self.store.query(1, 'btc_grid_bot', limit=3)
+        self.assertEqual([log['message'] for log in logs], ['ligne 999', 'ligne 998', 'ligne 997'])
+        self.assertTrue(logs[0]['timestamp'].endswith('Z'))
+
+    def test_latest_lines_read_backward(self):
+        """Test que seules les lignes du dernier bloc d'index sont lues pour les lignes les plus récentes"""
+        with mock.patch('src.services.bot_logs.decode_line', wraps=decode_line) as decoded:
+            logs = self.store.query(1, 'btc_grid_bot', limit=3)
+        self.assertEqual(len(logs), 3)
+        self.assertEqual(decoded.call_count, 10)  # Un bloc de `index_interval` lignes sur 1000
+
+    def test_time_range_and_level(self):
+        """Test les filtres since/until/level et l'arrêt après `limit` résultats"""
+        logs = self.store.query(1, 'btc_grid_bot', since=START + 305 * MINUTE, until=START + 420 * MINUTE, limit=200)
+        self.assertEqual(len(logs), 116)
+        self.assertEqual((logs[0]['message'], logs[-1]['message']), ('ligne 420', 'ligne 305'))
+
+        errors = self.store.query(1, 'btc_grid_bot', level='error', limit=2)
+        self.assertEqual([log['message'] for log in errors], ['ligne 750', 'ligne 500'])
+
+    def test_query_skips_unrelated_segments(self):
+        """Test que seuls les segments utiles sont lus"""
+        with mock.patch('builtins.open', wraps=open) as opened:
+            self.store.query(1, 'btc_grid_bot', level='error', since=START + 600 * MINUTE, limit=10)
+        read = [call.args[0] for call in opened.call_args_list if call.args[0].endswith('.log')]
+        # Seul le segment contenant la ligne 750 est relu ; les autres sont écartés par leur résumé
+        # (segment 10 : aucune erreur ; segments 1 à 6 : antérieurs à `since`)
+        self.assertEqual([os.path.basename(path) for path in read], ['00000008.log'])
+
+    def test_tail_returns_only_new_lines(self):
+        """Test le suivi en direct à partir d'un curseur, y compris à travers une rotation"""
+        cursor = self.store.end_cursor(1, 'btc_grid_bot')
+        logs, cursor = self.store.tail(1, 'btc_grid_bot', cursor)
+        self.assertEqual(logs, [])
+
+        self.store.append(1, 'btc_grid_bot', [(START + (1000 + i) * MINUTE, 'warning', f'nouvelle {i}') for i in range(150)])
+        logs, cursor = self.store.tail(1, 'btc_grid_bot', cursor, limit=120)
+        self.assertEqual((logs[0]['message'], logs[-1]['message']), ('nouvelle 0', 'nouvelle 119'))
+        logs, cursor = self.store.tail(1, 'btc_grid_bot', cursor)
+        self.assertEqual(len(logs), 30)
+        self.assertEqual(cursor, self.store.end_cursor(1, 'btc_grid_bot'))
+
+    def test_out_of_order_lines_within_range(self):
+        """Test qu'une ligne arrivée en retard reste trouvée malgré une ligne postérieure à `until` avant elle"""
+        self.store.append(2, 'late_bot', [
+            (START, 'info', 'a'), (START + 10 * MINUTE, 'info', 'b'), (START + 2 * MINUTE, 'info', 'en retard')
+        ])
+        logs = self.store.query(2, 'late_bot', until=START + 5 * MINUTE)
+        self.assertEqual([log['message'] for log in logs], ['en retard', 'a'])
+
+    def test_late_segment_does_not_stop_query(self):
+        """Test qu'un segment entièrement antérieur à `since` n'arrête pas la lecture des segments plus anciens"""
+        store = BotLogStore(self.root, segment_lines=2, index_interval=1)
+        store.append(3, 'late_bot', [
+            (START, 'info', 'a'), (START + 50 * MINUTE, 'info', 'b'),
+            (START - 20 * MINUTE, 'info', 'en retard 1'), (START - 10 * MINUTE, 'info', 'en retard 2'),
+            (START + 60 * MINUTE, 'info', 'c')
+        ])
+        logs = store.query(3, 'late_bot', since=START + 40 * MINUTE)
+        self.assertEqual([log['message'] for log in logs], ['c', 'b'])
+
+    def test_corrupted_line_is_skipped(self):
+        """Test qu'une ligne tronquée par un arrêt brutal n'empêche pas la lecture du journal"""
+        self.store.append(2, 'crash_bot', [(START, 'info', 'avant')])
+        with open(os.path.join(self.root, '2', 'crash_bot', '00000001.log'), 'ab') as f:
+            f.write(b'{"t":17480')
+        self.store.append(2, 'crash_bot', [(START + MINUTE, 'info', 'après')])
+
+        reader = BotLogStore(self.root, segment_lines=100, index_interval=10)
+        self.assertEqual([log['message'] for log in reader.query(2, 'crash_bot')], ['après', 'avant'])
+        logs, _ = reader.tail(2, 'crash_bot', '1:0')
+        self.assertEqual([log['message'] for log in logs], ['avant', 'après'])
+
+    def test_concurrent_workers_share_segments(self):
+        """Test que deux instances (comme deux workers) écrivent sans perte ni segment trop long"""
+        stores = [BotLogStore(self.root, segment_lines=50, index_interval=10) for _ in range(2)]
+
+        def writer(store, worker):
+            for batch in range(20):
+                store.append(3, 'shared_bot', [
+                    (START + batch * MINUTE, 'info', f'{worker}-{batch}-{i}') for i in range(7)
+                ])
+
+        threads = [threading.Thread(target=writer, args=(stores[i % 2], i)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reader = BotLogStore(self.root, segment_lines=50, index_interval=10)
+        logs = reader.query(3, 'shared_bot', limit=1000)
+        self.assertEqual(len(logs), 4 * 20 * 7)
+        self.assertEqual(len({log['message'] for log in logs}), len(logs))
+        directory = os.path.join(self.root, '3', 'shared_bot')
+        for name in os.listdir(directory):
+            if name.endswith('.log'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    self.assertLessEqual(len(f.readlines()), 50)
+
+    def test_invalid_bot_id(self):
+        """Test le refus des identifiants de bot pouvant sortir du répertoire"""
+        with self.assertRaises(ValueError):
+            self.store.query(1, '../etc')
+
+if __name__ == '__main__':
+    unittest.main()
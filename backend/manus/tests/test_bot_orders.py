@@ -0,0 +1,143 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from src.models.user import db, User, BotOrder
+from src.routes.bots import bots_bp
+from src.services import bot_orders
+from src.services.events import EventBus
+from src.services.http_cache import init_http_cache
+from src.services.identity import init_identity, identity_cache
+from src.services.pagination import keyset_page
+
+def _order(order_id, bot_id='btc_grid_bot', status='open', minutes=0, **extra):
+    order = {
+        'id': order_id,
+        'bot_id': bot_id,
+        'bot_name': 'BTC Grid Trading',
+        'exchange': 'Binance',
+        'symbol': 'BTC/USDT',
+        'type': 'limit',
+        'side': 'buy',
+        'price': 44500,
+        'amount': 0.05,
+        'status': status,
+        'created_at': (datetime(2025, 5, 23, 14, 0) + timedelta(minutes=minutes)).isoformat() + 'Z'
+    }
+    order.update(extra)
+    return order
+
+class TestBotOrders(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['JWT_SECRET_KEY'] = 'cle-de-test-suffisamment-longue-pour-hs256'
+        db.init_app(self.app)
+        init_identity(JWTManager(self.app))
+        identity_cache.clear()
+        self.app.register_blueprint(bots_bp, url_prefix='/api/bots')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='bots', email='bots@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.bus = EventBus()
+        self.patch = mock.patch.object(bot_orders, 'event_bus', self.bus)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_ingest_creates_then_updates(self):
+        """Test qu'un ordre renvoyé par le bot est mis à jour et non dupliqué"""
+        created, updated = bot_orders.ingest_orders(self.user_id, [_order('1'), _order('2')])
+        self.assertEqual((len(created), len(updated)), (2, 0))
+
+        created, updated = bot_orders.ingest_orders(self.user_id, [
+            _order('1', status='closed', filled=0.05, closed_at='2025-05-23T14:30:05Z')
+        ])
+        self.assertEqual((len(created), len(updated)), (0, 1))
+
+        order = BotOrder.query.filter_by(order_id='1').one()
+        self.assertEqual(BotOrder.query.count(), 2)
+        self.assertEqual(order.status, 'closed')
+        self.assertEqual(order.closed_at, datetime(2025, 5, 23, 14, 30, 5))
+        self.assertEqual([e.data['action'] for e in self.bus.since(0, self.user_id)[0]], ['created', 'created', 'updated'])
+
+    def test_invalid_orders_are_rejected(self):
+        """Test le refus des ordres sans champs obligatoires ou au statut inconnu"""
+        with self.assertRaises(ValueError):
+            bot_orders.ingest_orders(self.user_id, [{'id': '1', 'bot_id': 'b', 'symbol': 'BTC/USDT'}])
+        with self.assertRaises(ValueError):
+            bot_orders.ingest_orders(self.user_id, [_order('1', status='filled')])
+
+    def test_filters_and_keyset_pagination(self):
+        """Test les filtres SQL et la pagination par curseur sur la date de création"""
+        payloads = [_order(str(i), status='closed' if i % 2 else 'open', minutes=i) for i in range(10)]
+        payloads.append(_order('eth', bot_id='eth_dca_bot', minutes=3))
+        bot_orders.ingest_orders(self.user_id, payloads)
+
+        query = bot_orders.orders_query(
+            self.user_id, bot_id='btc_grid_bot', status='closed',
+            start_date='2025-05-23T14:02:00Z', end_date='2025-05-23T14:08:00Z'
+        )
+        first, cursor = keyset_page(query, BotOrder.created_at, BotOrder.id, limit=2, time_attr='created_at')
+        second, cursor = keyset_page(query, BotOrder.created_at, BotOrder.id, cursor=cursor, limit=2, time_attr='created_at')
+
+        self.assertEqual([o.order_id for o in first + second], ['7', '5', '3'])
+        self.assertIsNone(cursor)
+
+    def test_query_uses_composite_index(self):
+        """Test que le filtre complet est servi par l'index composite"""
+        query = bot_orders.orders_query(self.user_id, bot_id='btc_grid_bot', status='open', start_date='2025-05-01')
+        sql = str(query.statement.compile(compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(str(row) for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+        self.assertIn('ix_bot_orders_user_bot_status_created', plan)
+
+    def test_routes(self):
+        """Test l'envoi d'ordres puis leur lecture paginée via l'API"""
+        client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+
+        response = client.post('/api/bots/orders', json={'orders': [_order('1'), _order('2', minutes=1)]}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['created'], 2)
+
+        response = client.get('/api/bots/orders?limit=1', headers=headers)
+        data = response.get_json()
+        self.assertEqual(data['orders'][0]['id'], '2')
+        self.assertEqual(data['orders'][0]['created_at'], '2025-05-23T14:01:00Z')
+        self.assertIsNotNone(data['next_cursor'])
+
+        response = client.get('/api/bots/orders?start_date=pas-une-date', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_orders_not_modified_until_an_order_changes(self):
+        """Test la réponse 304 par version avant la pagination, puis 200 après un changement de statut"""
+        init_http_cache(self.app)
+        client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(self.user_id))}'}
+        bot_orders.ingest_orders(self.user_id, [_order('1'), _order('2', minutes=1)])
+
+        etag = client.get('/api/bots/orders', headers=headers).headers['ETag']
+        with mock.patch('src.routes.bots.keyset_page') as page:
+            response = client.get('/api/bots/orders', headers=dict(headers, **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 304)
+        page.assert_not_called()
+
+        # Mise à jour envoyée sans `updated_at`
+        bot_orders.ingest_orders(self.user_id, [{'id': '1', 'bot_id': 'btc_grid_bot', 'status': 'canceled'}])
+        response = client.get('/api/bots/orders', headers=dict(headers, **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['orders'][1]['status'], 'canceled')
+
+if __name__ == '__main__':
+    unittest.main()
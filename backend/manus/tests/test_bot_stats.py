@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from flask import Flask
+from sqlalchemy import insert
+from src.models.user import db, User, BotDailyStat, BotOrder
+from src.services import bot_orders, bot_stats
+from src.services.database import engine_options, configure_engine
+from src.services.events import EventBus
+
+def _closed(order_id, days_ago, pnl, cost=1000, bot_id='btc_grid_bot'):
+    closed_at = (datetime.utcnow() - timedelta(days=days_ago)).replace(microsecond=0)
+    return {
+        'id': order_id,
+        'bot_id': bot_id,
+        'bot_name': 'BTC Grid Trading',
+        'exchange': 'Binance',
+        'symbol': 'BTC/USDT',
+        'side': 'sell',
+        'amount': 0.05,
+        'status': 'closed',
+        'cost': cost,
+        'pnl': pnl,
+        'created_at': closed_at.isoformat() + 'Z',
+        'closed_at': closed_at.isoformat() + 'Z'
+    }
+
+class TestBotStats(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='stats', email='stats@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.cache = bot_stats.PerformanceCache(ttl=60)
+        self.patches = [
+            mock.patch.object(bot_orders, 'event_bus', EventBus()),
+            mock.patch.object(bot_orders, 'performance_cache', self.cache),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_rollups_follow_closed_orders(self):
+        """Test l'agrégation journalière des ordres clos et les métriques par période"""
+        bot_orders.ingest_orders(self.user_id, [
+            _closed('1', 0, 30), _closed('2', 0, -10), _closed('3', 2, 20), _closed('4', 40, 100),
+            dict(_closed('5', 0, 0), status='open', pnl=None)
+        ])
+
+        self.assertEqual(BotDailyStat.query.count(), 3)
+        week = bot_stats.bot_performance(self.user_id, 'btc_grid_bot', '7d')
+        self.assertEqual(week['total_trades'], 3)
+        self.assertEqual(week['total_pnl'], 40)
+        self.assertEqual(week['win_rate'], 66.67)
+        self.assertEqual(week['profit_factor'], 5.0)
+        self.assertEqual(week['total_pnl_percent'], round(40 / 3000 * 100, 2))
+        self.assertEqual([d['pnl'] for d in week['daily_pnl']], [20, 20])
+
+        everything = bot_stats.bot_performance(self.user_id, 'btc_grid_bot', 'all')
+        self.assertEqual(everything['total_pnl'], 140)
+        self.assertEqual(everything['name'], 'BTC Grid Trading')
+
+    def test_resent_order_is_counted_once(self):
+        """Test qu'un ordre renvoyé ou corrigé ne fausse pas les agrégats"""
+        bot_orders.ingest_orders(self.user_id, [_closed('1', 0, 30)])
+        bot_orders.ingest_orders(self.user_id, [_closed('1', 0, 30)])
+        bot_orders.ingest_orders(self.user_id, [_closed('1', 0, -5)])
+
+        stat = BotDailyStat.query.one()
+        self.assertEqual((stat.trades, stat.wins, stat.losses, stat.pnl), (1, 0, 1, -5))
+
+    def test_cache_invalidated_by_new_fills(self):
+        """Test que le cache par (bot, période) est invalidé à l'arrivée d'un ordre clos"""
+        bot_orders.ingest_orders(self.user_id, [_closed('1', 0, 30)])
+        first = self.cache.get(self.user_id, 'btc_grid_bot', '30d')
+        with mock.patch.object(bot_stats, 'bot_performance', side_effect=AssertionError):
+            self.assertIs(self.cache.get(self.user_id, 'btc_grid_bot', '30d'), first)
+
+        bot_orders.ingest_orders(self.user_id, [_closed('2', 0, 10)])
+        self.assertEqual(self.cache.get(self.user_id, 'btc_grid_bot', '30d')['total_pnl'], 40)
+
+    def test_cache_sees_fills_received_by_another_worker(self):
+        """Test qu'un ordre clos reçu par un autre worker invalide le cache de celui-ci"""
+        bot_orders.ingest_orders(self.user_id, [_closed('1', 0, 30), _closed('2', 1, 5)])
+        self.assertEqual(self.cache.get(self.user_id, 'btc_grid_bot', '7d')['total_pnl'], 35)
+
+        # Même ordre déplacé d'un jour à l'autre, puis nouvel ordre, reçus par un autre worker
+        with mock.patch.object(bot_orders, 'performance_cache', bot_stats.PerformanceCache(ttl=60)):
+            bot_orders.ingest_orders(self.user_id, [_closed('1', 1, 30)])
+            daily = self.cache.get(self.user_id, 'btc_grid_bot', '7d')['daily_pnl']
+            self.assertEqual([d['pnl'] for d in daily], [0, 35])
+            bot_orders.ingest_orders(self.user_id, [_closed('3', 0, 10)])
+
+        self.assertEqual(self.cache.get(self.user_id, 'btc_grid_bot', '7d')['total_pnl'], 45)
+
+class TestConcurrentIngest(unittest.TestCase):
+    def setUp(self):
+        """Base SQLite sur fichier, partagée par plusieurs connexions comme entre workers"""
+        self.tmp = tempfile.mkdtemp()
+        uri = f"sqlite:///{os.path.join(self.tmp, 'manus.db')}"
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = uri
+        self.app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        configure_engine(db.engine)
+        db.create_all()
+
+        user = User(username='race', email='race@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.patches = [
+            mock.patch.object(bot_orders, 'event_bus', EventBus()),
+            mock.patch.object(bot_orders, 'performance_cache', bot_stats.PerformanceCache(ttl=60)),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.ctx.pop()
+        shutil.rmtree(self.tmp)
+
+    def test_concurrent_posts_keep_every_increment(self):
+        """Test qu'aucune contribution n'est perdue quand plusieurs requêtes créent le même jour"""
+        errors = []
+
+        def post(start):
+            with self.app.app_context():
+                try:
+                    for i in range(start, start + 5):
+                        bot_orders.ingest_orders(self.user_id, [_closed(str(i), 0, 10)])
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=post, args=(n * 5,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stat = BotDailyStat.query.one()
+        self.assertEqual((stat.trades, stat.wins, stat.pnl), (20, 20, 200))
+
+    def test_order_created_concurrently_is_retried_as_update(self):
+        """Test qu'un ordre inséré entre-temps par une autre requête est mis à jour au lieu d'une erreur"""
+        original = bot_stats.apply_contribution
+        calls = []
+
+        def racing_apply(order, contribution, sign=1):
+            if not calls:
+                # Autre worker : même ordre, encore ouvert, validé juste avant nous
+                with db.engine.begin() as connection:
+                    connection.execute(insert(BotOrder), [{
+                        'user_id': self.user_id, 'bot_id': 'btc_grid_bot', 'order_id': '1',
+                        'symbol': 'BTC/USDT', 'side': 'sell', 'amount': 0.05, 'status': 'open',
+                        'created_at': datetime.utcnow()
+                    }])
+            calls.append(order.order_id)
+            return original(order, contribution, sign)
+
+        with mock.patch.object(bot_orders, 'apply_contribution', side_effect=racing_apply):
+            created, updated = bot_orders.ingest_orders(self.user_id, [_closed('1', 0, 30)])
+
+        self.assertEqual((len(created), len(updated)), (0, 1))
+        self.assertEqual(BotOrder.query.count(), 1)
+        self.assertEqual(BotDailyStat.query.one().pnl, 30)
+
+if __name__ == '__main__':
+    unittest.main()
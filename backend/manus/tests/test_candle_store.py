@@ -0,0 +1,105 @@
+import os
+import unittest
+import tempfile
+import shutil
+import threading
+import numpy as np
+from unittest import mock
+from src.services.candle_store import CandleStore
+from src.services import scanner
+
+HOUR = 3600 * 1000
+
+def _klines(start, count, close=100.0):
+    return [
+        [start + i * HOUR, str(close + i), str(close + i + 1), str(close + i - 1), str(close + i), '10', 0]
+        for i in range(count)
+    ]
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = CandleStore(root=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_append_is_incremental(self):
+        """Test que seules les nouvelles bougies sont ajoutées et que la dernière est mise à jour"""
+        self.assertEqual(self.store.append('BTCUSDT', '1h', _klines(0, 5)), 5)
+
+        update = _klines(4 * HOUR, 3, close=200.0)
+        self.assertEqual(self.store.append('BTCUSDT', '1h', update), 2)
+
+        tail = self.store.tail('BTCUSDT', '1h', 3)
+        self.assertEqual(self.store.count('BTCUSDT', '1h'), 7)
+        self.assertEqual(list(tail['timestamp']), [4 * HOUR, 5 * HOUR, 6 * HOUR])
+        self.assertEqual(list(tail['close']), [200.0, 201.0, 202.0])
+        self.assertEqual(self.store.last_timestamp('BTCUSDT', '1h'), 6 * HOUR)
+
+    def test_window_is_zero_copy(self):
+        """Test que les fenêtres temporelles sont des vues sur le fichier mappé"""
+        self.store.append('ETHUSDT', '1h', _klines(0, 24))
+
+        window = self.store.window('ETHUSDT', '1h', start=2 * HOUR, end=5 * HOUR)
+
+        self.assertEqual(list(window['timestamp']), [2 * HOUR, 3 * HOUR, 4 * HOUR, 5 * HOUR])
+        self.assertIsInstance(window['close'], np.memmap)
+        full = self.store.window('ETHUSDT', '1h')
+        self.assertTrue(np.shares_memory(window['close'], full['close']))
+
+    def test_concurrent_writers_share_file_lock(self):
+        """Test que deux instances (comme deux workers) n'entrelacent pas leurs ajouts"""
+        other = CandleStore(root=self.root)
+        batches = [_klines(i * 3 * HOUR, 5) for i in range(40)]
+
+        def writer(store, batches):
+            for batch in batches:
+                store.append('BTCUSDT', '1h', batch)
+
+        threads = [
+            threading.Thread(target=writer, args=(store, batches[i::4]))
+            for i, store in enumerate([self.store, other] * 2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        timestamps = list(self.store.tail('BTCUSDT', '1h', 10_000)['timestamp'])
+        self.assertEqual(timestamps, sorted(set(timestamps)))
+        series_dir = os.path.join(self.root, 'binance', 'BTCUSDT', '1h')
+        sizes = {os.path.getsize(os.path.join(series_dir, f'{name}.bin')) for name in ('timestamp', 'close', 'volume')}
+        self.assertEqual(len(sizes), 1)
+
+    def test_interrupted_append_is_repaired(self):
+        """Test qu'une colonne de prix plus longue que l'horodatage est tronquée"""
+        self.store.append('SOLUSDT', '1h', _klines(0, 2))
+        with open(self.store._path('SOLUSDT', '1h', 'close'), 'ab') as f:
+            f.write(np.array([999.0]).tobytes())
+
+        self.store.append('SOLUSDT', '1h', _klines(2 * HOUR, 1))
+
+        self.assertEqual(list(self.store.tail('SOLUSDT', '1h', 3)['close']), [100.0, 101.0, 100.0])
+
+    def test_scanner_only_fetches_missing_candles(self):
+        """Test que le scanner ne redemande que les bougies depuis la dernière stockée"""
+        now = 10 * HOUR
+        calls = []
+
+        def fake_fetch(symbol, interval, limit, start_time=None):
+            calls.append(start_time)
+            start = start_time if start_time is not None else now - (limit - 1) * HOUR
+            return _klines(start, (now - start) // HOUR + 1, close=100.0 + start // HOUR)
+
+        with mock.patch.object(scanner, 'fetch_klines', side_effect=fake_fetch), \
+                mock.patch.object(scanner.time, 'time', return_value=now / 1000):
+            first = scanner.update_candles('BTCUSDT', '1h', limit=5, store=self.store)
+            second = scanner.update_candles('BTCUSDT', '1h', limit=5, store=self.store)
+
+        self.assertEqual(calls, [None, now])
+        self.assertEqual(first.shape, (5, 5))
+        self.assertTrue(np.array_equal(first, second))
+
+if __name__ == '__main__':
+    unittest.main()
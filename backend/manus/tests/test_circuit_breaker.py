@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.services import exchange_client as exchange_module
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from src.services.exchange_client import ExchangeClient
+
+BASE_URL = 'https://api.binance.com'
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_then_half_open_probe(self):
+        """Test l'ouverture après échecs répétés puis l'appel de test unique en semi-ouvert"""
+        breaker = CircuitBreaker('binance /api/v3/account', failure_threshold=2, reset_timeout=0.05)
+        breaker.failure()
+        breaker.before()
+        breaker.failure()
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before()
+
+        time.sleep(0.06)
+        breaker.before()  # Appel de test
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before()  # Un seul appel de test à la fois
+
+        breaker.failure()
+        self.assertEqual(breaker.state, OPEN)
+        time.sleep(0.06)
+        breaker.before()
+        breaker.success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_client_fails_fast_per_endpoint(self):
+        """Test l'échec immédiat des appels vers un endpoint défaillant, sans toucher aux autres"""
+        session = mock.Mock()
+        session.get.side_effect = lambda url, **kwargs: (
+            SimpleNamespace(status_code=503, headers={}) if url.endswith('/account')
+            else SimpleNamespace(status_code=200, headers={})
+        )
+        client = ExchangeClient()
+        client._sessions[BASE_URL] = session
+
+        for _ in range(5):
+            client.get(f'{BASE_URL}/api/v3/account')
+        with self.assertRaises(CircuitOpenError):
+            client.get(f'{BASE_URL}/api/v3/account')
+        self.assertEqual(session.get.call_count, 5)
+
+        self.assertEqual(client.get(f'{BASE_URL}/api/v3/ticker/price').status_code, 200)
+        self.assertEqual(client.breakers.stats()['binance /api/v3/account']['state'], OPEN)
+
+    def test_hedged_request(self):
+        """Test le second appel lancé après le délai de couverture, la première réponse l'emportant"""
+        calls = []
+        released = threading.Event()
+
+        def slow_then_fast(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                released.wait(2)  # Premier appel bloqué
+                return SimpleNamespace(status_code=200, headers={}, attempt=1)
+            return SimpleNamespace(status_code=200, headers={}, attempt=2)
+
+        client = ExchangeClient(hedge=True)
+        client._sessions[BASE_URL] = mock.Mock(get=mock.Mock(side_effect=slow_then_fast))
+
+        started = time.perf_counter()
+        with mock.patch.object(exchange_module, 'HEDGE_DELAY', 0.05):
+            response = client.get(f'{BASE_URL}/api/v3/myTrades', params={'symbol': 'BTCUSDT'})
+        released.set()
+        client.close()
+
+        self.assertEqual(response.attempt, 2)
+        self.assertEqual(len(calls), 2)
+        self.assertLess(time.perf_counter() - started, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+from src.services.credentials import CredentialService
+
+class TestCredentialService(unittest.TestCase):
+    def setUp(self):
+        self.service = CredentialService(key='test_encryption_key_for_ci_cd_pipeline', max_size=2, ttl=60)
+
+    def _row(self, key_id, updated_at=datetime(2025, 5, 1)):
+        return SimpleNamespace(
+            id=key_id,
+            api_key=self.service.encrypt(f'key-{key_id}'),
+            api_secret=self.service.encrypt(f'secret-{key_id}'),
+            passphrase=None,
+            updated_at=updated_at
+        )
+
+    def test_same_key_shared_between_instances(self):
+        """Test que deux instances dérivent la même clé à partir d'ENCRYPTION_KEY"""
+        other = CredentialService(key='test_encryption_key_for_ci_cd_pipeline')
+        self.assertEqual(other.decrypt(self.service.encrypt('secret')), 'secret')
+
+    def test_decryption_is_cached(self):
+        """Test que les identifiants ne sont déchiffrés qu'une seule fois"""
+        row = self._row(1)
+
+        with mock.patch.object(self.service, 'decrypt', wraps=self.service.decrypt) as decrypt:
+            for _ in range(5):
+                credentials = self.service.get(row)
+
+        self.assertEqual(credentials.api_key, 'key-1')
+        self.assertEqual(credentials.api_secret, 'secret-1')
+        self.assertEqual(decrypt.call_count, 2)
+
+    def test_cache_follows_updated_at(self):
+        """Test qu'une clé modifiée est déchiffrée de nouveau"""
+        self.service.get(self._row(1))
+
+        updated = self._row(1, updated_at=datetime(2025, 6, 1))
+        updated.api_key = self.service.encrypt('rotated-key')
+
+        self.assertEqual(self.service.get(updated).api_key, 'rotated-key')
+
+    def test_cache_is_bounded(self):
+        """Test que les entrées les moins récemment utilisées sont évincées"""
+        for key_id in range(1, 4):
+            self.service.get(self._row(key_id))
+
+        self.assertEqual(list(self.service._cache.keys()), [2, 3])
+
+        self.service.invalidate(3)
+        self.assertEqual(list(self.service._cache.keys()), [2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from flask import Flask
+from sqlalchemy import inspect, text
+from src.models.user import db, User, ApiKey
+from src.services.database import database_uri, engine_options, ensure_indexes, init_database
+
+class TestDatabaseConfig(unittest.TestCase):
+    def test_database_url_override(self):
+        """Test la sélection de l'URI : SQLite par défaut, DATABASE_URL sinon"""
+        self.assertEqual(database_uri('/tmp/manus.db', url=''), 'sqlite:////tmp/manus.db')
+        self.assertEqual(
+            database_uri('/tmp/manus.db', url='postgres://u:p@host:5432/manus'),
+            'postgresql://u:p@host:5432/manus'
+        )
+
+    def test_engine_options(self):
+        """Test les options de pool selon la base"""
+        self.assertEqual(engine_options('sqlite:///:memory:'), {})
+        sqlite_options = engine_options('sqlite:////tmp/manus.db')
+        self.assertIn('pool_size', sqlite_options)
+        self.assertFalse(sqlite_options['connect_args']['check_same_thread'])
+        postgres_options = engine_options('postgresql://u:p@host/manus')
+        self.assertTrue(postgres_options['pool_pre_ping'])
+        self.assertNotIn('connect_args', postgres_options)
+
+class TestSqliteProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.uri = database_uri(os.path.join(self.tmp, 'manus.db'), url='')
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = self.uri
+        self.app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(self.uri)
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.ctx.pop()
+        shutil.rmtree(self.tmp)
+
+    def test_pragmas_applied_on_connect(self):
+        """Test l'activation de WAL et des pragmas sur chaque connexion"""
+        init_database(self.app)
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(connection.execute(text('PRAGMA synchronous')).scalar(), 1)
+            self.assertEqual(connection.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+
+    def test_missing_indexes_added_to_existing_tables(self):
+        """Test l'ajout des index manquants sur une base créée avant leur déclaration"""
+        db.create_all()
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX ix_api_keys_user_active'))
+
+        self.assertEqual(ensure_indexes(), ['ix_api_keys_user_active'])
+        self.assertIn('ix_api_keys_user_active', [i['name'] for i in inspect(db.engine).get_indexes('api_keys')])
+        self.assertEqual(ensure_indexes(), [])
+
+    def test_concurrent_writes_do_not_lock(self):
+        """Test des écritures concurrentes sans erreur "database is locked" """
+        init_database(self.app)
+        user = User(username='wal', email='wal@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        errors = []
+
+        def writer(n):
+            with self.app.app_context():
+                try:
+                    for i in range(20):
+                        db.session.add(ApiKey(user_id=user_id, platform='binance', api_key=f'{n}-{i}', api_secret='s'))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(ApiKey.query.count(), 80)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import threading
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from src.models.user import db, User
+from src.routes import stream
+from src.services.events import EventBus
+from src.services.identity import init_identity, identity_cache
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self):
+        self.bus = EventBus(buffer_size=3)
+
+    def test_events_are_scoped_to_user(self):
+        """Test que les événements personnels ne sont visibles que de leur utilisateur"""
+        self.bus.publish('balance', {'total_usd': 1}, user_id=1)
+        self.bus.publish('opportunities', {'added': []})
+        self.bus.publish('balance', {'total_usd': 2}, user_id=2)
+
+        events, cursor = self.bus.since(0, user_id='1')
+        self.assertEqual([e.topic for e in events], ['balance', 'opportunities'])
+        self.assertEqual(cursor, 3)
+
+        events, _ = self.bus.since(0, user_id=2, topics={'balance'})
+        self.assertEqual([e.data['total_usd'] for e in events], [2])
+
+    def test_resume_outside_buffer_requires_reset(self):
+        """Test que la reprise depuis un identifiant sorti du tampon demande un rechargement"""
+        for i in range(5):
+            self.bus.publish('opportunities', {'i': i})
+
+        self.assertIsNone(self.bus.since(1)[0])
+        self.assertIsNone(self.bus.since(42)[0])
+        self.assertEqual([e.data['i'] for e in self.bus.since(2)[0]], [2, 3, 4])
+
+    def test_wait_wakes_on_publish(self):
+        """Test que les abonnés en attente sont réveillés par une publication"""
+        self.assertFalse(self.bus.wait(0, 0.01))
+        timer = threading.Timer(0.05, self.bus.publish, args=('opportunities', {}))
+        timer.start()
+        self.assertTrue(self.bus.wait(0, 2))
+        timer.join()
+
+class TestStreamRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['JWT_SECRET_KEY'] = 'cle-de-test-suffisamment-longue-pour-hs256'
+        db.init_app(self.app)
+        init_identity(JWTManager(self.app))
+        identity_cache.clear()
+        self.app.register_blueprint(stream.stream_bp, url_prefix='/api/stream')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='sse', email='sse@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.token = create_access_token(identity=str(user.id))
+
+        self.bus = EventBus()
+        self.original = (stream.event_bus, stream.SSE_MAX_DURATION, stream.SSE_HEARTBEAT, stream.stream_connections)
+        stream.event_bus, stream.SSE_MAX_DURATION, stream.SSE_HEARTBEAT = self.bus, 0.1, 0.02
+        stream.stream_connections = stream.ConnectionLimit()
+
+    def tearDown(self):
+        stream.event_bus, stream.SSE_MAX_DURATION, stream.SSE_HEARTBEAT, stream.stream_connections = self.original
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_stream_resumes_from_last_event_id(self):
+        """Test la reprise avec Last-Event-ID, le jeton en paramètre et les heartbeats"""
+        self.bus.publish('balance', {'changed': {'BTC': {'amount': 1}}}, user_id=self.user_id)
+        self.bus.publish('balance', {'changed': {}}, user_id=self.user_id + 1)
+        self.bus.publish('opportunities', {'added': [{'symbol': 'SOL/USDT'}], 'removed': []})
+
+        response = self.app.test_client().get(
+            f'/api/stream?jwt={self.token}', headers={'Last-Event-ID': self.bus.event_id(0)}
+        )
+        body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertIn(f'id: {self.bus.event_id(1)}\nevent: balance\n', body)
+        self.assertNotIn(f'id: {self.bus.event_id(2)}\n', body)
+        self.assertIn(
+            f'id: {self.bus.event_id(3)}\nevent: opportunities\ndata: {{"added":[{{"symbol":"SOL/USDT"}}],"removed":[]}}\n\n',
+            body
+        )
+        self.assertIn(': heartbeat\n\n', body)
+        self.assertNotIn('event: reset', body)
+
+    def test_id_from_another_worker_requires_reset(self):
+        """Test qu'un identifiant émis par un autre worker déclenche un rechargement, sans rejouer d'événement"""
+        other = EventBus()
+        other.origin = 'autre'
+        self.bus.publish('balance', {'changed': {}}, user_id=self.user_id)
+
+        for last_event_id in (other.event_id(0), '0'):
+            response = self.app.test_client().get(
+                f'/api/stream?jwt={self.token}', headers={'Last-Event-ID': last_event_id}
+            )
+            body = response.get_data(as_text=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(f'id: {self.bus.event_id(1)}\nevent: reset\n', body)
+            self.assertNotIn('event: balance', body)
+
+    def test_connections_are_capped_per_worker(self):
+        """Test le refus (503) au-delà de SSE_MAX_CONNECTIONS et la libération à la fermeture"""
+        client = self.app.test_client()
+        original = stream.SSE_MAX_CONNECTIONS
+        stream.SSE_MAX_CONNECTIONS = 1
+        try:
+            first = client.get(f'/api/stream?jwt={self.token}')
+            self.assertEqual(first.status_code, 200)
+            refused = client.get(f'/api/stream?jwt={self.token}')
+            self.assertEqual(refused.status_code, 503)
+            self.assertIn('Retry-After', refused.headers)
+
+            first.close()
+            with client.get(f'/api/stream?jwt={self.token}') as again:
+                self.assertEqual(again.status_code, 200)
+            self.assertEqual(stream.stream_connections.active, 0)
+        finally:
+            stream.SSE_MAX_CONNECTIONS = original
+
+    def test_stream_requires_token(self):
+        """Test que le flux refuse les requêtes non authentifiées"""
+        response = self.app.test_client().get('/api/stream')
+        self.assertEqual(response.status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.services.exchange_client import ExchangeClient
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    failures_left = 0
+
+    def do_GET(self):
+        if _StubHandler.failures_left > 0:
+            _StubHandler.failures_left -= 1
+            status, body = 503, b'{}'
+        else:
+            status, body = 200, json.dumps({'path': self.path}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-MBX-USED-WEIGHT-1M', '42')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestExchangeClient(unittest.TestCase):
+    def setUp(self):
+        """Démarrage d'un faux exchange local"""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.client = ExchangeClient(pool_size=2, backoff=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """Test que les appels successifs réutilisent la même connexion keep-alive"""
+        for _ in range(5):
+            response = self.client.get(f'{self.base_url}/api/v3/ping')
+            self.assertEqual(response.status_code, 200)
+
+        stats = self.client.stats()[self.base_url]
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 4)
+
+    def test_used_weight_is_tracked(self):
+        """Test la prise en compte du poids annoncé par l'exchange"""
+        self.client.get(f'{self.base_url}/api/v3/ping')
+
+        limits = self.client.rate_limiter.stats()[f'127.0.0.1:{self.server.server_port}']
+        self.assertEqual(limits['window_used'], 42)
+
+    def test_get_is_retried_on_server_error(self):
+        """Test qu'un GET est rejoué après une erreur 503 transitoire"""
+        _StubHandler.failures_left = 1
+
+        response = self.client.get(f'{self.base_url}/api/v3/account')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['path'], '/api/v3/account')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import gzip
+import unittest
+from flask import Flask, Response, jsonify
+from src.services.http_cache import init_http_cache, not_modified
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_http_cache(self.app)
+        self.calls = []
+        self.version = 1
+
+        @self.app.route('/api/orders')
+        def orders():
+            self.calls.append('orders')
+            return jsonify({'orders': [{'id': i, 'symbol': 'BTC/USDT'} for i in range(100)]})
+
+        @self.app.route('/api/versioned')
+        def versioned():
+            cached = not_modified('versioned', self.version)
+            if cached is not None:
+                return cached
+            self.calls.append('versioned')
+            return jsonify({'version': self.version})
+
+        @self.app.route('/api/export')
+        def export():
+            return Response(iter(['{"a": 1}\n']), mimetype='application/json')
+
+        self.client = self.app.test_client()
+
+    def test_content_etag_and_not_modified(self):
+        """Test l'ETag calculée sur le contenu et la réponse 304 au poll suivant"""
+        response = self.client.get('/api/orders')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        again = self.client.get('/api/orders', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+        self.assertEqual(again.headers['ETag'], etag)
+
+    def test_version_etag_skips_route_body(self):
+        """Test la réponse 304 par version sans exécuter ni sérialiser la route"""
+        etag = self.client.get('/api/versioned').headers['ETag']
+        self.assertEqual(self.calls, ['versioned'])
+
+        self.assertEqual(self.client.get('/api/versioned', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.calls, ['versioned'])
+
+        self.version = 2
+        response = self.client.get('/api/versioned', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_large_bodies_are_compressed(self):
+        """Test la compression gzip au-delà du seuil et l'absence de compression des flux"""
+        plain = self.client.get('/api/orders')
+        compressed = self.client.get('/api/orders', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertEqual(compressed.headers['ETag'], plain.headers['ETag'])
+
+        small = self.client.get('/api/versioned', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+
+        stream = self.client.get('/api/export', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', stream.headers)
+        self.assertNotIn('ETag', stream.headers)
+
+if __name__ == '__main__':
+    unittest.main()
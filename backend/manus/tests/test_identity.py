@@ -0,0 +1,95 @@
+import unittest
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, current_user
+from sqlalchemy import event
+from src.models.user import db, User, ApiKey
+from src.services.identity import init_identity, identity_cache, load_user
+
+class TestIdentity(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['JWT_SECRET_KEY'] = 'cle-de-test-suffisamment-longue-pour-hs256'
+        db.init_app(self.app)
+        init_identity(JWTManager(self.app))
+        identity_cache.clear()
+
+        @self.app.route('/me')
+        @jwt_required()
+        def me():
+            return jsonify({
+                'username': current_user.username,
+                'keys': [api_key.label for api_key in current_user.active_api_keys]
+            })
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='id', email='id@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            ApiKey(user_id=user.id, platform='binance', api_key='k', api_secret='s', label='active'),
+            ApiKey(user_id=user.id, platform='bitget', api_key='k', api_secret='s', label='off', is_active=False)
+        ])
+        db.session.commit()
+        self.user_id = user.id
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+        self.statements = []
+        self._listener = lambda *args: self.statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', self._listener)
+        db.session.remove()
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._listener)
+        identity_cache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _me(self):
+        self.statements.clear()
+        response = self.app.test_client().get('/me', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_user_and_active_keys_loaded_once(self):
+        """Test le chargement de l'utilisateur et de ses clés actives, puis le cache entre requêtes"""
+        self.assertEqual(self._me(), {'username': 'id', 'keys': ['active']})
+        # Utilisateur et clés actives en une jointure, aucun chargement paresseux ensuite
+        self.assertEqual(len(self.statements), 1)
+
+        self.assertEqual(self._me(), {'username': 'id', 'keys': ['active']})
+        self.assertEqual(self.statements, [])
+
+    def test_cache_invalidated_on_key_and_user_changes(self):
+        """Test l'invalidation du cache à l'ajout d'une clé et à la modification de l'utilisateur"""
+        self._me()
+        db.session.add(ApiKey(user_id=self.user_id, platform='kraken', api_key='k', api_secret='s', label='new'))
+        db.session.commit()
+        self.assertEqual(self._me()['keys'], ['active', 'new'])
+
+        db.session.get(User, self.user_id).username = 'renamed'
+        db.session.commit()
+        db.session.remove()
+        self.assertEqual(self._me()['username'], 'renamed')
+
+        ApiKey.query.filter_by(label='new').one().is_active = False
+        db.session.commit()
+        db.session.remove()
+        self.assertEqual(self._me()['keys'], ['active'])
+
+    def test_unknown_or_inactive_user_is_rejected(self):
+        """Test le refus d'un jeton dont l'utilisateur n'existe plus ou est désactivé"""
+        self.assertIsNone(load_user(str(self.user_id + 1)))
+
+        db.session.get(User, self.user_id).is_active = False
+        db.session.commit()
+        response = self.app.test_client().get('/me', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()['error'], 'Utilisateur non trouvé')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import time
+import numpy as np
+from src.services.indicators import rsi, ema, atr
+from src.services.scanner import compute_indicators, RSI_TIMEFRAMES
+
+def _reference_rsi(closes, period=14):
+    # Implémentation scalaire de référence (Wilder)
+    gains = [max(closes[i] - closes[i - 1], 0) for i in range(1, len(closes))]
+    losses = [max(closes[i - 1] - closes[i], 0) for i in range(1, len(closes))]
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    if avg_loss == 0:
+        return 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+
+    def _random_walk(self, rows, bars):
+        return 100 + np.cumsum(self.rng.normal(0, 1, size=(rows, bars)), axis=1)
+
+    def test_rsi_matches_reference(self):
+        """Test que le RSI vectorisé correspond au calcul scalaire ligne par ligne"""
+        closes = self._random_walk(5, 100)
+
+        values = rsi(closes, 14)
+
+        self.assertTrue(np.isnan(values[:, :14]).all())
+        for row in range(5):
+            self.assertAlmostEqual(values[row, -1], _reference_rsi(list(closes[row])), places=8)
+
+    def test_rsi_bounds(self):
+        """Test les cas limites : hausse continue et prix constant"""
+        rising = np.arange(1, 31, dtype=float)
+        flat = np.full(30, 10.0)
+
+        self.assertEqual(rsi(rising)[0, -1], 100.0)
+        self.assertEqual(rsi(flat)[0, -1], 50.0)
+
+    def test_ema_and_atr(self):
+        """Test l'EMA sur une série constante et l'ATR sur des bougies d'amplitude fixe"""
+        closes = np.full((2, 50), 5.0)
+        self.assertTrue(np.allclose(ema(closes, 20)[:, -1], 5.0))
+
+        high = np.full(50, 12.0)
+        low = np.full(50, 10.0)
+        close = np.full(50, 11.0)
+        self.assertAlmostEqual(atr(high, low, close, 14)[0, -1], 2.0)
+
+    def test_universe_scan_is_fast(self):
+        """Test le calcul de 450 paires x 3 timeframes en bien moins d'une seconde"""
+        symbols = [f'SYM{i}USDT' for i in range(450)]
+        candles = {}
+        for tf in RSI_TIMEFRAMES:
+            closes = self._random_walk(len(symbols), 100)
+            for i, symbol in enumerate(symbols):
+                c = closes[i]
+                candles[(symbol, tf)] = np.column_stack([c, c + 1, c - 1, c, np.ones_like(c)])
+
+        started = time.perf_counter()
+        indicators = compute_indicators(candles, symbols)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(indicators), 450)
+        self.assertLess(elapsed, 0.5)
+        self.assertAlmostEqual(
+            indicators['SYM7USDT']['rsi_4h'],
+            round(_reference_rsi(list(candles[('SYM7USDT', '4h')][:, 3])), 2)
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import time
+from src.services.market_stream import MarketState, MarketStream, StreamSource, ReplayConnector
+from src.services.prices import PriceOracle
+from src.services import scanner
+
+TICKERS_URL = 'wss://test/stream?streams=!ticker@arr'
+MARKS_URL = 'wss://test/stream?streams=!markPrice@arr@1s'
+
+def _ticker(symbol, price, event_time=None):
+    return {'e': '24hrTicker', 'E': event_time or int(time.time() * 1000), 's': symbol,
+            'c': str(price), 'b': str(price - 1), 'a': str(price + 1), 'v': '10', 'q': '2000000', 'P': '1.5'}
+
+def _mark(symbol, price, rate):
+    return {'e': 'markPriceUpdate', 'E': int(time.time() * 1000), 's': symbol,
+            'p': str(price), 'r': str(rate), 'T': 1700000000000}
+
+class TestMarketStream(unittest.TestCase):
+    def setUp(self):
+        self.state = MarketState(max_age=30)
+        self.resyncs = []
+
+    def _run(self, recordings, until, timeout=5):
+        connector = ReplayConnector(recordings)
+        sources = [
+            StreamSource('spot_tickers', TICKERS_URL, self.state.update_ticker,
+                         resync=lambda: self.resyncs.append(time.time())),
+            StreamSource('mark_prices', MARKS_URL, self.state.update_mark_price),
+        ]
+        stream = MarketStream(sources, connect=connector, reconnect_max_delay=1)
+        stream.start()
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            time.sleep(0.01)
+        stream.stop()
+        return stream, connector
+
+    def test_replay_updates_state(self):
+        """Test que les messages relus alimentent la table des symboles"""
+        recordings = {
+            TICKERS_URL: [[{'stream': '!ticker@arr', 'data': [_ticker('BTCUSDT', 50000), _ticker('ETHUSDT', 3000)]}]],
+            MARKS_URL: [[{'stream': '!markPrice@arr@1s', 'data': [_mark('BTCUSDT', 50010, -0.0008)]}]],
+        }
+        stream, _ = self._run(recordings, lambda: len(self.state) == 2 and self.state.get('BTCUSDT').mark_price)
+
+        btc = self.state.fresh('BTCUSDT')
+        self.assertEqual(btc.last_price, 50000.0)
+        self.assertEqual(btc.bid, 49999.0)
+        self.assertEqual(btc.mark_price, 50010.0)
+        self.assertEqual(btc.funding_rate, -0.0008)
+        self.assertTrue(self.state.is_live())
+        self.assertEqual(stream.stats()['spot_tickers']['messages'], 1)
+
+    def test_reconnect_resyncs_and_records_lag(self):
+        """Test la reconnexion après coupure, la resynchronisation et la mesure du retard"""
+        old = int(time.time() * 1000) - 2000
+        recordings = {
+            TICKERS_URL: [
+                [_ticker('BTCUSDT', 50000, event_time=old)],
+                [_ticker('BTCUSDT', 51000)],
+            ],
+        }
+        stream, connector = self._run(recordings, lambda: len(self.resyncs) == 2 and self.state.get('BTCUSDT').last_price == 51000.0)
+
+        self.assertGreaterEqual(connector.urls.count(TICKERS_URL), 2)
+        self.assertEqual(len(self.resyncs), 2)
+        stats = stream.stats()['spot_tickers']
+        self.assertEqual(stats['connects'], 2)
+        self.assertGreaterEqual(stats['max_lag_ms'], 2000)
+        # Flux futures sans enregistrement : erreurs comptées, pas d'interruption du reste
+        self.assertGreater(stream.stats()['mark_prices']['errors'], 0)
+
+    def test_malformed_message_does_not_reconnect(self):
+        """Test qu'un message ou un événement malformé est compté et ignoré sans reconnexion ni resync"""
+        recordings = {
+            TICKERS_URL: [[
+                'pas du json',
+                {'stream': '!ticker@arr', 'data': [{'s': 'BTCUSDT'}, _ticker('ETHUSDT', 3000)]},
+                _ticker('BTCUSDT', 50000),
+            ]],
+        }
+        stream, _ = self._run(recordings, lambda: self.state.get('BTCUSDT') and self.state.get('BTCUSDT').last_price)
+
+        self.assertEqual(self.state.get('ETHUSDT').last_price, 3000.0)
+        stats = stream.stats()['spot_tickers']
+        self.assertEqual(stats['message_errors'], 2)
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(len(self.resyncs), 1)
+
+    def test_consumers_read_live_state(self):
+        """Test que la valorisation et le scanner de funding lisent la table des flux"""
+        self.state.update_ticker(_ticker('ETHUSDT', 3000))
+        self.state.update_mark_price(_mark('SOLUSDT', 120, 0.001))
+        self.state.update_mark_price(_mark('BTCUSDT', 50000, 0.0001))
+
+        oracle = PriceOracle(fetchers={'binance': lambda: {}}, live={'binance': self.state})
+        self.assertFalse(oracle.is_stale())
+        self.assertEqual(oracle.usd_price('ETH'), 3000.0)
+
+        original = scanner.market_state
+        scanner.market_state = self.state
+        try:
+            rows = scanner.scan_funding()
+        finally:
+            scanner.market_state = original
+        self.assertEqual([row['symbol'] for row in rows], ['SOL/USDT'])
+        self.assertEqual(rows[0]['funding_rate'], 0.1)
+        self.assertEqual(rows[0]['condition'], 'Funding rate positif élevé')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src.main import create_app
+from src.routes import metrics as metrics_route
+from src.services import metrics as metrics_module
+from src.services import exchange_client as exchange_module
+from src.services.exchange_client import ExchangeClient
+from src.services.metrics import Metrics, LATENCY_BUCKETS, bucket_quantile
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.metrics = Metrics(directory=self.tmp, flush_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_aggregates_worker_files(self):
+        """Test l'agrégation des compteurs et histogrammes de plusieurs workers"""
+        other = Metrics(directory=self.tmp)
+        other.inc('manus_http_requests_total', {'route': '/api/health', 'status': 200}, 3)
+        other.observe('manus_http_request_duration_seconds', 0.02, {'route': '/api/health'})
+        with mock.patch('os.getpid', return_value=999999):
+            other.flush()
+
+        self.metrics.inc('manus_http_requests_total', {'route': '/api/health', 'status': 200})
+        self.metrics.observe('manus_http_request_duration_seconds', 0.2, {'route': '/api/health'})
+        self.metrics.flush()  # Le fichier du processus courant n'est pas compté deux fois
+
+        text = self.metrics.render()
+        self.assertIn('manus_http_requests_total{route="/api/health",status="200"} 4', text)
+        self.assertIn('manus_http_request_duration_seconds_bucket{route="/api/health",le="0.025"} 1', text)
+        self.assertIn('manus_http_request_duration_seconds_bucket{route="/api/health",le="+Inf"} 2', text)
+        self.assertIn('manus_http_request_duration_seconds_count{route="/api/health"} 2', text)
+
+    def test_bucket_quantiles(self):
+        """Test l'estimation des quantiles à partir des classes de l'histogramme"""
+        for _ in range(98):
+            self.metrics.observe('manus_http_request_duration_seconds', 0.004)
+        for _ in range(2):
+            self.metrics.observe('manus_http_request_duration_seconds', 3)
+
+        summary = self.metrics.summary()['histograms'][0]
+        self.assertEqual(summary['count'], 100)
+        self.assertTrue(0.0025 < summary['p50'] <= 0.005)
+        self.assertTrue(2.5 < summary['p99'] <= 5)
+        self.assertIsNone(bucket_quantile(0.5, LATENCY_BUCKETS, [0] * (len(LATENCY_BUCKETS) + 1)))
+
+    def test_exchange_calls_recorded(self):
+        """Test la mesure des appels aux exchanges : durée, statut et nouvelles tentatives"""
+        response = SimpleNamespace(status_code=429, raw=SimpleNamespace(retries=SimpleNamespace(history=(1, 2))))
+        client = ExchangeClient()
+        client._sessions['https://api.binance.com'] = mock.Mock(get=mock.Mock(return_value=response))
+
+        with mock.patch.object(exchange_module, 'metrics', self.metrics):
+            client.get('https://api.binance.com/api/v3/account')
+
+        text = self.metrics.render()
+        self.assertIn('manus_exchange_requests_total{endpoint="/api/v3/account",exchange="binance",status="429"} 1', text)
+        self.assertIn('manus_exchange_retries_total{endpoint="/api/v3/account",exchange="binance"} 2', text)
+
+    def test_metrics_endpoint(self):
+        """Test l'exposition des durées par route et du temps SQL sur /api/metrics"""
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+        client = app.test_client()
+        with mock.patch.object(metrics_module, 'metrics', self.metrics), \
+                mock.patch.object(metrics_route, 'metrics', self.metrics):
+            client.get('/api/health')
+            client.get('/api/bots/orders')  # Sans jeton : 401
+            response = client.get('/api/metrics')
+            summary = client.get('/api/metrics?format=json').get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertIn('manus_http_requests_total{blueprint="app",method="GET",route="/api/health",status="200"} 1', text)
+        self.assertIn('manus_http_requests_total{blueprint="bots",method="GET",route="/api/bots/orders",status="401"} 1', text)
+        self.assertIn('# TYPE manus_db_request_duration_seconds histogram', text)
+        names = {h['name'] for h in summary['histograms']}
+        self.assertIn('manus_http_request_duration_seconds', names)
+
+    def test_metrics_endpoint_closed_without_token(self):
+        """Test que /api/metrics est refusé hors tests lorsque METRICS_TOKEN n'est pas défini"""
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+        app.testing = False
+        with mock.patch.object(metrics_route, 'METRICS_TOKEN', ''):
+            self.assertEqual(app.test_client().get('/api/metrics').status_code, 403)
+        with mock.patch.object(metrics_route, 'METRICS_TOKEN', 'secret'), \
+                mock.patch.object(metrics_route, 'metrics', self.metrics):
+            client = app.test_client()
+            self.assertEqual(client.get('/api/metrics').status_code, 401)
+            response = client.get('/api/metrics', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_dead_worker_files_are_merged(self):
+        """Test la fusion des fichiers des workers arrêtés sans perte ni double comptage"""
+        for pid in (999997, 999998):
+            worker = Metrics(directory=self.tmp)
+            worker.inc('manus_errors_total', {'source': 'scan'}, 2)
+            with mock.patch('os.getpid', return_value=pid):
+                worker.flush()
+
+        self.assertIn('manus_errors_total{source="scan"} 4', self.metrics.render())
+        self.assertEqual(sorted(os.listdir(self.tmp)), ['.lock', 'metrics-retired.json'])
+        self.assertIn('manus_errors_total{source="scan"} 4', self.metrics.render())
+
+    def test_reused_pid_does_not_reset_counters(self):
+        """Test qu'un worker reprenant le pid d'un worker arrêté n'écrase pas ses compteurs"""
+        previous = Metrics(directory=self.tmp)
+        previous.inc('manus_errors_total', {'source': 'scan'}, 5)
+        previous.flush()
+
+        current = Metrics(directory=self.tmp)  # Même pid, nouveau processus
+        current.inc('manus_errors_total', {'source': 'scan'})
+        current.flush()
+
+        self.assertIn('manus_errors_total{source="scan"} 6', current.render())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.services.parallel import run_parallel
+
+class TestRunParallel(unittest.TestCase):
+    def test_calls_run_concurrently(self):
+        """Test que la durée totale correspond à l'appel le plus lent et non à la somme"""
+        tasks = {i: (lambda: time.sleep(0.2) or 'ok') for i in range(4)}
+
+        started = time.perf_counter()
+        results = run_parallel(tasks, deadline=2)
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.6)
+        for outcome in results.values():
+            self.assertEqual(outcome['status'], 'ok')
+            self.assertEqual(outcome['result'], 'ok')
+            self.assertGreaterEqual(outcome['latency_ms'], 150)
+
+    def test_partial_results_on_deadline(self):
+        """Test que les appels trop lents sont marqués en timeout sans bloquer les autres"""
+        tasks = {
+            'fast': lambda: {'BTC': 1.0},
+            'slow': lambda: time.sleep(1) or {'ETH': 2.0}
+        }
+
+        results = run_parallel(tasks, deadline=0.2)
+
+        self.assertEqual(results['fast']['status'], 'ok')
+        self.assertEqual(results['fast']['result'], {'BTC': 1.0})
+        self.assertEqual(results['slow']['status'], 'timeout')
+        self.assertIsNone(results['slow']['result'])
+
+    def test_errors_are_isolated(self):
+        """Test qu'une erreur sur un exchange n'empêche pas les autres résultats"""
+        def failing():
+            raise RuntimeError('HTTP 500')
+
+        results = run_parallel({'bad': failing, 'good': lambda: {}}, deadline=1)
+
+        self.assertEqual(results['bad']['status'], 'error')
+        self.assertIn('HTTP 500', results['bad']['error'])
+        self.assertEqual(results['good']['status'], 'ok')
+
+    def test_scan_pool_does_not_delay_interactive_calls(self):
+        """Test qu'un scan saturant son propre pool ne retarde pas les appels du pool partagé"""
+        scan_pool = ThreadPoolExecutor(max_workers=2)
+        release = threading.Event()
+        scan = threading.Thread(target=run_parallel, args=(
+            {i: release.wait for i in range(50)}, 5, scan_pool
+        ))
+        scan.start()
+        try:
+            results = run_parallel({'balance': lambda: {'BTC': 1.0}}, deadline=0.5)
+            self.assertEqual(results['balance']['status'], 'ok')
+        finally:
+            release.set()
+            scan.join()
+            scan_pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import threading
+import time
+from src.services.passwords import PasswordHasher, PasswordHasherBusy, hash_rounds
+
+class TestPasswordHasher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.hasher = PasswordHasher(workers=1, queue_limit=1, rounds=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.hasher.shutdown()
+
+    def test_hash_and_verify_in_pool(self):
+        """Test le hachage et la vérification dans le pool de processus"""
+        hashed = self.hasher.hash('TestPassword123!')
+
+        self.assertEqual(hash_rounds(hashed), 4)
+        self.assertTrue(self.hasher.verify('TestPassword123!', hashed))
+        self.assertFalse(self.hasher.verify('Mauvais', hashed))
+
+    def test_rehash_when_cost_changes(self):
+        """Test le rehachage transparent quand le coût configuré change"""
+        old_hash = PasswordHasher(workers=0, rounds=5).hash('TestPassword123!')
+
+        valid, new_hash = self.hasher.check('TestPassword123!', old_hash)
+        self.assertTrue(valid)
+        self.assertEqual(hash_rounds(new_hash), 4)
+
+        self.assertEqual(self.hasher.check('TestPassword123!', new_hash), (True, None))
+        self.assertEqual(self.hasher.check('Mauvais', new_hash), (False, None))
+
+    def test_saturated_queue_fails_fast(self):
+        """Test le refus immédiat quand la file d'attente est pleine"""
+        slow = PasswordHasher(workers=1, queue_limit=1, rounds=12)
+        try:
+            slow.hash('warmup')  # Démarrage du pool
+            started = threading.Event()
+            worker = threading.Thread(target=lambda: (started.set(), slow.hash('TestPassword123!')))
+            worker.start()
+            started.wait()
+            # Laisse le premier hachage occuper l'unique place de la file
+            while slow._slots._value:
+                time.sleep(0.001)
+            with self.assertRaises(PasswordHasherBusy):
+                slow.verify('TestPassword123!', self.hasher.hash('x'))
+            worker.join()
+        finally:
+            slow.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from src.services.prices import PriceOracle
+
+TICKERS = {
+    'BTCUSDT': 60000.0,
+    'ETHBTC': 0.05,
+    'BNBBUSD': 500.0,
+    'USDTTRY': 32.0
+}
+
+class TestPriceOracle(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+
+        def fetch():
+            self.calls += 1
+            return dict(TICKERS)
+
+        self.oracle = PriceOracle(fetchers={'binance': fetch}, ttl=60)
+
+    def test_conversion_through_bridges(self):
+        """Test la conversion en USD via les paires USDT, BUSD, BTC et inversées"""
+        self.oracle.refresh()
+
+        self.assertEqual(self.oracle.usd_price('USDT'), 1.0)
+        self.assertEqual(self.oracle.usd_price('BTC'), 60000.0)
+        self.assertAlmostEqual(self.oracle.usd_price('ETH'), 3000.0)
+        self.assertEqual(self.oracle.usd_price('BNB'), 500.0)
+        self.assertAlmostEqual(self.oracle.usd_price('TRY'), 1 / 32.0)
+        self.assertIsNone(self.oracle.usd_price('UNKNOWN'))
+
+    def test_reads_do_not_hit_network(self):
+        """Test que la lecture des prix n'appelle jamais l'exchange"""
+        self.assertTrue(self.oracle.is_stale())
+        self.assertIsNone(self.oracle.usd_price('BTC'))
+        self.assertEqual(self.calls, 0)
+
+        self.oracle.refresh_if_stale()
+        self.oracle.refresh_if_stale()
+        for _ in range(10):
+            self.oracle.usd_price('ETH')
+
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(self.oracle.status()['stale'])
+
+    def test_staleness_after_ttl(self):
+        """Test que les prix sont marqués périmés après expiration du TTL"""
+        self.oracle.ttl = 0
+        self.oracle.refresh()
+
+        self.assertTrue(self.oracle.status()['stale'])
+        # Les derniers prix connus restent utilisables
+        self.assertEqual(self.oracle.usd_price('BTC'), 60000.0)
+
+if __name__ == '__main__':
+    unittest.main()
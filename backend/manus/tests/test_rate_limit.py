@@ -0,0 +1,78 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from flask import Flask
+from src.services import rate_limit as rate_limit_module
+from src.services.parallel import run_parallel
+from src.services.rate_limit import (
+    RateLimiter, RateLimitExceeded, WeightBucket, current_priority, priority, request_weight,
+    INTERACTIVE, SYNC, SCAN
+)
+
+ACCOUNT_URL = 'https://api.binance.com/api/v3/account'
+
+class TestRateLimit(unittest.TestCase):
+    def test_endpoint_weights(self):
+        """Test le poids des endpoints selon leurs paramètres"""
+        self.assertEqual(request_weight('/api/v3/account'), 20)
+        self.assertEqual(request_weight('/api/v3/klines', {'limit': 50}), 1)
+        self.assertEqual(request_weight('/api/v3/klines', {'limit': 1000}), 5)
+        self.assertEqual(request_weight('/api/v3/ticker/24hr'), 80)
+        self.assertEqual(request_weight('/api/v3/ticker/24hr', {'symbol': 'BTCUSDT'}), 2)
+        self.assertEqual(request_weight('/api/v3/ping'), 1)
+
+    def test_lower_priorities_keep_a_reserve(self):
+        """Test la part du budget réservée aux classes prioritaires"""
+        bucket = WeightBucket(100, headroom=1.0)
+        bucket.consume(50)
+
+        self.assertGreater(bucket.delay(20, rate_limit_module.PRIORITY_SHARES[SCAN]), 0)
+        self.assertEqual(bucket.delay(20, rate_limit_module.PRIORITY_SHARES[SYNC]), 0)
+        self.assertEqual(bucket.delay(20, rate_limit_module.PRIORITY_SHARES[INTERACTIVE]), 0)
+
+    def test_used_weight_header_is_followed(self):
+        """Test le recalage sur X-MBX-USED-WEIGHT-1M (poids consommé par tous les workers)"""
+        limiter = RateLimiter()
+        response = SimpleNamespace(status_code=200, headers={'X-MBX-USED-WEIGHT-1M': '5390'})
+        # Milieu de minute : la fenêtre ne change pas pendant le test
+        with mock.patch.object(rate_limit_module.time, 'time', return_value=6_000_030.0):
+            limiter.update(ACCOUNT_URL, response)
+            self.assertEqual(limiter.stats()['api.binance.com']['window_used'], 5390)
+            with self.assertRaises(RateLimitExceeded):
+                limiter.acquire(ACCOUNT_URL, level=INTERACTIVE)
+
+    def test_ban_honours_retry_after(self):
+        """Test la pause imposée par un 429 et son en-tête Retry-After"""
+        limiter = RateLimiter()
+        limiter.acquire(ACCOUNT_URL, level=INTERACTIVE)
+        limiter.update(ACCOUNT_URL, SimpleNamespace(status_code=429, headers={'Retry-After': '30'}))
+
+        self.assertGreater(limiter.stats()['api.binance.com']['blocked_for'], 25)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(ACCOUNT_URL, level=INTERACTIVE)
+        # Les autres hôtes (API futures) ne sont pas concernés
+        limiter.acquire('https://fapi.binance.com/fapi/v1/premiumIndex', level=INTERACTIVE)
+
+    def test_api_key_bucket(self):
+        """Test le budget propre à chaque clé API"""
+        limiter = RateLimiter(key_weight=40)
+        headers = {'X-MBX-APIKEY': 'cle-a'}
+        limiter.acquire(ACCOUNT_URL, headers=headers, level=INTERACTIVE)
+        limiter.acquire(ACCOUNT_URL, headers=headers, level=INTERACTIVE)
+
+        with mock.patch.object(rate_limit_module, 'RATE_LIMIT_INTERACTIVE_MAX_WAIT', 0):
+            with self.assertRaises(RateLimitExceeded):
+                limiter.acquire(ACCOUNT_URL, headers=headers, level=INTERACTIVE)
+            limiter.acquire(ACCOUNT_URL, headers={'X-MBX-APIKEY': 'cle-b'}, level=INTERACTIVE)
+
+    def test_priority_context(self):
+        """Test la classe de priorité déduite du contexte et transmise aux threads de run_parallel"""
+        app = Flask(__name__)
+        self.assertEqual(current_priority(), SYNC)
+        with app.test_request_context('/api/portfolio/balance'):
+            self.assertEqual(run_parallel({'call': current_priority})['call']['result'], INTERACTIVE)
+            with priority(SCAN):
+                self.assertEqual(run_parallel({'call': current_priority})['call']['result'], SCAN)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from src.services import scan_cache
+from src.services.events import EventBus
+from src.services.scan_cache import ScanCache
+
+class TestScanCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def rsi_scanner(platform):
+            self.calls.append(platform)
+            time.sleep(0.05)
+            return [
+                {'symbol': 'BTC/USDT', 'platform': platform},
+                {'symbol': 'BTC/USDT', 'platform': platform},
+                {'symbol': 'ETH/USDT', 'platform': platform}
+            ]
+
+        self.directory = tempfile.mkdtemp()
+        self.cache = ScanCache(scanners={'rsi': rsi_scanner}, ttl=60, directory=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_scan_shared_between_requests(self):
+        """Test qu'un seul scan est exécuté par cycle, quel que soit le nombre de requêtes"""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get('binance', 'rsi')))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, ['binance'])
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_results_are_deduplicated(self):
+        """Test la suppression des doublons par symbole"""
+        symbols = [row['symbol'] for row in self.cache.get('binance', 'rsi')]
+        self.assertEqual(symbols, ['BTC/USDT', 'ETH/USDT'])
+
+    def test_version_tracks_current_cycle(self):
+        """Test la version des résultats, absente tant que le cycle courant n'est pas calculé"""
+        self.assertIsNone(self.cache.version('binance', 'rsi'))
+        self.cache.get('binance', 'rsi')
+        version = self.cache.version('binance', 'rsi')
+        self.assertIsNotNone(version)
+
+        with mock.patch.object(self.cache, 'cycle', return_value=self.cache.cycle() + 1):
+            self.assertIsNone(self.cache.version('binance', 'rsi'))
+
+    def test_new_cycle_triggers_rescan(self):
+        """Test qu'un nouveau cycle relance le scan et qu'un échec renvoie le dernier résultat"""
+        self.cache.get('binance', 'rsi')
+        self.cache.cycle = lambda: 10 ** 9
+        self.cache.get('binance', 'rsi')
+        self.assertEqual(len(self.calls), 2)
+
+        self.cache.scanners['rsi'] = lambda platform: 1 / 0
+        self.cache.cycle = lambda: 10 ** 9 + 1
+        self.assertEqual(len(self.cache.get('binance', 'rsi')), 2)
+
+    def test_new_cycle_publishes_delta(self):
+        """Test que seules les opportunités apparues ou disparues sont publiées"""
+        bus = EventBus()
+        with mock.patch.object(scan_cache, 'event_bus', bus):
+            self.cache.get('binance', 'rsi')
+            self.cache.scanners['rsi'] = lambda platform: [{'symbol': 'ETH/USDT'}, {'symbol': 'SOL/USDT'}]
+            self.cache.cycle = lambda: 10 ** 9
+            self.cache.get('binance', 'rsi')
+
+        events, _ = bus.since(0)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[1].data['added'], [{'symbol': 'SOL/USDT'}])
+        self.assertEqual(events[1].data['removed'], ['BTC/USDT'])
+
+    def test_results_shared_between_workers(self):
+        """Test qu'un autre worker lit les résultats écrits par le planificateur sans scanner"""
+        self.cache.warm()
+        worker = ScanCache(scanners={'rsi': lambda platform: 1 / 0}, ttl=60, directory=self.directory)
+
+        self.assertEqual([row['symbol'] for row in worker.get('binance', 'rsi', compute=False)], ['BTC/USDT', 'ETH/USDT'])
+        self.assertEqual(worker.version('binance', 'rsi'), self.cache.version('binance', 'rsi'))
+        self.assertEqual(self.calls, ['binance'])
+
+    def test_request_serves_previous_cycle_without_scanning(self):
+        """Test qu'une requête sert le cycle précédent en attendant le planificateur, puis scanne s'il est absent"""
+        self.cache.get('binance', 'rsi')
+        cycle = self.cache.cycle()
+        worker = ScanCache(scanners=self.cache.scanners, ttl=60, directory=self.directory)
+
+        worker.cycle = lambda: cycle + 1
+        self.assertEqual(len(worker.get('binance', 'rsi', compute=False)), 2)
+        self.assertEqual(len(self.calls), 1)
+
+        # Plus de deux cycles sans calcul : planificateur absent, la requête relance le scan
+        worker.cycle = lambda: cycle + 2
+        worker.get('binance', 'rsi', compute=False)
+        self.assertEqual(len(self.calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from src.main import create_app
+from src.services.static_assets import StaticManifest, accepted_encodings, compress_assets
+
+INDEX = b'<!doctype html><script src="/static/js/main.27d681a6.js"></script>'
+SCRIPT = b'console.log("manus");\n' * 200
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'static', 'js'))
+        for name, content in (
+            ('index.html', INDEX),
+            ('robots.txt', b'User-agent: *\n'),
+            (os.path.join('static', 'js', 'main.27d681a6.js'), SCRIPT),
+        ):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(content)
+        compress_assets(self.root)
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'STATIC_DIR': self.root})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_hashed_asset_is_immutable_and_precompressed(self):
+        """Test le cache immuable, l'ETag forte et la variante gzip d'un fichier haché"""
+        response = self.client.get('/static/js/main.27d681a6.js', headers={'Accept-Encoding': 'gzip, br;q=0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), SCRIPT)
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        identity = self.client.get('/static/js/main.27d681a6.js')
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(identity.data, SCRIPT)
+        self.assertNotEqual(identity.headers['ETag'], etag)
+
+        revalidated = self.client.get('/static/js/main.27d681a6.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+
+    def test_spa_fallback_without_filesystem_probe(self):
+        """Test le renvoi de index.html pour les routes du SPA sans accès au système de fichiers"""
+        with mock.patch('os.path.exists', side_effect=AssertionError('exists appelé')):
+            response = self.client.get('/portfolio/history')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, INDEX)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+        self.assertEqual(self.client.get('/robots.txt').headers['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(self.client.get('/static/js/main.00000000.js').status_code, 404)
+
+    def test_manifest_and_encoding_negotiation(self):
+        """Test l'inventaire (build aplati compris) et la lecture de Accept-Encoding"""
+        flat = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(flat, 'js'))
+            open(os.path.join(flat, 'js', 'main.27d681a6.js'), 'wb').close()
+            manifest = StaticManifest(flat)
+            self.assertIs(manifest.get('static/js/main.27d681a6.js'), manifest.get('js/main.27d681a6.js'))
+            self.assertIsNone(manifest.index)
+        finally:
+            shutil.rmtree(flat)
+
+        self.assertEqual(accepted_encodings('gzip;q=1.0, br;q=0, identity'), {'gzip', 'identity'})
+        self.assertEqual(accepted_encodings(None), set())
+
+if __name__ == '__main__':
+    unittest.main()
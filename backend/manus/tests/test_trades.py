@@ -0,0 +1,202 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from src.models.user import db, User, ApiKey, Trade
+from src.routes.portfolio import portfolio_bp
+from src.services import trades
+from src.services.credentials import credential_service
+from src.services.identity import init_identity, identity_cache
+from src.services.pagination import keyset_page, decode_cursor
+
+def _raw_trade(trade_id, symbol='BTCUSDT', time_ms=1714521600000):
+    return {
+        'id': trade_id,
+        'symbol': symbol,
+        'price': '60000.0',
+        'qty': '0.01',
+        'commission': '0.00001',
+        'commissionAsset': 'BTC',
+        'time': time_ms + trade_id * 1000,
+        'isBuyer': True,
+        'isMaker': False
+    }
+
+class TestTradeSync(unittest.TestCase):
+    def setUp(self):
+        """Base en mémoire avec un utilisateur et une clé API"""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='trader', email='trader@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        self.api_key = ApiKey(
+            user_id=user.id,
+            platform='binance',
+            api_key=credential_service.encrypt('key'),
+            api_secret=credential_service.encrypt('secret')
+        )
+        db.session.add(self.api_key)
+        db.session.commit()
+        self.user_id = user.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_sync_pages_and_resumes(self):
+        """Test la pagination par fromId puis la reprise après le dernier trade stocké"""
+        history = [_raw_trade(i) for i in range(5)]
+
+        def fake_fetch(platform, api_key, api_secret, symbol, from_id=0, limit=None):
+            return [tx for tx in history if tx['id'] >= from_id][:2]
+
+        with mock.patch.object(trades, 'fetch_trades', side_effect=fake_fetch) as fetch, \
+                mock.patch.object(trades, 'MY_TRADES_LIMIT', 2):
+            self.assertEqual(trades.sync_key_trades(self.api_key, ['BTCUSDT']), 5)
+            self.assertEqual([c.args[4] for c in fetch.call_args_list], [0, 2, 4])
+
+            history.append(_raw_trade(5))
+            fetch.reset_mock()
+            self.assertEqual(trades.sync_key_trades(self.api_key, ['BTCUSDT']), 1)
+            self.assertEqual(fetch.call_args.args[4], 5)
+
+        self.assertEqual(Trade.query.count(), 6)
+
+    def test_failing_symbol_does_not_stop_sync(self):
+        """Test qu'un symbole en erreur n'empêche pas la synchronisation des suivants"""
+        def fake_fetch(platform, api_key, api_secret, symbol, from_id=0, limit=None):
+            if symbol == 'LDBTCUSDT':
+                raise RuntimeError('HTTP 400 depuis Binance')
+            return [_raw_trade(1, symbol=symbol)]
+
+        with mock.patch.object(trades, 'fetch_trades', side_effect=fake_fetch):
+            inserted = trades.sync_key_trades(self.api_key, ['BTCUSDT', 'LDBTCUSDT', 'ETHBTC'])
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual({t.symbol for t in Trade.query.all()}, {'BTCUSDT', 'ETHBTC'})
+
+    def test_resume_ignores_trades_of_other_users(self):
+        """Test que la reprise ne part pas des trades d'un autre utilisateur sur le même id de clé"""
+        other = User(username='other', email='other@example.com', password='x')
+        db.session.add(other)
+        db.session.flush()
+        row = trades._trade_row(self.api_key, _raw_trade(99, symbol='SOLUSDT'))
+        row['user_id'] = other.id
+        db.session.add(Trade(**row))
+        db.session.commit()
+
+        self.assertNotIn('SOLUSDT', trades.symbols_for_key(self.api_key))
+        with mock.patch.object(trades, 'fetch_trades', return_value=[]) as fetch:
+            trades.sync_key_trades(self.api_key, ['SOLUSDT'])
+        self.assertEqual(fetch.call_args.args[4], 0)
+
+    def test_deleted_key_is_not_synced(self):
+        """Test qu'une clé supprimée entre-temps n'est ni interrogée ni écrite"""
+        stale = ApiKey(id=self.api_key.id, user_id=self.api_key.user_id, platform='binance')
+        db.session.delete(self.api_key)
+        db.session.commit()
+
+        with mock.patch.object(trades, 'fetch_trades') as fetch:
+            self.assertEqual(trades.sync_key_trades(stale, ['BTCUSDT']), 0)
+        fetch.assert_not_called()
+
+    def test_sync_state_tracks_last_sync(self):
+        """Test qu'une clé jamais synchronisée ou en retard doit l'être, même sans trade"""
+        self.assertTrue(trades.needs_sync(self.api_key))
+        with mock.patch.object(trades, 'fetch_trades', return_value=[]):
+            trades.sync_key_trades(self.api_key, ['BTCUSDT'])
+
+        self.assertFalse(trades.needs_sync(self.api_key, max_age=60))
+        self.assertTrue(trades.needs_sync(self.api_key, max_age=-1))
+
+    def test_filters_run_on_local_data(self):
+        """Test les filtres actif / dates sur les trades stockés"""
+        rows = [_raw_trade(1), _raw_trade(2, symbol='ETHBTC'), _raw_trade(3, time_ms=1717200000000)]
+        with mock.patch.object(trades, 'fetch_trades', side_effect=[rows[:2], [rows[2]]]):
+            trades.sync_key_trades(self.api_key, ['BTCUSDT', 'ETHBTC'])
+
+        ids = [self.api_key.id]
+        self.assertEqual(trades.trades_query(self.user_id, ids, asset='ETH').count(), 1)
+        self.assertEqual(trades.trades_query(self.user_id, ids, asset='BTCUSDT').count(), 2)
+        self.assertEqual(trades.trades_query(self.user_id, ids, start_date='2024-05-15T00:00:00Z').count(), 1)
+        self.assertEqual(trades.trades_query(self.user_id, ids, end_date='2024-05-15').count(), 2)
+        self.assertEqual(trades.trades_query(self.user_id, ids, platform='bitget').count(), 0)
+
+    def test_keyset_pagination(self):
+        """Test le parcours complet par curseur, y compris à date identique"""
+        rows = [_raw_trade(i, time_ms=1714521600000 - i * 1000 + (i % 2) * 1000) for i in range(7)]
+        with mock.patch.object(trades, 'fetch_trades', return_value=rows):
+            trades.sync_key_trades(self.api_key, ['BTCUSDT'])
+
+        query = trades.trades_query(self.user_id, [self.api_key.id])
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = keyset_page(query, Trade.time, Trade.id, cursor=cursor, limit=3)
+            seen.extend(trade.trade_id for trade in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        expected = [t.trade_id for t in query.order_by(Trade.time.desc(), Trade.id.desc()).all()]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        """Test qu'un curseur corrompu est rejeté"""
+        with self.assertRaises(ValueError):
+            decode_cursor('pas-un-curseur')
+
+class TestTransactionsRoute(unittest.TestCase):
+    def setUp(self):
+        """Route /transactions sans planificateur"""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['JWT_SECRET_KEY'] = 'cle-de-test-suffisamment-longue-pour-hs256'
+        db.init_app(self.app)
+        init_identity(JWTManager(self.app))
+        identity_cache.clear()
+        self.app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(username='tx', email='tx@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(ApiKey(
+            user_id=user.id, platform='binance',
+            api_key=credential_service.encrypt('key'), api_secret=credential_service.encrypt('secret')
+        ))
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_first_request_syncs_then_serves_locally(self):
+        """Test la synchronisation automatique d'une clé jamais synchronisée, puis la lecture locale"""
+        with mock.patch.object(trades, 'TRADE_SYNC_SYMBOLS', ['BTCUSDT']), \
+                mock.patch.object(trades, 'fetch_trades', return_value=[_raw_trade(1)]) as fetch:
+            first = self.client.get('/api/portfolio/transactions', headers=self.headers)
+            self.assertEqual(len(first.get_json()['transactions']), 1)
+            self.assertEqual(fetch.call_count, 1)
+
+            self.client.get('/api/portfolio/transactions', headers=self.headers)
+            self.assertEqual(fetch.call_count, 1)
+
+            self.client.get('/api/portfolio/transactions?sync=1', headers=self.headers)
+            self.assertEqual(fetch.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()